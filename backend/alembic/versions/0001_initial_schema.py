@@ -0,0 +1,206 @@
+"""Initial schema
+
+Databases that were created by ``Base.metadata.create_all`` at startup
+should be marked as migrated with ``alembic stamp head`` instead.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String()),
+        sa.Column('phone_number', sa.String()),
+        sa.Column('phone_verified', sa.Boolean()),
+        sa.Column('zip_code', sa.String()),
+        sa.Column('city', sa.String()),
+        sa.Column('state', sa.String()),
+        sa.Column('latitude', sa.Float()),
+        sa.Column('longitude', sa.Float()),
+        sa.Column('google_id', sa.String(), unique=True),
+        sa.Column('facebook_id', sa.String(), unique=True),
+        sa.Column('twitter_id', sa.String(), unique=True),
+        sa.Column('bio', sa.Text()),
+        sa.Column('profile_picture', sa.String()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('is_verified', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('last_login', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_index('ix_users_phone_number', 'users',
+                    ['phone_number'], unique=True)
+
+    op.create_table(
+        'item_categories',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False, unique=True),
+        sa.Column('description', sa.Text()),
+        sa.Column('icon', sa.String()),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+    )
+    op.create_index('ix_item_categories_id', 'item_categories', ['id'])
+
+    op.create_table(
+        'items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('condition', sa.String(), nullable=False),
+        sa.Column('zip_code', sa.String(), nullable=False),
+        sa.Column('city', sa.String(), nullable=False),
+        sa.Column('state', sa.String(), nullable=False),
+        sa.Column('latitude', sa.Float()),
+        sa.Column('longitude', sa.Float()),
+        sa.Column('status', sa.Enum('ACTIVE', 'TRADED', 'ARCHIVED',
+                                    name='itemstatus')),
+        sa.Column('is_visible', sa.Boolean()),
+        sa.Column('owner_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('category_id', sa.Integer(),
+                  sa.ForeignKey('item_categories.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_items_id', 'items', ['id'])
+
+    op.create_table(
+        'item_photos',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('item_id', sa.Integer(),
+                  sa.ForeignKey('items.id'), nullable=False),
+        sa.Column('photo_url', sa.String(), nullable=False),
+        sa.Column('is_primary', sa.Boolean()),
+        sa.Column('order_index', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+    )
+    op.create_index('ix_item_photos_id', 'item_photos', ['id'])
+
+    op.create_table(
+        'trades',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('status', sa.Enum('PENDING', 'ACCEPTED', 'REJECTED', 'COMPLETED',
+                                    'CANCELLED', name='tradestatus')),
+        sa.Column('item1_id', sa.Integer(),
+                  sa.ForeignKey('items.id'), nullable=False),
+        sa.Column('item2_id', sa.Integer(),
+                  sa.ForeignKey('items.id'), nullable=False),
+        sa.Column('user1_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('user2_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('notes', sa.Text()),
+        sa.Column('meeting_location', sa.String()),
+        sa.Column('meeting_time', sa.DateTime(timezone=True)),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('completed_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_trades_id', 'trades', ['id'])
+
+    op.create_table(
+        'trade_offers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('status', sa.Enum('PENDING', 'ACCEPTED', 'REJECTED', 'COUNTERED',
+                                    'WITHDRAWN', name='tradeofferstatus')),
+        sa.Column('item_id', sa.Integer(),
+                  sa.ForeignKey('items.id'), nullable=False),
+        sa.Column('item_owner_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('offerer_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('offered_item_id', sa.Integer(),
+                  sa.ForeignKey('items.id'), nullable=False),
+        sa.Column('message', sa.Text()),
+        sa.Column('is_counter_offer', sa.Boolean()),
+        sa.Column('parent_offer_id', sa.Integer(),
+                  sa.ForeignKey('trade_offers.id')),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('responded_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_trade_offers_id', 'trade_offers', ['id'])
+
+    op.create_table(
+        'reviews',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('reviewer_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('reviewee_id', sa.Integer(),
+                  sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('trade_id', sa.Integer(),
+                  sa.ForeignKey('trades.id'), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('comment', sa.Text()),
+        sa.Column('is_public', sa.Boolean()),
+        sa.Column('is_anonymous', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_reviews_id', 'reviews', ['id'])
+
+    op.create_table(
+        'subscriptions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'),
+                  nullable=False, unique=True),
+        sa.Column('status', sa.Enum('ACTIVE', 'CANCELLED', 'PAST_DUE', 'INCOMPLETE',
+                                    name='subscriptionstatus')),
+        sa.Column('payment_provider', sa.Enum('STRIPE', 'PAYPAL',
+                                              name='paymentprovider'), nullable=False),
+        sa.Column('provider_subscription_id', sa.String(), nullable=False),
+        sa.Column('provider_customer_id', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float()),
+        sa.Column('currency', sa.String()),
+        sa.Column('billing_cycle', sa.String()),
+        sa.Column('next_billing_date', sa.DateTime(timezone=True)),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.Column('cancelled_at', sa.DateTime(timezone=True)),
+    )
+    op.create_index('ix_subscriptions_id', 'subscriptions', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('subscriptions')
+    op.drop_table('reviews')
+    op.drop_table('trade_offers')
+    op.drop_table('trades')
+    op.drop_table('item_photos')
+    op.drop_table('items')
+    op.drop_table('item_categories')
+    op.drop_table('users')
+    for enum_name in ('paymentprovider', 'subscriptionstatus', 'tradeofferstatus',
+                      'tradestatus', 'itemstatus'):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""Composite indexes for the offer inboxes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_trade_offers_owner_status_created', 'trade_offers',
+                    ['item_owner_id', 'status', 'created_at'])
+    op.create_index('ix_trade_offers_offerer_status_created', 'trade_offers',
+                    ['offerer_id', 'status', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trade_offers_offerer_status_created',
+                  table_name='trade_offers')
+    op.drop_index('ix_trade_offers_owner_status_created',
+                  table_name='trade_offers')
@@ -0,0 +1,27 @@
+"""Version column for trade offer status transitions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('trade_offers', sa.Column('version', sa.Integer(),
+                                            nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('trade_offers', 'version')
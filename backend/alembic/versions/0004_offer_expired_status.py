@@ -0,0 +1,28 @@
+"""Expired status for trade offers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TYPE tradeofferstatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+
+
+def downgrade() -> None:
+    # Postgres can't drop a value from an enum type; expired offers are
+    # mapped back to withdrawn and the unused label is left in place
+    op.execute("UPDATE trade_offers SET status = 'WITHDRAWN' WHERE status = 'EXPIRED'")
@@ -0,0 +1,53 @@
+"""Append-only trade event ledger and stream snapshots
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'trade_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('aggregate_type', sa.String(length=16), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=32), nullable=False),
+        sa.Column('actor_id', sa.Integer()),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_trade_events_stream', 'trade_events',
+                    ['aggregate_type', 'aggregate_id', 'id'])
+    op.create_index('ix_trade_events_created_at', 'trade_events', ['created_at'])
+
+    op.create_table(
+        'trade_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('aggregate_type', sa.String(length=16), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('last_event_id', sa.Integer(), nullable=False),
+        sa.Column('state', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+        sa.UniqueConstraint('aggregate_type', 'aggregate_id', name='uq_trade_snapshots_stream'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('trade_snapshots')
+    op.drop_index('ix_trade_events_created_at', table_name='trade_events')
+    op.drop_index('ix_trade_events_stream', table_name='trade_events')
+    op.drop_table('trade_events')
@@ -0,0 +1,58 @@
+"""Trade participants table for indexed active/history lookups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('PENDING', 'ACCEPTED')"
+CLOSED = "status NOT IN ('PENDING', 'ACCEPTED')"
+
+
+def upgrade() -> None:
+    # Reuse the existing tradestatus type on Postgres
+    status_type = sa.Enum('PENDING', 'ACCEPTED', 'REJECTED', 'COMPLETED', 'CANCELLED',
+                          name='tradestatus')
+    if op.get_bind().dialect.name == 'postgresql':
+        status_type = postgresql.ENUM(name='tradestatus', create_type=False)
+
+    op.create_table(
+        'trade_participants',
+        sa.Column('trade_id', sa.Integer(), sa.ForeignKey('trades.id'), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('status', status_type, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+    # Backfill both sides of every existing trade
+    op.execute(
+        "INSERT INTO trade_participants (trade_id, user_id, status, created_at) "
+        "SELECT id, user1_id, status, created_at FROM trades "
+        "UNION ALL "
+        "SELECT id, user2_id, status, created_at FROM trades"
+    )
+
+    for name, predicate in (('ix_trade_participants_active', ACTIVE),
+                            ('ix_trade_participants_closed', CLOSED)):
+        op.create_index(name, 'trade_participants', ['user_id', 'created_at', 'trade_id'],
+                        postgresql_where=sa.text(predicate),
+                        sqlite_where=sa.text(predicate))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trade_participants_closed', table_name='trade_participants')
+    op.drop_index('ix_trade_participants_active', table_name='trade_participants')
+    op.drop_table('trade_participants')
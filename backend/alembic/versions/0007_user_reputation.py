@@ -0,0 +1,70 @@
+"""Rating histograms and indexed reputation scores for leaderboards
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HAS_REPUTATION = sa.text("reputation_score IS NOT NULL")
+
+# Must match the defaults in app.services.review_service
+PRIOR_MEAN = float(os.getenv("REPUTATION_PRIOR_MEAN", "3.5"))
+PRIOR_WEIGHT = float(os.getenv("REPUTATION_PRIOR_WEIGHT", "5"))
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_reputations',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        *(sa.Column(f'ratings_{stars}', sa.Integer(), nullable=False, server_default='0')
+          for stars in range(1, 6)),
+        sa.Column('review_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('score', sa.Float()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.add_column('users', sa.Column('reputation_score', sa.Float()))
+
+    # Backfill histograms and scores from existing reviews
+    counts = ", ".join(f"SUM(CASE WHEN rating = {stars} THEN 1 ELSE 0 END)"
+                       for stars in range(1, 6))
+    op.execute(
+        "INSERT INTO user_reputations (user_id, ratings_1, ratings_2, ratings_3, "
+        "ratings_4, ratings_5, review_count) "
+        f"SELECT reviewee_id, {counts}, COUNT(*) FROM reviews GROUP BY reviewee_id"
+    )
+    total = " + ".join(f"{stars} * ratings_{stars}" for stars in range(1, 6))
+    op.execute(
+        f"UPDATE user_reputations SET score = ({PRIOR_WEIGHT * PRIOR_MEAN} + {total}) "
+        f"/ ({PRIOR_WEIGHT} + review_count) WHERE review_count > 0"
+    )
+    op.execute(
+        "UPDATE users SET reputation_score = (SELECT score FROM user_reputations "
+        "WHERE user_reputations.user_id = users.id)"
+    )
+
+    for name, columns in (('ix_users_reputation', ['reputation_score', 'id']),
+                          ('ix_users_state_reputation', ['state', 'reputation_score', 'id']),
+                          ('ix_users_city_reputation', ['city', 'reputation_score', 'id'])):
+        op.create_index(name, 'users', columns,
+                        postgresql_where=HAS_REPUTATION, sqlite_where=HAS_REPUTATION)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_city_reputation', table_name='users')
+    op.drop_index('ix_users_state_reputation', table_name='users')
+    op.drop_index('ix_users_reputation', table_name='users')
+    op.drop_column('users', 'reputation_score')
+    op.drop_table('user_reputations')
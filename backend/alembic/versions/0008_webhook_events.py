@@ -0,0 +1,57 @@
+"""Durable webhook intake table and subscription event ordering
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING = sa.text("status = 'PENDING'")
+
+
+def upgrade() -> None:
+    # Reuse the existing paymentprovider type on Postgres
+    provider_type = sa.Enum('STRIPE', 'PAYPAL', name='paymentprovider')
+    if op.get_bind().dialect.name == 'postgresql':
+        provider_type = postgresql.ENUM(name='paymentprovider', create_type=False)
+
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('provider', provider_type, nullable=False),
+        sa.Column('event_id', sa.String(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'PROCESSED', 'IGNORED', 'FAILED',
+                                    name='webhookeventstatus'), nullable=False),
+        sa.Column('error', sa.Text()),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('processed_at', sa.DateTime(timezone=True)),
+        sa.UniqueConstraint('provider', 'event_id', name='uq_webhook_events_provider_event'),
+    )
+    op.create_index('ix_webhook_events_pending', 'webhook_events', ['id'],
+                    postgresql_where=PENDING, sqlite_where=PENDING)
+
+    op.add_column('subscriptions', sa.Column('last_event_at', sa.DateTime(timezone=True)))
+    op.create_index('ix_subscriptions_provider_subscription', 'subscriptions',
+                    ['payment_provider', 'provider_subscription_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_provider_subscription', table_name='subscriptions')
+    op.drop_column('subscriptions', 'last_event_at')
+    op.drop_index('ix_webhook_events_pending', table_name='webhook_events')
+    op.drop_table('webhook_events')
+    sa.Enum(name='webhookeventstatus').drop(op.get_bind(), checkfirst=True)
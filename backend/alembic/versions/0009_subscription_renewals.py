@@ -0,0 +1,31 @@
+"""Renewal claims and due-date index on subscriptions
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("status = 'ACTIVE'")
+
+
+def upgrade() -> None:
+    op.add_column('subscriptions', sa.Column('renewal_claimed_at', sa.DateTime(timezone=True)))
+    op.create_index('ix_subscriptions_due', 'subscriptions', ['next_billing_date'],
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_due', table_name='subscriptions')
+    op.drop_column('subscriptions', 'renewal_claimed_at')
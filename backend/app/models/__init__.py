@@ -1,8 +1,9 @@
 from .user import User
 from .item import Item, ItemCategory, ItemPhoto
-from .trade import Trade, TradeOffer
-from .review import Review
-from .subscription import Subscription
+from .trade import Trade, TradeOffer, TradeParticipant
+from .trade_event import TradeEvent, TradeSnapshot
+from .review import Review, UserReputation
+from .subscription import Subscription, WebhookEvent
 
 __all__ = [
     "User",
@@ -11,6 +12,11 @@ __all__ = [
     "ItemPhoto",
     "Trade",
     "TradeOffer",
+    "TradeParticipant",
+    "TradeEvent",
+    "TradeSnapshot",
     "Review",
-    "Subscription"
+    "UserReputation",
+    "Subscription",
+    "WebhookEvent"
 ]
@@ -58,6 +58,15 @@ class Item(Base):
     trade_offers = relationship(
         "TradeOffer", foreign_keys="TradeOffer.item_id", back_populates="item")
 
+    @property
+    def primary_photo_url(self):
+        """Photo shown in list views: the one marked primary, else the first"""
+        photos = sorted(self.photos, key=lambda photo: (photo.order_index or 0, photo.id or 0))
+        for photo in photos:
+            if photo.is_primary:
+                return photo.photo_url
+        return photos[0].photo_url if photos else None
+
 
 class ItemPhoto(Base):
     __tablename__ = "item_photos"
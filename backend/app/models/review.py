@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -35,3 +35,23 @@ class Review(Base):
     reviewee = relationship("User", foreign_keys=[
                             reviewee_id], back_populates="reviews_received")
     trade = relationship("Trade")
+
+
+class UserReputation(Base):
+    """Histogram of the ratings a user has received
+
+    Maintained incrementally by ReviewService; the Bayesian score derived
+    from it is copied to users.reputation_score, where it is indexed next
+    to location for leaderboards.
+    """
+    __tablename__ = "user_reputations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    ratings_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    ratings_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    ratings_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    ratings_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    ratings_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    score = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Enum, Index, Text, UniqueConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -17,8 +17,26 @@ class PaymentProvider(enum.Enum):
     PAYPAL = "paypal"
 
 
+class WebhookEventStatus(enum.Enum):
+    PENDING = "pending"
+    PROCESSED = "processed"
+    IGNORED = "ignored"
+    FAILED = "failed"
+
+
+_ACTIVE_SUBSCRIPTION = text("status = 'ACTIVE'")
+
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Webhooks identify subscriptions by the provider's id
+        Index("ix_subscriptions_provider_subscription",
+              "payment_provider", "provider_subscription_id"),
+        # The renewal job's queue: active subscriptions by due date
+        Index("ix_subscriptions_due", "next_billing_date",
+              postgresql_where=_ACTIVE_SUBSCRIPTION, sqlite_where=_ACTIVE_SUBSCRIPTION),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"),
@@ -45,6 +63,39 @@ class Subscription(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     cancelled_at = Column(DateTime(timezone=True))
+    # Provider time of the last webhook applied; older deliveries are skipped
+    last_event_at = Column(DateTime(timezone=True))
+    # Set while a renewal worker is talking to the provider; expires as a lease
+    renewal_claimed_at = Column(DateTime(timezone=True))
 
     # Relationships
     user = relationship("User", back_populates="subscription")
+
+
+_PENDING_WEBHOOK = text("status = 'PENDING'")
+
+
+class WebhookEvent(Base):
+    """A verified provider webhook, stored as received and applied later
+
+    The (provider, event_id) constraint makes redeliveries of the same
+    event no-ops.
+    """
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_webhook_events_provider_event"),
+        # The consumer's queue: pending events in arrival order
+        Index("ix_webhook_events_pending", "id",
+              postgresql_where=_PENDING_WEBHOOK, sqlite_where=_PENDING_WEBHOOK),
+    )
+
+    id = Column(Integer, primary_key=True)
+    provider = Column(Enum(PaymentProvider), nullable=False)
+    event_id = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # Raw request body
+    status = Column(Enum(WebhookEventStatus), nullable=False,
+                    default=WebhookEventStatus.PENDING)
+    error = Column(Text)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -13,12 +13,19 @@ class TradeStatus(enum.Enum):
     CANCELLED = "cancelled"
 
 
+# Trades still in progress; everything else is history
+ACTIVE_TRADE_STATUSES = (TradeStatus.PENDING, TradeStatus.ACCEPTED)
+_ACTIVE_TRADE = text("status IN ('PENDING', 'ACCEPTED')")
+_CLOSED_TRADE = text("status NOT IN ('PENDING', 'ACCEPTED')")
+
+
 class TradeOfferStatus(enum.Enum):
     PENDING = "pending"
     ACCEPTED = "accepted"
     REJECTED = "rejected"
     COUNTERED = "countered"
     WITHDRAWN = "withdrawn"
+    EXPIRED = "expired"
 
 
 class Trade(Base):
@@ -52,8 +59,40 @@ class Trade(Base):
     user2 = relationship("User", foreign_keys=[user2_id])
 
 
+class TradeParticipant(Base):
+    """One row per user per trade, mirroring the trade's status
+
+    Lets a user's trades be listed with a single index range scan instead
+    of OR-ing user1_id and user2_id over every trade ever made. The
+    partial indexes keep active lookups small no matter how much history
+    accumulates.
+    """
+    __tablename__ = "trade_participants"
+    __table_args__ = (
+        Index("ix_trade_participants_active", "user_id", "created_at", "trade_id",
+              postgresql_where=_ACTIVE_TRADE, sqlite_where=_ACTIVE_TRADE),
+        Index("ix_trade_participants_closed", "user_id", "created_at", "trade_id",
+              postgresql_where=_CLOSED_TRADE, sqlite_where=_CLOSED_TRADE),
+    )
+
+    trade_id = Column(Integer, ForeignKey("trades.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    status = Column(Enum(TradeStatus), nullable=False)
+    # Copy of trades.created_at so pages are ordered without touching trades
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    trade = relationship("Trade")
+
+
 class TradeOffer(Base):
     __tablename__ = "trade_offers"
+    __table_args__ = (
+        # Offer inboxes: filter by participant and status, newest first
+        Index("ix_trade_offers_owner_status_created",
+              "item_owner_id", "status", "created_at"),
+        Index("ix_trade_offers_offerer_status_created",
+              "offerer_id", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     status = Column(Enum(TradeOfferStatus), default=TradeOfferStatus.PENDING)
@@ -73,6 +112,9 @@ class TradeOffer(Base):
     is_counter_offer = Column(Boolean, default=False)
     parent_offer_id = Column(Integer, ForeignKey("trade_offers.id"))
 
+    # Bumped by every status transition
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class TradeEvent(Base):
+    """Append-only record of one offer or trade transition
+
+    A stream is an (aggregate_type, aggregate_id) pair such as
+    ("offer", 12) or ("trade", 3). Rows are never updated; old rows are
+    folded into a TradeSnapshot and deleted by ledger compaction.
+    """
+    __tablename__ = "trade_events"
+    __table_args__ = (
+        # Stream tails: events after a snapshot, in order
+        Index("ix_trade_events_stream", "aggregate_type", "aggregate_id", "id"),
+        Index("ix_trade_events_created_at", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    aggregate_type = Column(String(16), nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    event_type = Column(String(32), nullable=False)
+    actor_id = Column(Integer)  # None for system transitions such as expiry
+    data = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TradeSnapshot(Base):
+    """Folded state of a stream up to and including last_event_id"""
+    __tablename__ = "trade_snapshots"
+    __table_args__ = (
+        UniqueConstraint("aggregate_type", "aggregate_id",
+                         name="uq_trade_snapshots_stream"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    aggregate_type = Column(String(16), nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    last_event_id = Column(Integer, nullable=False)
+    state = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
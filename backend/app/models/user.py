@@ -1,11 +1,23 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
+_HAS_REPUTATION = text("reputation_score IS NOT NULL")
+
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Leaderboards: top reputation overall, by state and by city
+        Index("ix_users_reputation", "reputation_score", "id",
+              postgresql_where=_HAS_REPUTATION, sqlite_where=_HAS_REPUTATION),
+        Index("ix_users_state_reputation", "state", "reputation_score", "id",
+              postgresql_where=_HAS_REPUTATION, sqlite_where=_HAS_REPUTATION),
+        Index("ix_users_city_reputation", "city", "reputation_score", "id",
+              postgresql_where=_HAS_REPUTATION, sqlite_where=_HAS_REPUTATION),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -33,6 +45,9 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
 
+    # Bayesian average rating, None until the first review
+    reputation_score = Column(Float)
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.schemas.admin import SlowQueryList
+from app.utils.auth import require_admin_token
+from app.utils import slow_queries
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/slow-queries", response_model=SlowQueryList)
+def get_slow_queries(limit: int = Query(50, ge=1, le=500)):
+    """Recent statements over the slow-query threshold, newest first, with their plans"""
+    return {
+        "threshold_ms": slow_queries.SLOW_QUERY_THRESHOLD_MS,
+        "queries": slow_queries.slow_queries.recent(limit),
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    """Forget recorded slow queries and captured plans"""
+    slow_queries.slow_queries.clear()
+    return {"message": "Slow queries cleared"}
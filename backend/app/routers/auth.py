@@ -63,7 +63,7 @@ async def login(email: str, password: str, db: Session = Depends(get_db)):
 async def google_auth(google_token: str, db: Session = Depends(get_db)):
     """Authenticate with Google"""
     auth_service = AuthService(db)
-    user = auth_service.authenticate_google(google_token)
+    user = await auth_service.authenticate_google(google_token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,7 +76,7 @@ async def google_auth(google_token: str, db: Session = Depends(get_db)):
 async def facebook_auth(facebook_token: str, db: Session = Depends(get_db)):
     """Authenticate with Facebook"""
     auth_service = AuthService(db)
-    user = auth_service.authenticate_facebook(facebook_token)
+    user = await auth_service.authenticate_facebook(facebook_token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,7 +89,7 @@ async def facebook_auth(facebook_token: str, db: Session = Depends(get_db)):
 async def twitter_auth(twitter_token: str, db: Session = Depends(get_db)):
     """Authenticate with Twitter"""
     auth_service = AuthService(db)
-    user = auth_service.authenticate_twitter(twitter_token)
+    user = await auth_service.authenticate_twitter(twitter_token)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
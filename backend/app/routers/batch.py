@@ -0,0 +1,25 @@
+import time
+
+from fastapi import APIRouter, Request
+
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services.batch_service import BatchRunner, shared_headers
+from app.utils.serialization import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.post("/", response_model=BatchResponse)
+async def batch(payload: BatchRequest, request: Request):
+    """Run several GET requests concurrently and return their responses together
+
+    Sub-requests inherit the caller's Authorization header and fail
+    independently; each entry carries its own status and latency.
+    """
+    started = time.perf_counter()
+    runner = BatchRunner(request.app, shared_headers(request.headers))
+    responses = await runner.run(payload.requests)
+    return FastJSONResponse({
+        "responses": responses,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.schemas.item import ItemCreate, ItemUpdate, ItemResponse, ItemCategoryResponse
+from app.schemas.item import ITEM_RESPONSES, ItemCreate, ItemUpdate, ItemResponse, ItemCategoryResponse, ItemRecommendation
 from app.services.item_service import ItemService
+from app.services.recommendation_service import RecommendationService
 from app.utils.auth import get_current_user
+from app.utils.fields import Fields, list_adapter, sparse_fields
+from app.utils.serialization import fast_response
 
 router = APIRouter()
 
@@ -38,11 +41,12 @@ async def get_items(
     q: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
+    fields: Fields = Depends(sparse_fields(ItemResponse)),
     db: Session = Depends(get_db)
 ):
     """Get items with filters"""
     item_service = ItemService(db)
-    return item_service.get_items(
+    return fast_response(list_adapter(ITEM_RESPONSES, ItemResponse, fields), item_service.get_items(
         category_id=category_id,
         zip_code=zip_code,
         city=city,
@@ -51,8 +55,20 @@ async def get_items(
         longitude=longitude,
         search_query=q,
         limit=limit,
-        offset=offset
-    )
+        offset=offset,
+        fields=fields
+    ))
+
+
+@router.get("/recommendations", response_model=List[ItemRecommendation])
+async def get_recommendations(
+    limit: int = Query(20, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get listings current user's active items could be traded for"""
+    recommendation_service = RecommendationService(db)
+    return recommendation_service.get_recommendations(current_user.id, limit)
 
 
 @router.get("/{item_id}", response_model=ItemResponse)
@@ -129,8 +145,10 @@ async def get_user_items(
     user_id: int,
     limit: int = 20,
     offset: int = 0,
+    fields: Fields = Depends(sparse_fields(ItemResponse)),
     db: Session = Depends(get_db)
 ):
     """Get items by user"""
     item_service = ItemService(db)
-    return item_service.get_user_items(user_id, limit, offset)
+    return fast_response(list_adapter(ITEM_RESPONSES, ItemResponse, fields),
+                         item_service.get_user_items(user_id, limit, offset, fields))
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.database import SessionLocal
+from app.services.notification_service import broker
+from app.utils.auth import get_user_from_token
+
+router = APIRouter()
+
+# Idle connections get a keep-alive this often so proxies don't drop them
+HEARTBEAT_SECONDS = 25
+
+
+def _authenticate(token: Optional[str]) -> Optional[int]:
+    """User id for a bearer token
+
+    Uses a short-lived session so that long-lived connections don't hold
+    a database connection.
+    """
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        return user.id if user else None
+    finally:
+        db.close()
+
+
+def _bearer_token(request: Request, token: Optional[str]) -> Optional[str]:
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return token
+
+
+@router.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """Push offer and trade events to the current user
+
+    Browsers can't set headers on WebSocket requests, so the access token
+    is passed as the ``token`` query parameter.
+    """
+    user_id = _authenticate(token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = broker.subscribe(user_id)
+
+    async def pump():
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+            await websocket.send_json(event or {"type": "heartbeat"})
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        broker.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def notifications_stream(request: Request, token: Optional[str] = Query(None)):
+    """Server-sent events fallback for clients without WebSocket support"""
+    user_id = _authenticate(_bearer_token(request, token))
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    subscription = broker.subscribe(user_id)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas.subscription import SubscriptionCreate, SubscriptionResponse
+from app.schemas.subscription import EntitlementResponse, SubscriptionCreate, SubscriptionResponse
+from app.models.subscription import PaymentProvider
+from app.services.entitlement_service import EntitlementService
 from app.services.payment_service import PaymentService
+from app.services.webhook_service import WebhookService
 from app.utils.auth import get_current_user
+from app.utils.webhook_signatures import (
+    WebhookConfigurationError, WebhookVerificationError, verify_paypal, verify_stripe
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -72,33 +82,73 @@ async def get_subscription_status(
     return subscription
 
 
+@router.get("/entitlement", response_model=EntitlementResponse)
+async def get_entitlement(
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get whether premium features are unlocked for current user"""
+    entitlement = EntitlementService(db).get_entitlement(current_user.id)
+    return EntitlementResponse(
+        premium=entitlement.is_active,
+        status=entitlement.status,
+        next_billing_date=entitlement.next_billing_date
+    )
+
+
 @router.post("/webhook/stripe")
 async def stripe_webhook(
-    request: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Handle Stripe webhooks"""
-    payment_service = PaymentService(db)
-    result = payment_service.handle_stripe_webhook(request)
-    if not result:
+    """Receive a Stripe webhook
+
+    The event is verified and stored, then applied by the background
+    consumer; redeliveries are acknowledged without being stored again.
+    """
+    payload = await request.body()
+    try:
+        event = verify_stripe(payload, request.headers.get("stripe-signature", ""))
+        event_id, event_type = event["id"], event["type"]
+    except WebhookConfigurationError as e:
+        # Providers retry on 5xx, so nothing is lost once the secret is set
+        logger.error("Rejecting webhook: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Webhook verification is not configured"
+        )
+    except (WebhookVerificationError, KeyError):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid webhook"
         )
-    return {"status": "success"}
+    webhook_service = WebhookService(db)
+    created = webhook_service.receive(PaymentProvider.STRIPE, event_id, event_type, payload)
+    return {"status": "received" if created else "duplicate"}
 
 
 @router.post("/webhook/paypal")
 async def paypal_webhook(
-    request: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Handle PayPal webhooks"""
-    payment_service = PaymentService(db)
-    result = payment_service.handle_paypal_webhook(request)
-    if not result:
+    """Receive a PayPal webhook; handled like Stripe webhooks"""
+    payload = await request.body()
+    try:
+        event = await verify_paypal(payload, request.headers)
+        event_id, event_type = event["id"], event["event_type"]
+    except WebhookConfigurationError as e:
+        # Providers retry on 5xx, so nothing is lost once the secret is set
+        logger.error("Rejecting webhook: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Webhook verification is not configured"
+        )
+    except (WebhookVerificationError, KeyError):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid webhook"
         )
-    return {"status": "success"}
+    webhook_service = WebhookService(db)
+    created = webhook_service.receive(PaymentProvider.PAYPAL, event_id, event_type, payload)
+    return {"status": "received" if created else "duplicate"}
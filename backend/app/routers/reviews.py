@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.schemas.review import ReviewCreate, ReviewResponse, ReviewUpdate
+from app.schemas.review import REVIEW_RESPONSES, ReviewCreate, ReviewResponse, ReviewUpdate
 from app.services.review_service import ReviewService
 from app.utils.auth import get_current_user
+from app.utils.fields import Fields, list_adapter, sparse_fields
+from app.utils.serialization import fast_response
 
 router = APIRouter()
 
@@ -25,11 +27,13 @@ async def get_user_reviews(
     user_id: int,
     limit: int = 20,
     offset: int = 0,
+    fields: Fields = Depends(sparse_fields(ReviewResponse)),
     db: Session = Depends(get_db)
 ):
     """Get reviews for a user"""
     review_service = ReviewService(db)
-    return review_service.get_user_reviews(user_id, limit, offset)
+    return fast_response(list_adapter(REVIEW_RESPONSES, ReviewResponse, fields),
+                         review_service.get_user_reviews(user_id, limit, offset, fields))
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
@@ -87,8 +91,10 @@ async def delete_review(
 @router.get("/trade/{trade_id}", response_model=List[ReviewResponse])
 async def get_trade_reviews(
     trade_id: int,
+    fields: Fields = Depends(sparse_fields(ReviewResponse)),
     db: Session = Depends(get_db)
 ):
     """Get reviews for a specific trade"""
     review_service = ReviewService(db)
-    return review_service.get_trade_reviews(trade_id)
+    return fast_response(list_adapter(REVIEW_RESPONSES, ReviewResponse, fields),
+                         review_service.get_trade_reviews(trade_id, fields))
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from app.database import get_db
-from app.schemas.trade import TradeOfferCreate, TradeOfferResponse, TradeResponse
+from app.models.trade import TradeOfferStatus
+from app.schemas.trade import (
+    TRADE_OFFER_RESPONSES, TRADE_RESPONSES, TradeCycleResponse, TradeHistoryResponse,
+    TradeOfferCreate, TradeOfferResponse, TradeResponse
+)
+from app.services.matching_service import MatchingService
 from app.services.trade_service import TradeService
 from app.utils.auth import get_current_user
+from app.utils.fields import Fields, list_adapter, sparse_fields
+from app.utils.pagination import next_cursor
+from app.utils.serialization import fast_response
 
 router = APIRouter()
 
@@ -17,27 +26,83 @@ async def create_trade_offer(
 ):
     """Create a trade offer"""
     trade_service = TradeService(db)
-    return trade_service.create_trade_offer(offer_data, current_user.id)
+    offer = trade_service.create_trade_offer(offer_data, current_user.id)
+    if not offer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item not found"
+        )
+    return offer
 
 
 @router.get("/offers/received", response_model=List[TradeOfferResponse])
 async def get_received_offers(
+    offer_status: Optional[TradeOfferStatus] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Fields = Depends(sparse_fields(TradeOfferResponse)),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get trade offers received by current user"""
+    """Get trade offers received by current user
+
+    Results are newest first; pass the X-Next-Cursor response header back
+    as ``cursor`` to fetch the next page.
+    """
     trade_service = TradeService(db)
-    return trade_service.get_received_offers(current_user.id)
+    try:
+        offers = trade_service.get_received_offers(
+            current_user.id, offer_status, created_after, created_before, cursor, limit, fields)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    next_page = next_cursor(offers, limit)
+    return fast_response(list_adapter(TRADE_OFFER_RESPONSES, TradeOfferResponse, fields), offers,
+                         headers={"X-Next-Cursor": next_page} if next_page else None)
 
 
 @router.get("/offers/made", response_model=List[TradeOfferResponse])
 async def get_made_offers(
+    offer_status: Optional[TradeOfferStatus] = Query(None, alias="status"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Fields = Depends(sparse_fields(TradeOfferResponse)),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get trade offers made by current user
+
+    Results are newest first; pass the X-Next-Cursor response header back
+    as ``cursor`` to fetch the next page.
+    """
+    trade_service = TradeService(db)
+    try:
+        offers = trade_service.get_made_offers(
+            current_user.id, offer_status, created_after, created_before, cursor, limit, fields)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    next_page = next_cursor(offers, limit)
+    return fast_response(list_adapter(TRADE_OFFER_RESPONSES, TradeOfferResponse, fields), offers,
+                         headers={"X-Next-Cursor": next_page} if next_page else None)
+
+
+@router.get("/offers/pending/count")
+async def get_pending_offer_counts(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get trade offers made by current user"""
+    """Get the number of pending offers received and made by current user"""
     trade_service = TradeService(db)
-    return trade_service.get_made_offers(current_user.id)
+    return trade_service.get_pending_offer_counts(current_user.id)
 
 
 @router.post("/offers/{offer_id}/accept", response_model=TradeResponse)
@@ -52,7 +117,7 @@ async def accept_trade_offer(
     if not trade:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade offer not found or not authorized"
+            detail="Pending trade offer not found or not authorized"
         )
     return trade
 
@@ -69,11 +134,28 @@ async def reject_trade_offer(
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade offer not found or not authorized"
+            detail="Pending trade offer not found or not authorized"
         )
     return {"message": "Trade offer rejected"}
 
 
+@router.post("/offers/{offer_id}/withdraw")
+async def withdraw_trade_offer(
+    offer_id: int,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Withdraw a pending trade offer"""
+    trade_service = TradeService(db)
+    success = trade_service.withdraw_trade_offer(offer_id, current_user.id)
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pending trade offer not found or not authorized"
+        )
+    return {"message": "Trade offer withdrawn"}
+
+
 @router.post("/offers/{offer_id}/counter", response_model=TradeOfferResponse)
 async def counter_trade_offer(
     offer_id: int,
@@ -83,28 +165,150 @@ async def counter_trade_offer(
 ):
     """Create a counter offer"""
     trade_service = TradeService(db)
-    return trade_service.create_counter_offer(offer_id, counter_offer, current_user.id)
+    offer = trade_service.create_counter_offer(offer_id, counter_offer, current_user.id)
+    if not offer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pending trade offer or item not found, or not authorized"
+        )
+    return offer
 
 
 @router.get("/offers/{offer_id}/counters", response_model=List[TradeOfferResponse])
 async def get_counter_offers(
     offer_id: int,
+    fields: Fields = Depends(sparse_fields(TradeOfferResponse)),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get counter offers for a trade offer"""
     trade_service = TradeService(db)
-    return trade_service.get_counter_offers(offer_id, current_user.id)
+    return fast_response(list_adapter(TRADE_OFFER_RESPONSES, TradeOfferResponse, fields),
+                         trade_service.get_counter_offers(offer_id, current_user.id, fields))
+
+
+@router.get("/offers/{offer_id}/thread", response_model=TradeOfferResponse)
+async def get_offer_thread(
+    offer_id: int,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a trade offer with its full counter-offer thread"""
+    trade_service = TradeService(db)
+    offer = trade_service.get_offer_thread(offer_id, current_user.id)
+    if not offer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trade offer not found or not authorized"
+        )
+    return offer
+
+
+@router.get("/offers/{offer_id}/history", response_model=TradeHistoryResponse)
+async def get_offer_history(
+    offer_id: int,
+    before: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the transition history of a trade offer
+
+    Events come oldest first, a page at a time; pass next_before as
+    before to read older ones.
+    """
+    trade_service = TradeService(db)
+    history = trade_service.get_offer_history(offer_id, current_user.id, before, limit)
+    if not history:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trade offer not found or not authorized"
+        )
+    return history
+
+
+@router.get("/cycles", response_model=List[TradeCycleResponse])
+async def get_trade_cycles(
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get multi-party trade cycles that include one of current user's items"""
+    matching_service = MatchingService(db)
+    return matching_service.get_user_cycles(current_user.id)
 
 
 @router.get("/active", response_model=List[TradeResponse])
 async def get_active_trades(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Fields = Depends(sparse_fields(TradeResponse)),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get pending and accepted trades for current user
+
+    Results are newest first; pass the X-Next-Cursor response header back
+    as ``cursor`` to fetch the next page.
+    """
+    trade_service = TradeService(db)
+    try:
+        trades = trade_service.get_active_trades(current_user.id, cursor, limit, fields)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    next_page = next_cursor(trades, limit)
+    return fast_response(list_adapter(TRADE_RESPONSES, TradeResponse, fields), trades,
+                         headers={"X-Next-Cursor": next_page} if next_page else None)
+
+
+@router.get("/history", response_model=List[TradeResponse])
+async def get_past_trades(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Fields = Depends(sparse_fields(TradeResponse)),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get active trades for current user"""
+    """Get completed, rejected and cancelled trades for current user
+
+    Paginated like /active.
+    """
     trade_service = TradeService(db)
-    return trade_service.get_active_trades(current_user.id)
+    try:
+        trades = trade_service.get_past_trades(current_user.id, cursor, limit, fields)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    next_page = next_cursor(trades, limit)
+    return fast_response(list_adapter(TRADE_RESPONSES, TradeResponse, fields), trades,
+                         headers={"X-Next-Cursor": next_page} if next_page else None)
+
+
+@router.get("/{trade_id}/history", response_model=TradeHistoryResponse)
+async def get_trade_history(
+    trade_id: int,
+    before: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the transition history of a trade
+
+    Events come oldest first, a page at a time; pass next_before as
+    before to read older ones.
+    """
+    trade_service = TradeService(db)
+    history = trade_service.get_trade_history(trade_id, current_user.id, before, limit)
+    if not history:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trade not found or not authorized"
+        )
+    return history
 
 
 @router.post("/{trade_id}/complete")
@@ -119,7 +323,7 @@ async def complete_trade(
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found or not authorized"
+            detail="Trade not found, not authorized or already closed"
         )
     return {"message": "Trade completed successfully"}
 
@@ -136,6 +340,6 @@ async def cancel_trade(
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found or not authorized"
+            detail="Trade not found, not authorized or already closed"
         )
     return {"message": "Trade cancelled successfully"}
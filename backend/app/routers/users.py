@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.schemas.user import UserResponse, UserUpdate, UserProfile
+from app.schemas.user import USER_PROFILES, LeaderboardEntry, UserResponse, UserUpdate, UserProfile
 from app.services.user_service import UserService
 from app.utils.auth import get_current_user
+from app.utils.fields import Fields, list_adapter, sparse_fields
+from app.utils.serialization import fast_response
 
 router = APIRouter()
 
@@ -30,6 +32,18 @@ async def update_current_user(
     return user_service.update_user(current_user.id, user_update)
 
 
+@router.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    state: str = None,
+    city: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Get the most reputable traders, optionally in a state and/or city"""
+    user_service = UserService(db)
+    return user_service.get_leaderboard(state, city, limit)
+
+
 @router.get("/{user_id}", response_model=UserProfile)
 async def get_user_profile(
     user_id: int,
@@ -53,8 +67,10 @@ async def search_users(
     state: str = None,
     limit: int = 20,
     offset: int = 0,
+    fields: Fields = Depends(sparse_fields(UserProfile)),
     db: Session = Depends(get_db)
 ):
     """Search users by name, city, or state"""
     user_service = UserService(db)
-    return user_service.search_users(q, city, state, limit, offset)
+    return fast_response(list_adapter(USER_PROFILES, UserProfile, fields),
+                         user_service.search_users(q, city, state, limit, offset, fields))
@@ -1,13 +1,16 @@
-from .user import UserCreate, UserUpdate, UserResponse, UserProfile
+from .user import UserCreate, UserUpdate, UserResponse, UserProfile, LeaderboardEntry
 from .item import ItemCreate, ItemUpdate, ItemResponse, ItemCategoryResponse
-from .trade import TradeOfferCreate, TradeOfferResponse, TradeResponse
+from .trade import TradeOfferCreate, TradeOfferResponse, TradeResponse, TradeCycleResponse, TradeHistoryResponse
 from .review import ReviewCreate, ReviewResponse
-from .subscription import SubscriptionCreate, SubscriptionResponse
+from .subscription import SubscriptionCreate, SubscriptionResponse, EntitlementResponse
+from .batch import BatchRequest, BatchResponse
 
 __all__ = [
-    "UserCreate", "UserUpdate", "UserResponse", "UserProfile",
+    "UserCreate", "UserUpdate", "UserResponse", "UserProfile", "LeaderboardEntry",
     "ItemCreate", "ItemUpdate", "ItemResponse", "ItemCategoryResponse",
-    "TradeOfferCreate", "TradeOfferResponse", "TradeResponse",
+    "TradeOfferCreate", "TradeOfferResponse", "TradeResponse", "TradeCycleResponse",
+    "TradeHistoryResponse",
     "ReviewCreate", "ReviewResponse",
-    "SubscriptionCreate", "SubscriptionResponse"
+    "SubscriptionCreate", "SubscriptionResponse", "EntitlementResponse",
+    "BatchRequest", "BatchResponse"
 ]
@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class SlowQuery(BaseModel):
+    recorded_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: Any = None
+    caller: Optional[str] = None
+    plan: Optional[str] = None
+
+
+class SlowQueryList(BaseModel):
+    threshold_ms: float
+    queries: List[SlowQuery]
@@ -0,0 +1,41 @@
+import os
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+# Nested batches, and event streams that would hold a slot until they time out
+BATCH_EXCLUDED_PREFIXES = ("/api/batch/", "/api/notifications/")
+
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET"] = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+
+    @field_validator("path")
+    @classmethod
+    def validate_path(cls, v):
+        path = v.split("?")[0].rstrip("/") + "/"
+        if not path.startswith("/api/") or path.startswith(BATCH_EXCLUDED_PREFIXES):
+            raise ValueError("path must be an /api/ endpoint other than batch and "
+                             "notification streams")
+        return v
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS)
+
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Any = None
+    duration_ms: float
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
+    duration_ms: float
@@ -0,0 +1,38 @@
+import enum
+from typing import Any, Optional
+
+
+def enum_value(value: Any) -> Any:
+    """Return the plain value of an enum member, or the value unchanged"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def item_summary(item: Any) -> Optional[dict]:
+    """Basic item info embedded in other responses"""
+    if item is None or isinstance(item, dict):
+        return item
+    return {
+        "id": item.id,
+        "title": item.title,
+        "condition": item.condition,
+        "city": item.city,
+        "state": item.state,
+        "status": enum_value(item.status),
+        "owner_id": item.owner_id,
+    }
+
+
+def user_summary(user: Any) -> Optional[dict]:
+    """Basic user info embedded in other responses"""
+    if user is None or isinstance(user, dict):
+        return user
+    return {
+        "id": user.id,
+        "username": user.username,
+        "full_name": user.full_name,
+        "profile_picture": user.profile_picture,
+        "city": user.city,
+        "state": user.state,
+    }
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, field_validator
 from typing import Optional, List
 from datetime import datetime
+from app.schemas.common import enum_value, user_summary
 
 
 class ItemPhotoBase(BaseModel):
@@ -66,8 +67,23 @@ class ItemResponse(ItemBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     photos: List[ItemPhotoResponse] = []
+    primary_photo_url: Optional[str] = None
     category: ItemCategoryResponse
     owner: dict  # Basic user info
 
+    _status = field_validator("status", mode="before")(enum_value)
+    _owner = field_validator("owner", mode="before")(user_summary)
+
     class Config:
         from_attributes = True
+
+
+ITEM_RESPONSES = TypeAdapter(List[ItemResponse])
+
+
+class ItemRecommendation(BaseModel):
+    item_id: int
+    owner_id: int
+    score: float
+    matched_item_id: int  # The user's item that best fits this listing
+    distance_km: Optional[float] = None
@@ -1,10 +1,20 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, TypeAdapter, ValidationInfo, field_validator
+from typing import Any, ClassVar, Dict, List, Optional, Set
 from datetime import datetime
+from app.schemas.common import user_summary
+
+
+def hide_if_anonymous(value: Any, info: ValidationInfo) -> Any:
+    """None for a reviewer field of an anonymous review
+
+    is_anonymous is declared before the reviewer fields, so it has already
+    been validated.
+    """
+    return None if info.data.get("is_anonymous") else value
 
 
 class ReviewBase(BaseModel):
-    rating: int
+    rating: int = Field(ge=1, le=5)
     title: str
     comment: Optional[str] = None
     is_public: bool = True
@@ -17,7 +27,7 @@ class ReviewCreate(ReviewBase):
 
 
 class ReviewUpdate(BaseModel):
-    rating: Optional[int] = None
+    rating: Optional[int] = Field(None, ge=1, le=5)
     title: Optional[str] = None
     comment: Optional[str] = None
     is_public: Optional[bool] = None
@@ -26,15 +36,26 @@ class ReviewUpdate(BaseModel):
 
 class ReviewResponse(ReviewBase):
     id: int
-    reviewer_id: int
+    reviewer_id: Optional[int] = None  # None if anonymous
     reviewee_id: int
     trade_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     # Related objects
-    reviewer: dict  # Basic user info (if not anonymous)
+    reviewer: Optional[dict] = None  # Basic user info (if not anonymous)
     reviewee: dict  # Basic user info
 
+    # Sparse responses that include these fields also include is_anonymous
+    sparse_dependencies: ClassVar[Dict[str, Set[str]]] = {
+        "reviewer": {"is_anonymous"}, "reviewer_id": {"is_anonymous"},
+    }
+
+    _users = field_validator("reviewer", "reviewee", mode="before")(user_summary)
+    _anonymous = field_validator("reviewer_id", "reviewer")(hide_if_anonymous)
+
     class Config:
         from_attributes = True
+
+
+REVIEW_RESPONSES = TypeAdapter(List[ReviewResponse])
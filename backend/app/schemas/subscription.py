@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from datetime import datetime
+from app.schemas.common import enum_value
 
 
 class SubscriptionBase(BaseModel):
@@ -24,5 +25,15 @@ class SubscriptionResponse(SubscriptionBase):
     updated_at: Optional[datetime] = None
     cancelled_at: Optional[datetime] = None
 
+    _enums = field_validator("status", "payment_provider", mode="before")(enum_value)
+
     class Config:
         from_attributes = True
+
+
+class EntitlementResponse(BaseModel):
+    premium: bool
+    status: Optional[str] = None
+    next_billing_date: Optional[datetime] = None
+
+    _enums = field_validator("status", mode="before")(enum_value)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, field_validator
 from typing import Optional, List
 from datetime import datetime
+from app.schemas.common import enum_value, item_summary, user_summary
 
 
 class TradeOfferBase(BaseModel):
@@ -33,10 +34,17 @@ class TradeOfferResponse(TradeOfferBase):
     item_owner: dict  # Basic user info
     counter_offers: List['TradeOfferResponse'] = []
 
+    _status = field_validator("status", mode="before")(enum_value)
+    _items = field_validator("item", "offered_item", mode="before")(item_summary)
+    _users = field_validator("offerer", "item_owner", mode="before")(user_summary)
+
     class Config:
         from_attributes = True
 
 
+TRADE_OFFER_RESPONSES = TypeAdapter(List[TradeOfferResponse])
+
+
 class TradeResponse(BaseModel):
     id: int
     status: str
@@ -57,5 +65,41 @@ class TradeResponse(BaseModel):
     user1: dict  # Basic user info
     user2: dict  # Basic user info
 
+    _status = field_validator("status", mode="before")(enum_value)
+    _items = field_validator("item1", "item2", mode="before")(item_summary)
+    _users = field_validator("user1", "user2", mode="before")(user_summary)
+
     class Config:
         from_attributes = True
+
+
+TRADE_RESPONSES = TypeAdapter(List[TradeResponse])
+
+
+class TradeCycleLeg(BaseModel):
+    user_id: int
+    gives_item_id: int
+    receives_item_id: int
+    offer_id: int  # The pending offer expressing this want
+
+
+class TradeCycleResponse(BaseModel):
+    length: int
+    legs: List[TradeCycleLeg]
+
+
+class TradeHistoryEntry(BaseModel):
+    id: int
+    type: str
+    actor_id: Optional[int] = None  # None for system transitions such as expiry
+    at: Optional[datetime] = None
+
+
+class TradeHistoryResponse(BaseModel):
+    aggregate_type: str
+    aggregate_id: int
+    status: Optional[str] = None
+    data: dict
+    event_count: int
+    events: List[TradeHistoryEntry]
+    next_before: Optional[int] = None  # Pass as before for older events
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 
@@ -48,4 +48,19 @@ class UserProfile(UserResponse):
     items_count: int = 0
     trades_completed: int = 0
     average_rating: Optional[float] = None
+    reputation_score: Optional[float] = None  # Bayesian average, as ranked on the leaderboard
     reviews_count: int = 0
+
+
+USER_PROFILES = TypeAdapter(List[UserProfile])
+
+
+class LeaderboardEntry(BaseModel):
+    id: int
+    username: str
+    full_name: str
+    city: Optional[str] = None
+    state: Optional[str] = None
+    profile_picture: Optional[str] = None
+    reputation_score: float
+    review_count: int
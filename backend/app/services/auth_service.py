@@ -55,9 +55,9 @@ class AuthService:
 
         return create_access_token(data={"sub": user.email})
 
-    def authenticate_google(self, google_token: str) -> Optional[str]:
+    async def authenticate_google(self, google_token: str) -> Optional[str]:
         """Authenticate user with Google token"""
-        user_info = verify_google_token(google_token)
+        user_info = await verify_google_token(google_token)
         if not user_info:
             return None
 
@@ -89,9 +89,9 @@ class AuthService:
 
         return create_access_token(data={"sub": user.email})
 
-    def authenticate_facebook(self, facebook_token: str) -> Optional[str]:
+    async def authenticate_facebook(self, facebook_token: str) -> Optional[str]:
         """Authenticate user with Facebook token"""
-        user_info = verify_facebook_token(facebook_token)
+        user_info = await verify_facebook_token(facebook_token)
         if not user_info:
             return None
 
@@ -123,9 +123,9 @@ class AuthService:
 
         return create_access_token(data={"sub": user.email})
 
-    def authenticate_twitter(self, twitter_token: str) -> Optional[str]:
+    async def authenticate_twitter(self, twitter_token: str) -> Optional[str]:
         """Authenticate user with Twitter token"""
-        user_info = verify_twitter_token(twitter_token)
+        user_info = await verify_twitter_token(twitter_token)
         if not user_info:
             return None
 
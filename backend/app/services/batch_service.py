@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
+
+from app.schemas.batch import BatchSubRequest
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Sub-requests run at once per batch; each holds a pooled DB connection
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_RESPONSE_BYTES = int(os.getenv("BATCH_MAX_RESPONSE_BYTES", str(512 * 1024)))
+BATCH_SUBREQUEST_TIMEOUT_SECONDS = float(os.getenv("BATCH_SUBREQUEST_TIMEOUT_SECONDS", "10"))
+
+# Envelope headers passed on to every sub-request unless it sets its own
+SHARED_HEADERS = ("authorization", "accept-language", "user-agent")
+# Sub-response headers worth returning to the client
+RETURNED_HEADERS = ("content-type", "x-next-cursor", "www-authenticate", "retry-after")
+
+batches = registry.counter("batch_requests_total", "Batch envelopes handled")
+subrequests = registry.counter(
+    "batch_subrequests_total", "Batched sub-requests by status class", ["status"])
+subrequest_seconds = registry.counter(
+    "batch_subrequest_seconds_total", "Summed sub-request latency", ["status"])
+response_bytes = registry.counter(
+    "batch_response_bytes_total", "Sub-response bytes returned in batch envelopes")
+
+
+def _error(status: int, detail: str) -> dict:
+    return {"status": status, "headers": {}, "body": {"detail": detail}}
+
+
+class BatchRunner:
+    """Runs GET sub-requests against the app in-process
+
+    Sub-requests go through the full ASGI stack with the envelope's
+    credentials, so routing, auth and validation behave as if they were
+    sent separately, minus the network round trips. Bodies are embedded in
+    the envelope as they were rendered, without being parsed again.
+    """
+
+    def __init__(self, app, shared_headers: Dict[str, str],
+                 concurrency: int = BATCH_CONCURRENCY,
+                 max_response_bytes: int = BATCH_MAX_RESPONSE_BYTES,
+                 timeout: float = BATCH_SUBREQUEST_TIMEOUT_SECONDS):
+        self.app = app
+        self.shared_headers = shared_headers
+        self.max_response_bytes = max_response_bytes
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run(self, requests: List[BatchSubRequest]) -> List[dict]:
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+            responses = await asyncio.gather(*(self._dispatch(client, sub) for sub in requests))
+        batches.inc()
+        return responses
+
+    async def _dispatch(self, client: httpx.AsyncClient, sub: BatchSubRequest) -> dict:
+        headers = {**self.shared_headers, **{name.lower(): value
+                                            for name, value in sub.headers.items()}}
+        # The envelope is compressed as a whole
+        headers["accept-encoding"] = "identity"
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.request(sub.method, sub.path, headers=headers), self.timeout)
+                result = self._result(response)
+            except asyncio.TimeoutError:
+                result = _error(504, "Sub-request timed out")
+            except Exception:
+                # The app raised; the other sub-requests still get their results
+                logger.exception("Batched %s %s failed", sub.method, sub.path)
+                result = _error(500, "Internal Server Error")
+            duration = time.perf_counter() - started
+
+        status_class = f"{result['status'] // 100}xx"
+        subrequests.inc(status=status_class)
+        subrequest_seconds.inc(duration, status=status_class)
+        result.update(id=sub.id, duration_ms=round(duration * 1000, 3))
+        return result
+
+    def _result(self, response: httpx.Response) -> dict:
+        content = response.content
+        if len(content) > self.max_response_bytes:
+            return _error(413, f"Response exceeds {self.max_response_bytes} bytes; "
+                               "request it separately")
+        response_bytes.inc(len(content))
+
+        body: Optional[object] = None
+        if content:
+            if response.headers.get("content-type", "").startswith("application/json"):
+                body = orjson.Fragment(content)
+            else:
+                body = response.text
+        headers = {name: response.headers[name]
+                   for name in RETURNED_HEADERS if name in response.headers}
+        return {"status": response.status_code, "headers": headers, "body": body}
+
+
+def shared_headers(headers) -> Dict[str, str]:
+    """Envelope headers that sub-requests inherit"""
+    return {name: headers[name] for name in SHARED_HEADERS if name in headers}
@@ -0,0 +1,148 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.utils.metrics import registry
+
+ENTITLEMENT_CACHE_TTL_SECONDS = float(os.getenv("ENTITLEMENT_CACHE_TTL_SECONDS", "60"))
+ENTITLEMENT_CACHE_SIZE = int(os.getenv("ENTITLEMENT_CACHE_SIZE", "100000"))
+# Share of cache hits re-checked against the database to measure staleness
+ENTITLEMENT_STALENESS_SAMPLE_RATE = float(os.getenv("ENTITLEMENT_STALENESS_SAMPLE_RATE", "0.01"))
+# Premium stays on this long past next_billing_date while a renewal is processed
+ENTITLEMENT_GRACE_HOURS = float(os.getenv("ENTITLEMENT_GRACE_HOURS", "24"))
+
+cache_requests = registry.counter(
+    "entitlement_cache_requests_total", "Entitlement lookups by cache result", ["result"])
+cache_hit_age = registry.counter(
+    "entitlement_cache_hit_age_seconds_total", "Summed age of entitlements served from cache")
+stale_checks = registry.counter(
+    "entitlement_cache_stale_checks_total",
+    "Sampled cache hits compared with the database", ["stale"])
+
+
+class Entitlement:
+    """A user's subscription state as far as feature gating is concerned"""
+
+    __slots__ = ("user_id", "status", "next_billing_date", "loaded_at")
+
+    def __init__(self, user_id: int, status: Optional[SubscriptionStatus],
+                 next_billing_date: Optional[datetime]):
+        self.user_id = user_id
+        self.status = status
+        self.next_billing_date = next_billing_date
+        self.loaded_at = time.monotonic()
+
+    @property
+    def is_active(self) -> bool:
+        if self.status != SubscriptionStatus.ACTIVE:
+            return False
+        if self.next_billing_date is None:
+            return True
+        next_billing_date = self.next_billing_date
+        if next_billing_date.tzinfo is None:
+            next_billing_date = next_billing_date.replace(tzinfo=timezone.utc)
+        grace = timedelta(hours=ENTITLEMENT_GRACE_HOURS)
+        return datetime.now(timezone.utc) < next_billing_date + grace
+
+    def same_as(self, other: "Entitlement") -> bool:
+        return (self.status, self.next_billing_date) == (other.status, other.next_billing_date)
+
+
+class EntitlementCache:
+    """Per-process LRU of entitlements that expire after ttl seconds
+
+    Writes through this process invalidate entries directly; changes made
+    by other workers are picked up when the entry expires, so ttl bounds
+    how stale a gate decision can be.
+    """
+
+    def __init__(self, ttl: float = ENTITLEMENT_CACHE_TTL_SECONDS,
+                 max_size: int = ENTITLEMENT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Entitlement]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Entitlement]:
+        with self._lock:
+            entitlement = self._entries.get(user_id)
+            if entitlement is None:
+                return None
+            if time.monotonic() - entitlement.loaded_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entitlement
+
+    def put(self, entitlement: Entitlement) -> None:
+        with self._lock:
+            self._entries[entitlement.user_id] = entitlement
+            self._entries.move_to_end(entitlement.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache shared by every request
+entitlements = EntitlementCache()
+
+
+def invalidate(*user_ids: int) -> None:
+    """Forget cached entitlements; with no ids, forget all of them"""
+    if user_ids:
+        entitlements.invalidate(user_ids)
+    else:
+        entitlements.clear()
+
+
+class EntitlementService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_entitlement(self, user_id: int) -> Entitlement:
+        """Get user's entitlement, from the cache when it is fresh"""
+        entitlement = entitlements.get(user_id)
+        if entitlement is None:
+            cache_requests.inc(result="miss")
+            entitlement = self._load(user_id)
+            entitlements.put(entitlement)
+            return entitlement
+
+        cache_requests.inc(result="hit")
+        cache_hit_age.inc(time.monotonic() - entitlement.loaded_at)
+        if random.random() < ENTITLEMENT_STALENESS_SAMPLE_RATE:
+            stale = not entitlement.same_as(self._load(user_id))
+            stale_checks.inc(stale=str(stale).lower())
+        return entitlement
+
+    def is_premium(self, user_id: int) -> bool:
+        """Whether user currently has an active subscription"""
+        return self.get_entitlement(user_id).is_active
+
+    def _load(self, user_id: int) -> Entitlement:
+        row = self.db.execute(
+            select(Subscription.status, Subscription.next_billing_date)
+            .where(Subscription.user_id == user_id)
+        ).first()
+        if row is None:
+            return Entitlement(user_id, None, None)
+        return Entitlement(user_id, row.status, row.next_billing_date)
@@ -0,0 +1,162 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.item import Item, ItemStatus
+from app.models.trade import Trade, TradeOffer, TradeOfferStatus, TradeStatus
+from app.services import matching_service
+from app.services.ledger_service import OFFER, TRADE, LedgerService, event
+from app.services.notification_service import notify
+from app.services.trade_service import TradeService
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+OFFER_TTL_HOURS = float(os.getenv("OFFER_TTL_HOURS", "336"))  # 14 days
+ABANDONED_TRADE_TTL_HOURS = float(os.getenv("ABANDONED_TRADE_TTL_HOURS", "720"))  # 30 days
+SWEEPER_BATCH_SIZE = int(os.getenv("SWEEPER_BATCH_SIZE", "500"))
+SWEEPER_MAX_BATCHES = int(os.getenv("SWEEPER_MAX_BATCHES", "100"))
+SWEEPER_INTERVAL_SECONDS = int(os.getenv("SWEEPER_INTERVAL_SECONDS", "300"))
+
+rows_processed = registry.counter(
+    "sweeper_rows_total", "Rows changed by the expiry sweeper", ["kind"])
+last_run_rows = registry.gauge(
+    "sweeper_last_run_rows", "Rows changed by the most recent sweeper run", ["kind"])
+last_run_seconds = registry.gauge(
+    "sweeper_last_run_seconds", "Duration of the most recent sweeper run")
+
+
+class ExpiryService:
+    """Expires stale offers and cancels abandoned trades in bounded batches
+
+    Each batch is one ``UPDATE ... WHERE id IN (SELECT ... LIMIT n FOR
+    UPDATE SKIP LOCKED)`` committed on its own, so rows never pass through
+    the ORM, locks are held briefly, and concurrent sweepers on other
+    instances skip each other's rows instead of waiting.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def expire_stale_offers(self, ttl: timedelta, batch_size: int = SWEEPER_BATCH_SIZE) -> List:
+        """Expire one batch of pending offers older than ttl"""
+        cutoff = datetime.now(timezone.utc) - ttl
+        stale = select(TradeOffer.id).where(
+            TradeOffer.status == TradeOfferStatus.PENDING,
+            TradeOffer.created_at < cutoff
+        ).order_by(TradeOffer.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        expired = self.db.execute(
+            update(TradeOffer).where(
+                TradeOffer.id.in_(stale),
+                TradeOffer.status == TradeOfferStatus.PENDING
+            ).values(
+                status=TradeOfferStatus.EXPIRED,
+                version=TradeOffer.version + 1,
+                responded_at=func.now()
+            ).returning(TradeOffer.id, TradeOffer.offerer_id, TradeOffer.item_owner_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        LedgerService(self.db).record(*(
+            event(OFFER, offer.id, "offer.expired", status=TradeOfferStatus.EXPIRED.value)
+            for offer in expired
+        ))
+        self.db.commit()
+
+        for offer in expired:
+            matching_service.offer_closed(offer.id)
+            notify([offer.offerer_id, offer.item_owner_id], "offer.expired", offer_id=offer.id)
+        return expired
+
+    def cancel_abandoned_trades(self, ttl: timedelta, batch_size: int = SWEEPER_BATCH_SIZE) -> List:
+        """Cancel one batch of accepted trades untouched for longer than ttl
+
+        Their items go back on the market.
+        """
+        cutoff = datetime.now(timezone.utc) - ttl
+        abandoned = select(Trade.id).where(
+            Trade.status == TradeStatus.ACCEPTED,
+            func.coalesce(Trade.updated_at, Trade.created_at) < cutoff
+        ).order_by(Trade.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        cancelled = self.db.execute(
+            update(Trade).where(
+                Trade.id.in_(abandoned),
+                Trade.status == TradeStatus.ACCEPTED
+            ).values(status=TradeStatus.CANCELLED)
+            .returning(Trade.id, Trade.item1_id, Trade.item2_id, Trade.user1_id, Trade.user2_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        TradeService(self.db).set_participant_status(
+            [trade.id for trade in cancelled], TradeStatus.CANCELLED)
+
+        item_ids = [item_id for trade in cancelled for item_id in (trade.item1_id, trade.item2_id)]
+        if item_ids:
+            self.db.execute(
+                update(Item).where(
+                    Item.id.in_(item_ids),
+                    Item.status == ItemStatus.TRADED
+                ).values(status=ItemStatus.ACTIVE)
+                .execution_options(synchronize_session=False)
+            )
+        LedgerService(self.db).record(*(
+            event(TRADE, trade.id, "trade.cancelled", status=TradeStatus.CANCELLED.value,
+                  reason="abandoned")
+            for trade in cancelled
+        ))
+        self.db.commit()
+
+        for trade in cancelled:
+            notify([trade.user1_id, trade.user2_id], "trade.cancelled", trade_id=trade.id)
+        return cancelled
+
+    def sweep(self, offer_ttl: timedelta, trade_ttl: timedelta,
+              batch_size: int = SWEEPER_BATCH_SIZE,
+              max_batches: int = SWEEPER_MAX_BATCHES) -> Dict[str, int]:
+        """Run batches until nothing is left or max_batches is reached"""
+        totals = {}
+        for kind, step, ttl in (
+            ("offers_expired", self.expire_stale_offers, offer_ttl),
+            ("trades_cancelled", self.cancel_abandoned_trades, trade_ttl),
+        ):
+            total = 0
+            for _ in range(max_batches):
+                changed = len(step(ttl, batch_size))
+                total += changed
+                if changed < batch_size:
+                    break
+            totals[kind] = total
+        return totals
+
+
+def run_sweep() -> Dict[str, int]:
+    """One scheduled sweeper run with its own session, recording metrics"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        totals = ExpiryService(db).sweep(
+            timedelta(hours=OFFER_TTL_HOURS), timedelta(hours=ABANDONED_TRADE_TTL_HOURS))
+    finally:
+        db.close()
+
+    duration = time.perf_counter() - started
+    for kind, total in totals.items():
+        rows_processed.inc(total, kind=kind)
+        last_run_rows.set(total, kind=kind)
+    last_run_seconds.set(duration)
+    logger.info("Expiry sweep finished in %.2fs: %s", duration, totals)
+    return totals
+
+
+if __name__ == "__main__":
+    # Allows running the sweeper from cron or Cloud Scheduler:
+    #   python -m app.services.expiry_service
+    logging.basicConfig(level=logging.INFO)
+    run_sweep()
@@ -1,7 +1,14 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.models.item import Item, ItemCategory
+from app.models.item import Item, ItemCategory, ItemPhoto
+from app.models.user import User
 from app.schemas.item import ItemCreate, ItemUpdate
-from typing import List, Optional
+from app.services.read_models import (
+    CATEGORY_COLUMNS, ITEM_COLUMNS, OWNER_COLUMNS, PHOTO_COLUMNS,
+    CategoryRecord, ItemRecord, PhotoRecord, UserSummaryRecord, primary_photo_url
+)
+from app.utils.fields import Fields
+from typing import Dict, List, Optional
 
 
 class ItemService:
@@ -37,26 +44,26 @@ class ItemService:
     def get_items(self, category_id: int = None, zip_code: str = None,
                   city: str = None, radius: float = None, latitude: float = None,
                   longitude: float = None, search_query: str = None,
-                  limit: int = 20, offset: int = 0) -> List[Item]:
-        """Get items with filters"""
-        query = self.db.query(Item).filter(Item.is_visible == True)
+                  limit: int = 20, offset: int = 0, fields: Fields = None) -> List[ItemRecord]:
+        """Get items with filters, as read-only records narrowed to fields"""
+        query = self._browse_query(fields).where(Item.is_visible == True)
 
         if category_id:
-            query = query.filter(Item.category_id == category_id)
+            query = query.where(Item.category_id == category_id)
 
         if zip_code:
-            query = query.filter(Item.zip_code == zip_code)
+            query = query.where(Item.zip_code == zip_code)
 
         if city:
-            query = query.filter(Item.city.ilike(f"%{city}%"))
+            query = query.where(Item.city.ilike(f"%{city}%"))
 
         if search_query:
-            query = query.filter(
+            query = query.where(
                 Item.title.ilike(f"%{search_query}%") |
                 Item.description.ilike(f"%{search_query}%")
             )
 
-        return query.offset(offset).limit(limit).all()
+        return self._records(query.offset(offset).limit(limit), fields)
 
     def update_item(self, item_id: int, item_update: ItemUpdate, user_id: int) -> Optional[Item]:
         """Update item"""
@@ -82,11 +89,12 @@ class ItemService:
         self.db.commit()
         return True
 
-    def get_user_items(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Item]:
-        """Get items by user"""
-        return self.db.query(Item).filter(
+    def get_user_items(self, user_id: int, limit: int = 20, offset: int = 0,
+                       fields: Fields = None) -> List[ItemRecord]:
+        """Get items by user, as read-only records narrowed to fields"""
+        return self._records(self._browse_query(fields).where(
             Item.owner_id == user_id
-        ).offset(offset).limit(limit).all()
+        ).offset(offset).limit(limit), fields)
 
     def upload_photos(self, item_id: int, photos: List, user_id: int) -> bool:
         """Upload photos for an item"""
@@ -96,3 +104,65 @@ class ItemService:
 
         # TODO: Implement actual photo upload
         return True
+
+    @staticmethod
+    def _browse_query(fields: Fields = None):
+        """Columns for browse pages, joining owner and category only when returned"""
+        query = select(*(column for column in ITEM_COLUMNS
+                         if fields is None or column.key in fields))
+        if fields is None or "owner" in fields:
+            query = query.add_columns(*OWNER_COLUMNS).join(User, User.id == Item.owner_id)
+        if fields is None or "category" in fields:
+            query = query.add_columns(*CATEGORY_COLUMNS).join(
+                ItemCategory, ItemCategory.id == Item.category_id)
+        return query.order_by(Item.id)
+
+    def _photos(self, item_ids: List[int]) -> Dict[int, List[PhotoRecord]]:
+        photos: Dict[int, List[PhotoRecord]] = {}
+        for item_id, *photo in self.db.execute(
+            select(*PHOTO_COLUMNS).where(ItemPhoto.item_id.in_(item_ids))
+            .order_by(ItemPhoto.item_id, ItemPhoto.order_index, ItemPhoto.id)
+        ):
+            photos.setdefault(item_id, []).append(PhotoRecord(*photo))
+        return photos
+
+    def _records(self, query, fields: Fields = None) -> List:
+        """Run a browse query and attach photos with one more query
+
+        Full pages are ItemRecords; pages narrowed to fields are dicts
+        holding just those fields.
+        """
+        rows = self.db.execute(query).all()
+        if not rows:
+            return []
+
+        photos = {}
+        if fields is None or fields & {"photos", "primary_photo_url"}:
+            photos = self._photos([row[0] for row in rows])
+
+        if fields is None:
+            items = len(ITEM_COLUMNS)
+            owner = items + len(OWNER_COLUMNS)
+            return [
+                ItemRecord(*row[:items], UserSummaryRecord(*row[items:owner]),
+                           CategoryRecord(*row[owner:]), photos.get(row[0], []),
+                           primary_photo_url(photos.get(row[0], [])))
+                for row in rows
+            ]
+
+        names = [column.key for column in ITEM_COLUMNS if column.key in fields]
+        records = []
+        for row in rows:
+            record = dict(zip(names, row))
+            position = len(names)
+            if "owner" in fields:
+                record["owner"] = UserSummaryRecord(*row[position:position + len(OWNER_COLUMNS)])
+                position += len(OWNER_COLUMNS)
+            if "category" in fields:
+                record["category"] = CategoryRecord(*row[position:])
+            if "photos" in fields:
+                record["photos"] = photos.get(row[0], [])
+            if "primary_photo_url" in fields:
+                record["primary_photo_url"] = primary_photo_url(photos.get(row[0], []))
+            records.append(record)
+        return records
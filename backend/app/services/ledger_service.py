@@ -0,0 +1,229 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.trade_event import TradeEvent, TradeSnapshot
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+OFFER = "offer"
+TRADE = "trade"
+
+# A stream is snapshotted once this many events follow its last snapshot
+LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "20"))
+# Events older than this are folded into snapshots and deleted
+LEDGER_RETENTION_DAYS = float(os.getenv("LEDGER_RETENTION_DAYS", "30"))
+LEDGER_COMPACTION_BATCH_SIZE = int(os.getenv("LEDGER_COMPACTION_BATCH_SIZE", "500"))
+LEDGER_COMPACTION_INTERVAL_SECONDS = int(os.getenv("LEDGER_COMPACTION_INTERVAL_SECONDS", "3600"))
+LEDGER_HISTORY_PAGE_SIZE = 50
+
+compacted_rows = registry.counter(
+    "ledger_compaction_rows_total", "Ledger rows changed by compaction", ["kind"])
+
+
+def event(aggregate_type: str, aggregate_id: int, event_type: str,
+          actor_id: Optional[int] = None, **data) -> dict:
+    """Build an event row for LedgerService.record"""
+    return {
+        "aggregate_type": aggregate_type,
+        "aggregate_id": aggregate_id,
+        "event_type": event_type,
+        "actor_id": actor_id,
+        "data": data,
+    }
+
+
+def apply_event(state: dict, data: Optional[dict]) -> dict:
+    """Fold one event into a stream's state
+
+    State is {"data": latest value of every field, "event_count": events
+    folded}; its size doesn't grow with the stream. The transition log
+    itself is read from trade_events.
+    """
+    return {
+        "data": {**state.get("data", {}), **(data or {})},
+        "event_count": state.get("event_count", 0) + 1,
+    }
+
+
+def _upsert(dialect: str):
+    """insert() of the dialect in use, which supports ON CONFLICT"""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(TradeSnapshot)
+
+
+class LedgerService:
+    """Append-only trade event ledger with per-stream snapshots
+
+    Transitions append events inside the caller's transaction. Reading a
+    stream's state costs one snapshot lookup plus the short tail of events
+    written since, however long the stream's history is.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, *events: dict) -> None:
+        """Append events in the current transaction; the caller commits"""
+        if events:
+            self.db.execute(insert(TradeEvent), list(events))
+
+    def get_history(self, aggregate_type: str, aggregate_id: int, before: Optional[int] = None,
+                    limit: int = LEDGER_HISTORY_PAGE_SIZE) -> Optional[dict]:
+        """Current state of a stream and a page of its transition log
+
+        Events come oldest first: the latest limit events, or those before
+        event id before. next_before pages further back while events
+        remain; those removed by compaction are only counted in
+        event_count. Returns None if the stream has no events.
+        """
+        state, last_event_id = self._snapshot_state(aggregate_type, aggregate_id)
+        tail = self._events_after(aggregate_type, aggregate_id, last_event_id)
+        if last_event_id == 0 and not tail:
+            return None
+        for row in tail:
+            state = apply_event(state, row.data)
+
+        query = select(
+            TradeEvent.id, TradeEvent.event_type, TradeEvent.actor_id, TradeEvent.created_at
+        ).where(
+            TradeEvent.aggregate_type == aggregate_type,
+            TradeEvent.aggregate_id == aggregate_id
+        )
+        if before is not None:
+            query = query.where(TradeEvent.id < before)
+        page = self.db.execute(query.order_by(TradeEvent.id.desc()).limit(limit + 1)).all()
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+
+        return {
+            "aggregate_type": aggregate_type,
+            "aggregate_id": aggregate_id,
+            "status": state["data"].get("status"),
+            "data": state["data"],
+            "event_count": state["event_count"],
+            "events": [{"id": row.id, "type": row.event_type, "actor_id": row.actor_id,
+                        "at": row.created_at} for row in page],
+            "next_before": page[0].id if has_more else None,
+        }
+
+    def _snapshot_state(self, aggregate_type: str, aggregate_id: int):
+        snapshot = self.db.execute(
+            select(TradeSnapshot.last_event_id, TradeSnapshot.state).where(
+                TradeSnapshot.aggregate_type == aggregate_type,
+                TradeSnapshot.aggregate_id == aggregate_id
+            )
+        ).first()
+        if snapshot is None:
+            return {}, 0
+        return snapshot.state, snapshot.last_event_id
+
+    def _events_after(self, aggregate_type: str, aggregate_id: int, last_event_id: int) -> List:
+        return self.db.execute(
+            select(TradeEvent.id, TradeEvent.data).where(
+                TradeEvent.aggregate_type == aggregate_type,
+                TradeEvent.aggregate_id == aggregate_id,
+                TradeEvent.id > last_event_id
+            ).order_by(TradeEvent.id)
+        ).all()
+
+    def snapshot(self, aggregate_type: str, aggregate_id: int) -> None:
+        """Fold a stream's tail into its snapshot; the caller commits
+
+        Written as an upsert that only moves a snapshot forward, so workers
+        compacting the same stream at once neither conflict on the unique
+        stream key nor overwrite a newer snapshot.
+        """
+        state, last_event_id = self._snapshot_state(aggregate_type, aggregate_id)
+        tail = self._events_after(aggregate_type, aggregate_id, last_event_id)
+        if not tail:
+            return
+        for row in tail:
+            state = apply_event(state, row.data)
+
+        upsert = _upsert(self.db.get_bind().dialect.name).values(
+            aggregate_type=aggregate_type, aggregate_id=aggregate_id,
+            last_event_id=tail[-1].id, state=state
+        )
+        self.db.execute(upsert.on_conflict_do_update(
+            index_elements=[TradeSnapshot.aggregate_type, TradeSnapshot.aggregate_id],
+            set_={"state": upsert.excluded.state,
+                  "last_event_id": upsert.excluded.last_event_id,
+                  "updated_at": func.now()},
+            where=TradeSnapshot.last_event_id < upsert.excluded.last_event_id
+        ))
+
+    def compact(self, retention: timedelta, snapshot_every: int = LEDGER_SNAPSHOT_EVERY,
+                batch_size: int = LEDGER_COMPACTION_BATCH_SIZE) -> Dict[str, int]:
+        """Snapshot long or old streams, then delete events their snapshots cover
+
+        Only events older than retention are deleted, so recent history
+        stays queryable row by row. Each call handles at most batch_size
+        streams and batch_size deleted events.
+        """
+        cutoff = datetime.now(timezone.utc) - retention
+        stream = and_(TradeSnapshot.aggregate_type == TradeEvent.aggregate_type,
+                      TradeSnapshot.aggregate_id == TradeEvent.aggregate_id)
+
+        due = self.db.execute(
+            select(TradeEvent.aggregate_type, TradeEvent.aggregate_id)
+            .outerjoin(TradeSnapshot, stream)
+            .where(or_(TradeSnapshot.id.is_(None),
+                       TradeEvent.id > TradeSnapshot.last_event_id))
+            .group_by(TradeEvent.aggregate_type, TradeEvent.aggregate_id)
+            .having(or_(func.count() >= snapshot_every,
+                        func.min(TradeEvent.created_at) < cutoff))
+            .limit(batch_size)
+        ).all()
+        for aggregate_type, aggregate_id in due:
+            self.snapshot(aggregate_type, aggregate_id)
+
+        covered = select(TradeEvent.id).join(TradeSnapshot, stream).where(
+            TradeEvent.id <= TradeSnapshot.last_event_id,
+            TradeEvent.created_at < cutoff
+        ).order_by(TradeEvent.id).limit(batch_size)
+        deleted = self.db.execute(
+            delete(TradeEvent).where(TradeEvent.id.in_(covered))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        return {"snapshotted": len(due), "deleted": deleted}
+
+
+def run_compaction(max_batches: int = 100) -> Dict[str, int]:
+    """One scheduled compaction run with its own session"""
+    started = time.perf_counter()
+    totals = {"snapshotted": 0, "deleted": 0}
+    db = SessionLocal()
+    try:
+        ledger = LedgerService(db)
+        for _ in range(max_batches):
+            changed = ledger.compact(timedelta(days=LEDGER_RETENTION_DAYS))
+            for kind, count in changed.items():
+                totals[kind] += count
+            if max(changed.values()) < LEDGER_COMPACTION_BATCH_SIZE:
+                break
+    finally:
+        db.close()
+
+    for kind, total in totals.items():
+        compacted_rows.inc(total, kind=kind)
+    logger.info("Ledger compaction finished in %.2fs: %s",
+                time.perf_counter() - started, totals)
+    return totals
+
+
+if __name__ == "__main__":
+    #   python -m app.services.ledger_service
+    logging.basicConfig(level=logging.INFO)
+    run_compaction()
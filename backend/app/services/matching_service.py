@@ -0,0 +1,279 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.trade import TradeOffer, TradeOfferStatus
+from app.utils.metrics import registry
+
+Edge = Tuple[int, int]
+Cycle = Tuple[int, ...]
+
+
+class CycleMatcher:
+    """In-memory want-graph with incremental detection of multi-party trade cycles
+
+    Nodes are items. A pending offer adds an edge offered_item -> item,
+    meaning the owner of offered_item wants item. A cycle a -> b -> c -> a
+    is therefore a loop in which every owner receives the next item and
+    gives their own item to the previous owner.
+
+    Cycles are only searched through the edge that changed, so an update
+    costs O(d^(max_length - 2)) for average out-degree d instead of a scan
+    of the whole graph.
+    """
+
+    def __init__(self, min_length: int = 3, max_length: int = 4,
+                 max_cycles_per_update: int = 1000):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_cycles_per_update = max_cycles_per_update
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop the whole graph"""
+        with self._lock:
+            self._offers: Dict[int, Edge] = {}
+            self._edge_offers: Dict[Edge, Set[int]] = defaultdict(set)
+            self._out: Dict[int, Set[int]] = defaultdict(set)
+            self._in: Dict[int, Set[int]] = defaultdict(set)
+            self._owners: Dict[int, int] = {}
+            self._cycles: Set[Cycle] = set()
+            self._edge_cycles: Dict[Edge, Set[Cycle]] = defaultdict(set)
+            self._owner_cycles: Dict[int, Set[Cycle]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def add_offer(self, offer_id: int, offered_item_id: int, offerer_id: int,
+                  item_id: int, item_owner_id: int) -> List[Cycle]:
+        """Add a pending offer and return the cycles it completes"""
+        with self._lock:
+            if offer_id in self._offers or offered_item_id == item_id:
+                return []
+
+            edge = (offered_item_id, item_id)
+            self._offers[offer_id] = edge
+            self._owners[offered_item_id] = offerer_id
+            self._owners[item_id] = item_owner_id
+
+            is_new_edge = not self._edge_offers[edge]
+            self._edge_offers[edge].add(offer_id)
+            if not is_new_edge:
+                return []
+
+            self._out[offered_item_id].add(item_id)
+            self._in[item_id].add(offered_item_id)
+
+            found = []
+            for cycle in self._cycles_through(offered_item_id, item_id):
+                if cycle not in self._cycles:
+                    self._register(cycle)
+                    found.append(cycle)
+            return found
+
+    def remove_offer(self, offer_id: int) -> int:
+        """Remove an offer and return how many cycles it broke"""
+        with self._lock:
+            edge = self._offers.pop(offer_id, None)
+            if edge is None:
+                return 0
+
+            offers = self._edge_offers[edge]
+            offers.discard(offer_id)
+            if offers:
+                return 0
+
+            del self._edge_offers[edge]
+            source, target = edge
+            self._out[source].discard(target)
+            self._in[target].discard(source)
+
+            broken = list(self._edge_cycles.pop(edge, ()))
+            for cycle in broken:
+                self._unregister(cycle)
+            return len(broken)
+
+    def cycles_for_owner(self, user_id: int) -> List[Cycle]:
+        """Cycles in which user gives one of their items"""
+        with self._lock:
+            return sorted(self._owner_cycles.get(user_id, ()))
+
+    def legs(self, cycle: Cycle) -> List[dict]:
+        """Describe who gives and receives what in a cycle"""
+        with self._lock:
+            legs = []
+            for index, item_id in enumerate(cycle):
+                wanted_item_id = cycle[(index + 1) % len(cycle)]
+                edge = (item_id, wanted_item_id)
+                legs.append({
+                    "user_id": self._owners[item_id],
+                    "gives_item_id": item_id,
+                    "receives_item_id": wanted_item_id,
+                    "offer_id": min(self._edge_offers[edge]),
+                })
+            return legs
+
+    def _cycles_through(self, source: int, target: int) -> List[Cycle]:
+        """Simple cycles of allowed length containing the edge source -> target
+
+        Walks forward from target looking for a node with an edge back to
+        source. Items in a cycle must belong to distinct owners.
+        """
+        found: List[Cycle] = []
+        predecessors = self._in[source]
+        if not predecessors:
+            return found
+
+        path = [source, target]
+        owners = {self._owners[source], self._owners[target]}
+        if len(owners) < 2:
+            return found
+
+        def extend(node: int) -> bool:
+            if len(path) >= self.min_length and node in predecessors:
+                found.append(self._canonical(path))
+                if len(found) >= self.max_cycles_per_update:
+                    return False
+            if len(path) >= self.max_length:
+                return True
+            for following in self._out[node]:
+                if following in path:
+                    continue
+                owner = self._owners[following]
+                if owner in owners:
+                    continue
+                path.append(following)
+                owners.add(owner)
+                keep_going = extend(following)
+                owners.discard(owner)
+                path.pop()
+                if not keep_going:
+                    return False
+            return True
+
+        extend(target)
+        return found
+
+    @staticmethod
+    def _canonical(path: List[int]) -> Cycle:
+        """Rotate a cycle so that it starts at its smallest item"""
+        start = path.index(min(path))
+        return tuple(path[start:] + path[:start])
+
+    def _register(self, cycle: Cycle) -> None:
+        self._cycles.add(cycle)
+        for index, item_id in enumerate(cycle):
+            edge = (item_id, cycle[(index + 1) % len(cycle)])
+            self._edge_cycles[edge].add(cycle)
+            self._owner_cycles[self._owners[item_id]].add(cycle)
+
+    def _unregister(self, cycle: Cycle) -> None:
+        self._cycles.discard(cycle)
+        for index, item_id in enumerate(cycle):
+            edge = (item_id, cycle[(index + 1) % len(cycle)])
+            edge_cycles = self._edge_cycles.get(edge)
+            if edge_cycles is not None:
+                edge_cycles.discard(cycle)
+                if not edge_cycles:
+                    del self._edge_cycles[edge]
+            owner_cycles = self._owner_cycles.get(self._owners[item_id])
+            if owner_cycles is not None:
+                owner_cycles.discard(cycle)
+
+
+# Process-wide matcher, kept in sync by TradeService and reloaded from the
+# database every CYCLE_MATCHER_REFRESH_SECONDS by the cycle_matcher job so
+# that workers converge on each other's changes
+cycle_matcher = CycleMatcher(
+    max_length=int(os.getenv("TRADE_CYCLE_MAX_LENGTH", "4"))
+)
+CYCLE_MATCHER_REFRESH_SECONDS = int(os.getenv("CYCLE_MATCHER_REFRESH_SECONDS", "300"))
+_loaded_at: Optional[float] = None
+_load_lock = threading.Lock()
+
+matcher_requests = registry.counter(
+    "cycle_matcher_requests_total", "Cycle lookups served from memory or after a rebuild",
+    ["result"])
+
+
+def invalidate() -> None:
+    """Drop the matcher so it is rebuilt from the database on next use"""
+    global _loaded_at
+    _loaded_at = None
+    cycle_matcher.clear()
+
+
+def offer_opened(offer: TradeOffer) -> None:
+    """Add a newly created pending offer to the matcher"""
+    if _loaded_at is not None:
+        cycle_matcher.add_offer(offer.id, offer.offered_item_id, offer.offerer_id,
+                                offer.item_id, offer.item_owner_id)
+
+
+def offer_closed(offer_id: int) -> None:
+    """Remove an offer that is no longer pending from the matcher"""
+    if _loaded_at is not None:
+        cycle_matcher.remove_offer(offer_id)
+
+
+class MatchingService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_open_offers(self) -> None:
+        """Rebuild the matcher from all pending offers
+
+        The new graph is built aside and swapped in, so lookups keep
+        reading the old one meanwhile.
+        """
+        global cycle_matcher, _loaded_at
+        rows = self.db.execute(
+            select(TradeOffer.id, TradeOffer.offered_item_id, TradeOffer.offerer_id,
+                   TradeOffer.item_id, TradeOffer.item_owner_id)
+            .where(TradeOffer.status == TradeOfferStatus.PENDING)
+        ).all()
+
+        matcher = CycleMatcher(cycle_matcher.min_length, cycle_matcher.max_length,
+                               cycle_matcher.max_cycles_per_update)
+        for row in rows:
+            matcher.add_offer(*row)
+        cycle_matcher = matcher
+        _loaded_at = time.monotonic()
+
+    def get_user_cycles(self, user_id: int) -> List[dict]:
+        """Get trade cycles the user can take part in"""
+        if _loaded_at is None:
+            with _load_lock:
+                if _loaded_at is None:
+                    self.load_open_offers()
+            matcher_requests.inc(result="rebuild")
+        else:
+            matcher_requests.inc(result="hit")
+
+        # One graph for the whole answer, even if a reload swaps it meanwhile
+        matcher = cycle_matcher
+        return [
+            {"length": len(cycle), "legs": matcher.legs(cycle)}
+            for cycle in matcher.cycles_for_owner(user_id)
+        ]
+
+
+def refresh_matcher() -> int:
+    """Reload the matcher from all pending offers; returns how many there are
+
+    Run by the cycle_matcher job so workers converge on each other's
+    changes without a request paying for the reload.
+    """
+    db = SessionLocal()
+    try:
+        MatchingService(db).load_open_offers()
+    finally:
+        db.close()
+    return len(cycle_matcher)
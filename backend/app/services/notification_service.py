@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import select
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Events queued per connection before the oldest are dropped
+SUBSCRIPTION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "100"))
+# Events waiting for the Postgres publisher before new ones are dropped
+PUBLISH_QUEUE_SIZE = int(os.getenv("NOTIFICATION_PUBLISH_QUEUE_SIZE", "10000"))
+
+
+class Subscription:
+    """One connection's queue of events for a user
+
+    Must be created on the event loop that will consume it; events may be
+    delivered from any thread.
+    """
+
+    def __init__(self, user_id: int, maxsize: int = SUBSCRIPTION_QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def put(self, event: dict) -> None:
+        """Queue an event, dropping the oldest one if the client is behind"""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """In-process pub/sub; delivers events to subscribers in this worker only"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_ids: Iterable[int], event: dict) -> None:
+        """Send an event to every connection of the given users"""
+        self.deliver(user_ids, event)
+
+    def deliver(self, user_ids: Iterable[int], event: dict) -> None:
+        """Hand an event to this worker's subscribers"""
+        with self._lock:
+            targets = [subscription for user_id in set(user_ids)
+                       for subscription in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's event loop has already shut down
+                self.unsubscribe(subscription)
+
+
+class PostgresBroker(LocalBroker):
+    """Fans events out across workers with Postgres LISTEN/NOTIFY
+
+    Every worker listens on one channel and delivers what it hears to its
+    own subscribers, including events it published itself.
+    """
+
+    def __init__(self, dsn: str, channel: str = "trade_me_events"):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._publish_connection = None
+        self._outbox: "queue.Queue[Optional[str]]" = queue.Queue(PUBLISH_QUEUE_SIZE)
+        self._publisher: Optional[threading.Thread] = None
+        self._publisher_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="notification-listener", daemon=True)
+        self._listener.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._listener is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._listener.join, 5)
+        with self._publisher_lock:
+            publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            self._outbox.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, publisher.join, 5)
+
+    def publish(self, user_ids: Iterable[int], event: dict) -> None:
+        """Queue an event for the publisher thread; never waits on Postgres
+
+        Callers publish after committing, so request handlers don't pay a
+        NOTIFY round trip on top of their own transaction.
+        """
+        payload = json.dumps({"user_ids": sorted(set(user_ids)), "event": event})
+        with self._publisher_lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(
+                    target=self._send_queued, name="notification-publisher", daemon=True)
+                self._publisher.start()
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            logger.warning("Notification outbox full, dropping event %s", event.get("type"))
+
+    def _send_queued(self) -> None:
+        while True:
+            payload = self._outbox.get()
+            if payload is None:
+                break
+            try:
+                if self._publish_connection is None or self._publish_connection.closed:
+                    self._publish_connection = self._connect()
+                with self._publish_connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            except Exception as e:
+                logger.warning("Failed to publish notification: %s", e)
+                self._publish_connection = None
+        if self._publish_connection is not None:
+            self._publish_connection.close()
+            self._publish_connection = None
+
+    def _listen(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                while not self._stopping.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        message = json.loads(connection.notifies.pop(0).payload)
+                        self.deliver(message["user_ids"], message["event"])
+                connection.close()
+            except Exception as e:
+                logger.warning("Notification listener error, reconnecting: %s", e)
+                self._stopping.wait(1.0)
+
+
+def create_broker() -> LocalBroker:
+    """Broker selected by NOTIFICATION_BROKER ("local" or "postgres")"""
+    if os.getenv("NOTIFICATION_BROKER", "local") == "postgres":
+        from app.database import DATABASE_URL
+        return PostgresBroker(DATABASE_URL.replace("postgresql+psycopg2://", "postgresql://"))
+    return LocalBroker()
+
+
+broker = create_broker()
+
+
+def notify(user_ids: Iterable[int], event_type: str, **data) -> None:
+    """Publish an event to the given users' open notification channels"""
+    event = {
+        "type": event_type,
+        "at": datetime.now(timezone.utc).isoformat(),
+        **data,
+    }
+    broker.publish(user_ids, event)
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
-from app.models.subscription import Subscription
+from app.models.subscription import PaymentProvider, Subscription, SubscriptionStatus
+from app.services import entitlement_service
+from app.services.renewal_service import first_billing_date
 from typing import Optional
 
 
@@ -12,15 +14,17 @@ class PaymentService:
         # Mock implementation for development
         subscription = Subscription(
             user_id=user_id,
-            payment_provider="stripe",
+            payment_provider=PaymentProvider.STRIPE,
             provider_subscription_id="sub_mock_123",
             provider_customer_id="cus_mock_123",
-            status="active"
+            status=SubscriptionStatus.ACTIVE,
+            next_billing_date=first_billing_date(user_id)
         )
 
         self.db.add(subscription)
         self.db.commit()
         self.db.refresh(subscription)
+        entitlement_service.invalidate(user_id)
         return subscription
 
     def create_paypal_subscription(self, user_id: int) -> Optional[Subscription]:
@@ -28,15 +32,17 @@ class PaymentService:
         # Mock implementation for development
         subscription = Subscription(
             user_id=user_id,
-            payment_provider="paypal",
+            payment_provider=PaymentProvider.PAYPAL,
             provider_subscription_id="sub_mock_456",
             provider_customer_id="cus_mock_456",
-            status="active"
+            status=SubscriptionStatus.ACTIVE,
+            next_billing_date=first_billing_date(user_id)
         )
 
         self.db.add(subscription)
         self.db.commit()
         self.db.refresh(subscription)
+        entitlement_service.invalidate(user_id)
         return subscription
 
     def get_subscription(self, user_id: int) -> Optional[Subscription]:
@@ -49,16 +55,7 @@ class PaymentService:
         if not subscription:
             return False
 
-        subscription.status = "cancelled"
+        subscription.status = SubscriptionStatus.CANCELLED
         self.db.commit()
-        return True
-
-    def handle_stripe_webhook(self, request: dict) -> bool:
-        """Handle Stripe webhook"""
-        # Mock implementation
-        return True
-
-    def handle_paypal_webhook(self, request: dict) -> bool:
-        """Handle PayPal webhook"""
-        # Mock implementation
+        entitlement_service.invalidate(user_id)
         return True
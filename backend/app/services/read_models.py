@@ -0,0 +1,127 @@
+"""Lightweight records for read-only pages
+
+Browse queries select only the columns a response needs through
+SQLAlchemy Core and pack each row into one of these named tuples, so no
+ORM instances, identity-map entries or lazy loaders are created. The
+response serializers read them by attribute like ORM objects.
+"""
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import Float, cast, func
+
+from app.models.item import Item, ItemCategory, ItemPhoto
+from app.models.review import UserReputation
+from app.models.user import User
+
+
+class UserSummaryRecord(NamedTuple):
+    id: int
+    username: str
+    full_name: str
+    profile_picture: Optional[str]
+    city: Optional[str]
+    state: Optional[str]
+
+
+class CategoryRecord(NamedTuple):
+    id: int
+    name: str
+    description: Optional[str]
+    icon: Optional[str]
+
+
+class PhotoRecord(NamedTuple):
+    id: int
+    photo_url: str
+    is_primary: bool
+    order_index: int
+    created_at: datetime
+
+
+class ItemRecord(NamedTuple):
+    id: int
+    title: str
+    description: str
+    condition: str
+    zip_code: str
+    city: str
+    state: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    status: Any
+    is_visible: bool
+    owner_id: int
+    category_id: int
+    created_at: datetime
+    updated_at: Optional[datetime]
+    owner: UserSummaryRecord
+    category: CategoryRecord
+    photos: List[PhotoRecord]
+    primary_photo_url: Optional[str]
+
+
+class UserProfileRecord(NamedTuple):
+    id: int
+    email: str
+    username: str
+    full_name: str
+    phone_number: Optional[str]
+    zip_code: Optional[str]
+    city: Optional[str]
+    state: Optional[str]
+    bio: Optional[str]
+    phone_verified: bool
+    is_active: bool
+    is_verified: bool
+    profile_picture: Optional[str]
+    created_at: datetime
+    last_login: Optional[datetime]
+    average_rating: Optional[float]
+    reputation_score: Optional[float]
+    reviews_count: int
+    items_count: int = 0
+    trades_completed: int = 0
+
+
+def primary_photo_url(photos: List[PhotoRecord]) -> Optional[str]:
+    """Photo shown in list views: the one marked primary, else the first"""
+    for photo in photos:
+        if photo.is_primary:
+            return photo.photo_url
+    return photos[0].photo_url if photos else None
+
+
+# Selected columns, in record field order
+ITEM_COLUMNS = (
+    Item.id, Item.title, Item.description, Item.condition, Item.zip_code, Item.city,
+    Item.state, Item.latitude, Item.longitude, Item.status, Item.is_visible,
+    Item.owner_id, Item.category_id, Item.created_at, Item.updated_at,
+)
+OWNER_COLUMNS = (
+    User.id, User.username, User.full_name, User.profile_picture, User.city, User.state,
+)
+CATEGORY_COLUMNS = (
+    ItemCategory.id, ItemCategory.name, ItemCategory.description, ItemCategory.icon,
+)
+PHOTO_COLUMNS = (
+    ItemPhoto.item_id, ItemPhoto.id, ItemPhoto.photo_url, ItemPhoto.is_primary,
+    ItemPhoto.order_index, ItemPhoto.created_at,
+)
+PROFILE_COLUMNS = (
+    User.id, User.email, User.username, User.full_name, User.phone_number, User.zip_code,
+    User.city, User.state, User.bio, User.phone_verified, User.is_active, User.is_verified,
+    User.profile_picture, User.created_at, User.last_login,
+    # Plain mean of the rating histogram; None until the first review
+    (cast(UserReputation.ratings_1 + 2 * UserReputation.ratings_2
+          + 3 * UserReputation.ratings_3 + 4 * UserReputation.ratings_4
+          + 5 * UserReputation.ratings_5, Float)
+     / func.nullif(UserReputation.review_count, 0)).label("average_rating"),
+    User.reputation_score,
+    func.coalesce(UserReputation.review_count, 0).label("reviews_count"),
+)
+# Columns of the item and user summaries embedded in other responses
+ITEM_SUMMARY_COLUMNS = (
+    Item.id, Item.title, Item.condition, Item.city, Item.state, Item.status, Item.owner_id,
+)
+USER_SUMMARY_COLUMNS = OWNER_COLUMNS
@@ -0,0 +1,258 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.item import Item, ItemStatus
+from app.models.user import User
+from app.models.trade import TradeOffer
+from app.utils.metrics import registry
+
+# Item conditions from best to worst; unknown values count as "Good"
+CONDITIONS = ["New", "Like New", "Good", "Fair", "Poor"]
+DEFAULT_CONDITION_RANK = CONDITIONS.index("Good")
+
+RECOMMENDATION_REFRESH_SECONDS = int(os.getenv("RECOMMENDATION_REFRESH_SECONDS", "600"))
+DISTANCE_SCALE_KM = float(os.getenv("RECOMMENDATION_DISTANCE_SCALE_KM", "50"))
+EARTH_RADIUS_KM = 6371.0
+
+matrix_requests = registry.counter(
+    "recommendation_matrix_requests_total",
+    "Feature matrix lookups served from memory or rebuilt", ["result"])
+
+# Relative weight of each score component
+WEIGHTS = {
+    "category": 0.4,
+    "condition": 0.2,
+    "distance": 0.25,
+    "rating": 0.15,
+}
+
+
+class ItemFeatureMatrix:
+    """Column-oriented features of every active listing
+
+    Scoring a user against the catalog is a handful of NumPy operations
+    over these arrays rather than a Python loop per item. Everything that
+    doesn't depend on the user is precomputed when the matrix is built.
+    """
+
+    def __init__(self, item_ids: np.ndarray, owner_ids: np.ndarray,
+                 category_ids: np.ndarray, condition_ranks: np.ndarray,
+                 latitudes: np.ndarray, longitudes: np.ndarray,
+                 owner_ratings: np.ndarray):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.owner_ids = np.asarray(owner_ids, dtype=np.int64)
+        self.category_ids = np.asarray(category_ids, dtype=np.int32)
+        self.condition_ranks = np.asarray(condition_ranks, dtype=np.int32)
+        self.category_count = int(self.category_ids.max()) + 1 if len(self.item_ids) else 1
+        self.built_at = time.monotonic()
+
+        # Owner lookup without scanning the catalog
+        self._owner_order = np.argsort(self.owner_ids, kind="stable")
+        self._sorted_owners = self.owner_ids[self._owner_order]
+
+        # Category and condition scores come from one (category, condition) table
+        self._feature_index = self.category_ids * len(CONDITIONS) + self.condition_ranks
+
+        # Coordinates in radians; unknown locations are zeroed and scored neutrally
+        latitudes = np.radians(np.asarray(latitudes, dtype=np.float32))
+        longitudes = np.radians(np.asarray(longitudes, dtype=np.float32))
+        self._has_location = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self._unknown_location = np.flatnonzero(~self._has_location)
+        self.latitudes = np.nan_to_num(latitudes)
+        self.longitudes = np.nan_to_num(longitudes)
+
+        # Owner rating (scaled to 0..1) is user independent
+        self._rating_score = WEIGHTS["rating"] * np.asarray(owner_ratings, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def from_database(cls, db: Session) -> "ItemFeatureMatrix":
+        """Build the matrix from all visible, active items"""
+        rows = db.execute(
+            select(Item.id, Item.owner_id, Item.category_id, Item.condition,
+                   Item.latitude, Item.longitude, User.reputation_score)
+            .join(User, User.id == Item.owner_id)
+            .where(Item.status == ItemStatus.ACTIVE, Item.is_visible == True)  # noqa: E712
+            .order_by(Item.id)
+        ).all()
+
+        condition_ranks = {name: rank for rank, name in enumerate(CONDITIONS)}
+        columns = list(zip(*rows)) if rows else [()] * 7
+        item_ids, owner_ids, category_ids, conditions, latitudes, longitudes, ratings = columns
+        return cls(
+            item_ids=item_ids,
+            owner_ids=owner_ids,
+            category_ids=category_ids,
+            condition_ranks=[condition_ranks.get(condition, DEFAULT_CONDITION_RANK)
+                             for condition in conditions],
+            latitudes=[np.nan if value is None else value for value in latitudes],
+            longitudes=[np.nan if value is None else value for value in longitudes],
+            # Owners without reviews get a neutral 3/5
+            owner_ratings=[((rating or 3.0) - 1.0) / 4.0 for rating in ratings],
+        )
+
+    def owned_by(self, user_id: int) -> np.ndarray:
+        """Row indexes of the user's items"""
+        start, stop = np.searchsorted(self._sorted_owners, [user_id, user_id + 1])
+        return self._owner_order[start:stop]
+
+    def recommend(self, user_id: int, wanted_categories: Dict[int, int],
+                  limit: int = 20) -> List[dict]:
+        """Top listings for the user's active items
+
+        wanted_categories maps category id to the number of offers the user
+        has made on items of that category.
+        """
+        own = self.owned_by(user_id)
+        if not len(own):
+            return []
+
+        # Category affinity: categories the user has asked for, then the
+        # categories they list themselves
+        affinity = np.bincount(self.category_ids[own],
+                               minlength=self.category_count).astype(np.float32)
+        for category_id, count in wanted_categories.items():
+            if 0 <= category_id < self.category_count:
+                affinity[category_id] += 2.0 * count
+        affinity /= affinity.max()
+
+        # Condition compatibility against the closest-condition item the user owns
+        own_ranks, first = np.unique(self.condition_ranks[own], return_index=True)
+        gaps = np.abs(np.arange(len(CONDITIONS))[:, None] - own_ranks[None, :])
+        condition_score = 1.0 - gaps.min(axis=1) / (len(CONDITIONS) - 1)
+        matched_by_rank = self.item_ids[own[first]][gaps.argmin(axis=1)]
+
+        table = (WEIGHTS["category"] * affinity[:, None]
+                 + WEIGHTS["condition"] * condition_score[None, :]).astype(np.float32)
+        score = table.ravel()[self._feature_index]
+        score += self._rating_score
+
+        origin = self._origin(own)
+        if origin is None:
+            score += WEIGHTS["distance"] * 0.5
+        else:
+            score += self._distance_score(*origin)
+        score[own] = -np.inf
+
+        limit = min(limit, len(score) - len(own))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-score, limit - 1)[:limit]
+        top = top[np.argsort(-score[top], kind="stable")]
+        distance_km = self._haversine_km(origin, top)
+
+        return [
+            {
+                "item_id": int(self.item_ids[index]),
+                "owner_id": int(self.owner_ids[index]),
+                "score": round(float(score[index]), 4),
+                "matched_item_id": int(matched_by_rank[self.condition_ranks[index]]),
+                "distance_km": None if np.isnan(distance) else round(float(distance), 1),
+            }
+            for index, distance in zip(top, distance_km)
+        ]
+
+    def _origin(self, own: np.ndarray) -> Optional[tuple]:
+        """Mean location of the user's items, or None if none is known"""
+        located = own[self._has_location[own]]
+        if not len(located):
+            return None
+        return float(self.latitudes[located].mean()), float(self.longitudes[located].mean())
+
+    def _distance_score(self, origin_lat: float, origin_lon: float) -> np.ndarray:
+        """Weighted exp(-distance / scale) for every item
+
+        Uses the equirectangular approximation, which is accurate at the
+        distances that matter for ranking and avoids trigonometry per item.
+        """
+        dlat = self.latitudes - np.float32(origin_lat)
+        dlon = self.longitudes - np.float32(origin_lon)
+        dlon *= np.float32(np.cos(origin_lat))
+        dlat *= dlat
+        dlon *= dlon
+        dlat += dlon
+        np.sqrt(dlat, out=dlat)
+        dlat *= np.float32(-EARTH_RADIUS_KM / DISTANCE_SCALE_KM)
+        np.exp(dlat, out=dlat)
+        dlat[self._unknown_location] = 0.5
+        dlat *= np.float32(WEIGHTS["distance"])
+        return dlat
+
+    def _haversine_km(self, origin: Optional[tuple], indexes: np.ndarray) -> np.ndarray:
+        """Exact great-circle distance in km for a few items"""
+        if origin is None:
+            return np.full(len(indexes), np.nan)
+        origin_lat, origin_lon = origin
+        latitudes = self.latitudes[indexes].astype(np.float64)
+        longitudes = self.longitudes[indexes].astype(np.float64)
+        a = (np.sin((latitudes - origin_lat) / 2) ** 2
+             + np.cos(origin_lat) * np.cos(latitudes) * np.sin((longitudes - origin_lon) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        distance[~self._has_location[indexes]] = np.nan
+        return distance
+
+
+# Process-wide feature matrix, rebuilt every RECOMMENDATION_REFRESH_SECONDS by
+# the recommendation_matrix job; requests only read it
+_matrix: Optional[ItemFeatureMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def invalidate() -> None:
+    """Drop the feature matrix so it is rebuilt on next use"""
+    global _matrix
+    _matrix = None
+
+
+def refresh_matrix() -> int:
+    """Rebuild the feature matrix in the background; returns the number of items
+
+    Requests keep reading the previous matrix until the new one replaces it.
+    """
+    global _matrix
+    db = SessionLocal()
+    try:
+        matrix = ItemFeatureMatrix.from_database(db)
+    finally:
+        db.close()
+    _matrix = matrix
+    matrix_requests.inc(result="rebuild")
+    return len(matrix)
+
+
+class RecommendationService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_feature_matrix(self) -> ItemFeatureMatrix:
+        """Get the shared feature matrix, building it only if none exists yet"""
+        global _matrix
+        matrix = _matrix
+        if matrix is None:
+            with _matrix_lock:
+                if _matrix is None:
+                    _matrix = ItemFeatureMatrix.from_database(self.db)
+                    matrix_requests.inc(result="rebuild")
+                    return _matrix
+                matrix = _matrix
+        matrix_requests.inc(result="hit")
+        return matrix
+
+    def get_recommendations(self, user_id: int, limit: int = 20) -> List[dict]:
+        """Get listings the user's active items could be traded for"""
+        wanted_categories = dict(self.db.execute(
+            select(Item.category_id, func.count())
+            .join(TradeOffer, TradeOffer.item_id == Item.id)
+            .where(TradeOffer.offerer_id == user_id)
+            .group_by(Item.category_id)
+        ).all())
+        return self.get_feature_matrix().recommend(user_id, wanted_categories, limit)
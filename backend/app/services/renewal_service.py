@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.subscription import PaymentProvider, Subscription, SubscriptionStatus
+from app.services import entitlement_service
+from app.services.webhook_service import PAYPAL_STATUSES, STRIPE_STATUSES
+from app.utils.metrics import registry
+from app.utils.outbound import outbound_call
+from app.utils.rate_limit import LimitedCaller
+
+logger = logging.getLogger(__name__)
+
+RENEWAL_BATCH_SIZE = int(os.getenv("RENEWAL_BATCH_SIZE", "100"))
+RENEWAL_MAX_BATCHES = int(os.getenv("RENEWAL_MAX_BATCHES", "50"))
+RENEWAL_CONCURRENCY = int(os.getenv("RENEWAL_CONCURRENCY", "10"))
+RENEWAL_RATE_PER_SECOND = float(os.getenv("RENEWAL_RATE_PER_SECOND", "20"))
+# A claim older than this is assumed abandoned and the subscription retried
+RENEWAL_CLAIM_TTL_SECONDS = int(os.getenv("RENEWAL_CLAIM_TTL_SECONDS", "600"))
+RENEWAL_INTERVAL_SECONDS = int(os.getenv("RENEWAL_INTERVAL_SECONDS", "300"))
+# "stub" renews without charging anyone; only for development and load tests
+RENEWAL_GATEWAY = os.getenv("RENEWAL_GATEWAY", "provider")
+PAYPAL_API_BASE = os.getenv("PAYPAL_API_BASE", "https://api-m.sandbox.paypal.com")
+
+# Cycles the renewal job handles; subscriptions on others are never claimed
+BILLING_CYCLES = {"weekly": timedelta(weeks=1)}
+SECONDS_PER_DAY = 86400
+
+renewals = registry.counter(
+    "renewals_total", "Subscription renewals attempted, by outcome", ["outcome"])
+renewals_per_second = registry.gauge(
+    "renewal_last_run_per_second", "Renewal throughput of the most recent run")
+renewal_lag = registry.gauge(
+    "renewal_lag_seconds", "How far past due the oldest unrenewed subscription is")
+
+# Rendered inline so the planner can match ix_subscriptions_due
+_ACTIVE = bindparam("active", SubscriptionStatus.ACTIVE, type_=Subscription.status.type,
+                    literal_execute=True)
+
+
+def renewal_slot(user_id: int) -> timedelta:
+    """Fixed time of day user's renewals fall on
+
+    Multiplicative hashing scatters consecutive ids over the whole day,
+    so a burst of sign-ups doesn't come due again as a burst.
+    """
+    return timedelta(seconds=(user_id * 2654435761) % SECONDS_PER_DAY)
+
+
+def first_billing_date(user_id: int, billing_cycle: str = "weekly",
+                       now: Optional[datetime] = None) -> datetime:
+    """First renewal: one cycle from now, pushed forward to user's slot"""
+    due = (now or datetime.now(timezone.utc)) + BILLING_CYCLES[billing_cycle]
+    slotted = due.replace(hour=0, minute=0, second=0, microsecond=0) + renewal_slot(user_id)
+    return slotted if slotted >= due else slotted + timedelta(days=1)
+
+
+class RenewalError(Exception):
+    """The provider couldn't give an answer; the renewal is retried later"""
+
+
+class RenewalResult:
+    """Provider's view of a subscription after its renewal date"""
+
+    def __init__(self, status: SubscriptionStatus, next_billing_date: Optional[datetime] = None):
+        self.status = status
+        self.next_billing_date = next_billing_date
+
+
+class StubGateway:
+    """Local stand-in for the providers, for development, tests and load tests"""
+
+    def __init__(self, latency: float = 0.0, decline_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.decline_rate = decline_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def renew(self, claim) -> RenewalResult:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            raise RenewalError("Stub provider unavailable")
+        if roll < self.error_rate + self.decline_rate:
+            return RenewalResult(SubscriptionStatus.PAST_DUE)
+        return RenewalResult(SubscriptionStatus.ACTIVE,
+                             claim.next_billing_date + BILLING_CYCLES[claim.billing_cycle])
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ProviderGateway:
+    """Reads renewal outcomes from the Stripe and PayPal APIs
+
+    Both providers charge subscribers themselves, so renewing here means
+    confirming the provider moved the billing period forward.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client or httpx.AsyncClient(timeout=10.0)
+        self._paypal_token: Optional[str] = None
+        self._paypal_token_expires = 0.0
+        self._paypal_token_lock = asyncio.Lock()
+
+    async def renew(self, claim) -> RenewalResult:
+        try:
+            if claim.payment_provider == PaymentProvider.STRIPE:
+                result = await self._stripe(claim.provider_subscription_id)
+            else:
+                result = await self._paypal(claim.provider_subscription_id)
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            raise RenewalError(f"{type(e).__name__}: {e}") from e
+
+        if result.status is None:
+            raise RenewalError("Provider returned an unknown status")
+        if result.status == SubscriptionStatus.ACTIVE and (
+                result.next_billing_date is None
+                or result.next_billing_date <= claim.next_billing_date):
+            raise RenewalError("Provider hasn't renewed the subscription yet")
+        return result
+
+    async def _stripe(self, subscription_id: str) -> RenewalResult:
+        with outbound_call("stripe", "subscriptions.retrieve"):
+            response = await self.client.get(
+                f"https://api.stripe.com/v1/subscriptions/{subscription_id}",
+                auth=(os.getenv("STRIPE_SECRET_KEY", ""), ""))
+        response.raise_for_status()
+        data = response.json()
+        period_end = data.get("current_period_end")
+        return RenewalResult(
+            STRIPE_STATUSES.get(data["status"]),
+            datetime.fromtimestamp(period_end, tz=timezone.utc) if period_end else None)
+
+    async def _paypal(self, subscription_id: str) -> RenewalResult:
+        headers = {"Authorization": f"Bearer {await self._paypal_access_token()}"}
+        with outbound_call("paypal", "subscriptions.get"):
+            response = await self.client.get(
+                f"{PAYPAL_API_BASE}/v1/billing/subscriptions/{subscription_id}", headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        next_billing = data.get("billing_info", {}).get("next_billing_time")
+        return RenewalResult(
+            PAYPAL_STATUSES.get(data["status"]),
+            datetime.fromisoformat(next_billing.replace("Z", "+00:00")) if next_billing else None)
+
+    async def _paypal_access_token(self) -> str:
+        async with self._paypal_token_lock:
+            if self._paypal_token is None or time.monotonic() >= self._paypal_token_expires:
+                with outbound_call("paypal", "oauth2.token"):
+                    response = await self.client.post(
+                        f"{PAYPAL_API_BASE}/v1/oauth2/token",
+                        data={"grant_type": "client_credentials"},
+                        auth=(os.getenv("PAYPAL_CLIENT_ID", ""),
+                              os.getenv("PAYPAL_CLIENT_SECRET", "")))
+                response.raise_for_status()
+                token = response.json()
+                self._paypal_token = token["access_token"]
+                self._paypal_token_expires = time.monotonic() + token["expires_in"] - 60
+            return self._paypal_token
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def make_gateway():
+    """Gateway selected by RENEWAL_GATEWAY: the real providers unless it is stub"""
+    if RENEWAL_GATEWAY == "stub":
+        logger.warning("RENEWAL_GATEWAY=stub: renewals are simulated and nobody is charged")
+        return StubGateway()
+    return ProviderGateway()
+
+
+class RenewalService:
+    """Renews due subscriptions in claimed chunks
+
+    Each chunk is claimed with ``UPDATE ... WHERE id IN (SELECT ... FOR
+    UPDATE SKIP LOCKED)`` and committed before the provider is called, so
+    no row lock is held across network calls and concurrent workers take
+    disjoint chunks. Provider calls run concurrently behind a rate limit;
+    a worker that dies leaves claims that expire after the claim TTL.
+    """
+
+    def __init__(self, db: Session, gateway=None,
+                 concurrency: int = RENEWAL_CONCURRENCY,
+                 rate: float = RENEWAL_RATE_PER_SECOND,
+                 claim_ttl: timedelta = timedelta(seconds=RENEWAL_CLAIM_TTL_SECONDS)):
+        self.db = db
+        self.gateway = gateway or make_gateway()
+        self.concurrency = concurrency
+        self.rate = rate
+        self.claim_ttl = claim_ttl
+
+    def claim_due(self, batch_size: int = RENEWAL_BATCH_SIZE) -> List:
+        """Claim up to batch_size due subscriptions, oldest due first"""
+        now = datetime.now(timezone.utc)
+        due = select(Subscription.id).where(
+            Subscription.status == _ACTIVE,
+            Subscription.next_billing_date <= now,
+            Subscription.billing_cycle.in_(list(BILLING_CYCLES)),
+            or_(Subscription.renewal_claimed_at.is_(None),
+                Subscription.renewal_claimed_at < now - self.claim_ttl)
+        ).order_by(Subscription.next_billing_date).limit(batch_size).with_for_update(
+            skip_locked=True)
+
+        claims = self.db.execute(
+            update(Subscription).where(Subscription.id.in_(due))
+            .values(renewal_claimed_at=now)
+            .returning(Subscription.id, Subscription.user_id, Subscription.payment_provider,
+                       Subscription.provider_subscription_id, Subscription.billing_cycle,
+                       Subscription.next_billing_date)
+            .execution_options(synchronize_session=False)
+        ).all()
+        self.db.commit()
+        return claims
+
+    async def renew_batch(self, batch_size: int = RENEWAL_BATCH_SIZE,
+                          caller: Optional[LimitedCaller] = None) -> Dict[str, int]:
+        """Claim one chunk, renew it through the provider and store the outcomes"""
+        claims = self.claim_due(batch_size)
+        if not claims:
+            return {}
+        caller = caller or LimitedCaller(self.concurrency, self.rate)
+        results = await asyncio.gather(
+            *(caller.call(self.gateway.renew, claim) for claim in claims),
+            return_exceptions=True)
+
+        outcomes: Dict[str, int] = {}
+        changed_users = []
+        for claim, result in zip(claims, results):
+            if isinstance(result, Exception):
+                if not isinstance(result, RenewalError):
+                    logger.exception("Renewing subscription %d failed", claim.id,
+                                     exc_info=result)
+                # Keep the claim so the retry waits out the claim TTL
+                outcome = "error"
+            elif result.status == SubscriptionStatus.ACTIVE:
+                self.db.execute(
+                    update(Subscription).where(Subscription.id == claim.id)
+                    .values(next_billing_date=result.next_billing_date, renewal_claimed_at=None)
+                    .execution_options(synchronize_session=False))
+                changed_users.append(claim.user_id)
+                outcome = "renewed"
+            else:
+                self.db.execute(
+                    update(Subscription).where(Subscription.id == claim.id)
+                    .values(status=result.status, renewal_claimed_at=None)
+                    .execution_options(synchronize_session=False))
+                changed_users.append(claim.user_id)
+                outcome = "lapsed"
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        self.db.commit()
+
+        if changed_users:
+            entitlement_service.invalidate(*changed_users)
+        for outcome, count in outcomes.items():
+            renewals.inc(count, outcome=outcome)
+        return outcomes
+
+    async def renew_due(self, batch_size: int = RENEWAL_BATCH_SIZE,
+                        max_batches: int = RENEWAL_MAX_BATCHES) -> Dict[str, int]:
+        """Renew chunks until nothing is due or max_batches is reached
+
+        Bounding each run leaves any backlog for later runs, spreading a
+        large due cohort over the day instead of renewing it at once.
+        """
+        caller = LimitedCaller(self.concurrency, self.rate)
+        totals: Dict[str, int] = {}
+        for _ in range(max_batches):
+            outcomes = await self.renew_batch(batch_size, caller)
+            for outcome, count in outcomes.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            if sum(outcomes.values()) < batch_size:
+                break
+        return totals
+
+def overdue_seconds(db: Session) -> float:
+    """Seconds the oldest due, unrenewed subscription is overdue"""
+    oldest = db.execute(
+        select(Subscription.next_billing_date).where(
+            Subscription.status == _ACTIVE,
+            Subscription.next_billing_date <= datetime.now(timezone.utc),
+            Subscription.billing_cycle.in_(list(BILLING_CYCLES))
+        ).order_by(Subscription.next_billing_date).limit(1)
+    ).scalar()
+    if oldest is None:
+        return 0.0
+    if oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - oldest).total_seconds()
+
+
+async def _run(db: Session) -> Dict[str, int]:
+    gateway = make_gateway()
+    try:
+        return await RenewalService(db, gateway).renew_due()
+    finally:
+        await gateway.aclose()
+
+
+def run_renewals() -> Dict[str, int]:
+    """One scheduled renewal run with its own session and event loop"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        totals = asyncio.run(_run(db))
+        renewal_lag.set(overdue_seconds(db))
+    finally:
+        db.close()
+
+    duration = time.perf_counter() - started
+    renewals_per_second.set(sum(totals.values()) / duration if duration else 0.0)
+    if totals:
+        logger.info("Renewal run finished in %.2fs: %s", duration, totals)
+    return totals
+
+
+if __name__ == "__main__":
+    # Allows running renewals from cron:
+    #   python -m app.services.renewal_service
+    logging.basicConfig(level=logging.INFO)
+    run_renewals()
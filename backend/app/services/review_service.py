@@ -1,7 +1,40 @@
-from sqlalchemy.orm import Session
-from app.models.review import Review
+import os
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from app.models.review import Review, UserReputation
+from app.models.user import User
 from app.schemas.review import ReviewCreate, ReviewUpdate
-from typing import List, Optional
+from app.services.read_models import USER_SUMMARY_COLUMNS
+from app.utils.fields import Fields, load_options
+from typing import Any, Dict, List, Optional
+
+# Bayesian average: every user starts with PRIOR_WEIGHT virtual reviews of
+# PRIOR_MEAN stars, so a single 5-star review doesn't top the leaderboard
+REPUTATION_PRIOR_MEAN = float(os.getenv("REPUTATION_PRIOR_MEAN", "3.5"))
+REPUTATION_PRIOR_WEIGHT = float(os.getenv("REPUTATION_PRIOR_WEIGHT", "5"))
+
+RATINGS = range(1, 6)
+
+# How list pages load the embedded user summaries
+_REVIEW_RELATIONSHIPS = {
+    "reviewer": selectinload(Review.reviewer).load_only(*USER_SUMMARY_COLUMNS),
+    "reviewee": selectinload(Review.reviewee).load_only(*USER_SUMMARY_COLUMNS),
+}
+
+
+def reputation_score(counts: Dict[int, Any], review_count: Any):
+    """SQL expression for the Bayesian average rating, NULL without reviews
+
+    counts maps stars to a column expression holding how many reviews gave
+    that many stars.
+    """
+    total = sum(stars * counts[stars] for stars in RATINGS)
+    return case(
+        (review_count > 0, (REPUTATION_PRIOR_WEIGHT * REPUTATION_PRIOR_MEAN + total)
+         / (REPUTATION_PRIOR_WEIGHT + review_count)),
+        else_=None
+    )
 
 
 class ReviewService:
@@ -22,6 +55,7 @@ class ReviewService:
         )
 
         self.db.add(db_review)
+        self._adjust_reputation(db_review.reviewee_id, {db_review.rating: 1})
         self.db.commit()
         self.db.refresh(db_review)
         return db_review
@@ -30,15 +64,19 @@ class ReviewService:
         """Get a specific review"""
         return self.db.query(Review).filter(Review.id == review_id).first()
 
-    def get_user_reviews(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Review]:
-        """Get reviews for a user"""
+    def get_user_reviews(self, user_id: int, limit: int = 20, offset: int = 0,
+                         fields: Fields = None) -> List[Review]:
+        """Get reviews for a user, loading only what fields need"""
         return self.db.query(Review).filter(
             Review.reviewee_id == user_id
+        ).options(*load_options(Review, fields, _REVIEW_RELATIONSHIPS)).order_by(
+            Review.id
         ).offset(offset).limit(limit).all()
 
-    def get_trade_reviews(self, trade_id: int) -> List[Review]:
-        """Get reviews for a specific trade"""
-        return self.db.query(Review).filter(Review.trade_id == trade_id).all()
+    def get_trade_reviews(self, trade_id: int, fields: Fields = None) -> List[Review]:
+        """Get reviews for a specific trade, loading only what fields need"""
+        return self.db.query(Review).filter(Review.trade_id == trade_id).options(
+            *load_options(Review, fields, _REVIEW_RELATIONSHIPS)).all()
 
     def update_review(self, review_id: int, review_update: ReviewUpdate, user_id: int) -> Optional[Review]:
         """Update a review"""
@@ -46,10 +84,13 @@ class ReviewService:
         if not review or review.reviewer_id != user_id:
             return None
 
+        old_rating = review.rating
         update_data = review_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(review, field, value)
 
+        if review.rating != old_rating:
+            self._adjust_reputation(review.reviewee_id, {old_rating: -1, review.rating: 1})
         self.db.commit()
         self.db.refresh(review)
         return review
@@ -60,6 +101,40 @@ class ReviewService:
         if not review or review.reviewer_id != user_id:
             return False
 
+        self._adjust_reputation(review.reviewee_id, {review.rating: -1})
         self.db.delete(review)
         self.db.commit()
         return True
+
+    def _adjust_reputation(self, user_id: int, changes: Dict[int, int]) -> None:
+        """Apply rating count changes to user's histogram and rescore; the caller commits
+
+        Counts and score change in one atomic UPDATE, so concurrent reviews
+        of the same user can't lose counts.
+        """
+        score = self._bump_histogram(user_id, changes)
+        if score is None:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(UserReputation).values(user_id=user_id))
+            except IntegrityError:
+                pass  # Created by a concurrent review
+            score = self._bump_histogram(user_id, changes)
+
+        self.db.execute(
+            update(User).where(User.id == user_id).values(reputation_score=score.score)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _bump_histogram(self, user_id: int, changes: Dict[int, int]):
+        counts = {stars: getattr(UserReputation, f"ratings_{stars}") + changes.get(stars, 0)
+                  for stars in RATINGS}
+        review_count = UserReputation.review_count + sum(changes.values())
+        return self.db.execute(
+            update(UserReputation).where(UserReputation.user_id == user_id).values(
+                **{f"ratings_{stars}": counts[stars] for stars in changes},
+                review_count=review_count,
+                score=reputation_score(counts, review_count)
+            ).returning(UserReputation.score)
+            .execution_options(synchronize_session=False)
+        ).first()
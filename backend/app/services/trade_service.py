@@ -1,18 +1,75 @@
-from sqlalchemy.orm import Session
-from app.models.trade import Trade, TradeOffer
+from datetime import datetime
+from sqlalchemy import bindparam, func, insert, or_, select, tuple_, union_all, update
+from sqlalchemy.orm import Session, lazyload, noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.item import Item, ItemStatus
+from app.models.trade import (
+    ACTIVE_TRADE_STATUSES, Trade, TradeOffer, TradeOfferStatus, TradeParticipant, TradeStatus
+)
 from app.schemas.trade import TradeOfferCreate
-from typing import List, Optional
+from app.services import matching_service
+from app.services.ledger_service import (
+    LEDGER_HISTORY_PAGE_SIZE, OFFER, TRADE, LedgerService, event
+)
+from app.services.notification_service import notify
+from app.services.read_models import ITEM_SUMMARY_COLUMNS, USER_SUMMARY_COLUMNS
+from app.utils.fields import Fields, load_options
+from app.utils.pagination import decode_cursor
+from typing import Dict, List, Optional
+
+# Rendered inline rather than bound so the planner can match the
+# predicate of the partial trade_participants indexes
+_ACTIVE_STATUSES = bindparam("active_statuses", list(ACTIVE_TRADE_STATUSES),
+                             expanding=True, literal_execute=True)
+
+# How list pages load embedded objects; only the summary columns are read
+_OFFER_RELATIONSHIPS = {
+    "item": selectinload(TradeOffer.item).load_only(*ITEM_SUMMARY_COLUMNS),
+    "offered_item": selectinload(TradeOffer.offered_item).load_only(*ITEM_SUMMARY_COLUMNS),
+    "offerer": selectinload(TradeOffer.offerer).load_only(*USER_SUMMARY_COLUMNS),
+    "item_owner": selectinload(TradeOffer.item_owner).load_only(*USER_SUMMARY_COLUMNS),
+}
+_TRADE_RELATIONSHIPS = {
+    "item1": selectinload(Trade.item1).load_only(*ITEM_SUMMARY_COLUMNS),
+    "item2": selectinload(Trade.item2).load_only(*ITEM_SUMMARY_COLUMNS),
+    "user1": selectinload(Trade.user1).load_only(*USER_SUMMARY_COLUMNS),
+    "user2": selectinload(Trade.user2).load_only(*USER_SUMMARY_COLUMNS),
+}
+# Keyset cursors are built from these
+_PAGE_COLUMNS = ("id", "created_at")
 
 
 class TradeService:
     def __init__(self, db: Session):
         self.db = db
+        self.ledger = LedgerService(db)
 
-    def create_trade_offer(self, offer_data: TradeOfferCreate, user_id: int) -> TradeOffer:
+    def create_trade_offer(self, offer_data: TradeOfferCreate, user_id: int) -> Optional[TradeOffer]:
         """Create a trade offer"""
-        db_offer = TradeOffer(
+        db_offer = self._new_offer(offer_data, user_id)
+        if not db_offer:
+            return None
+
+        self.db.add(db_offer)
+        self.db.flush()
+        self.ledger.record(self._offer_created_event(db_offer))
+        self.db.commit()
+        self.db.refresh(db_offer)
+        matching_service.offer_opened(db_offer)
+        notify([db_offer.item_owner_id], "offer.created", offer_id=db_offer.id,
+               item_id=db_offer.item_id, offered_item_id=db_offer.offered_item_id)
+        return db_offer
+
+    def _new_offer(self, offer_data: TradeOfferCreate, user_id: int) -> Optional[TradeOffer]:
+        """Build an unsaved offer, or None if the requested item doesn't exist"""
+        item_owner_id = self.db.query(Item.owner_id).filter(
+            Item.id == offer_data.item_id).scalar()
+        if item_owner_id is None:
+            return None
+
+        return TradeOffer(
             item_id=offer_data.item_id,
-            item_owner_id=offer_data.item_id,  # This should be the item owner
+            item_owner_id=item_owner_id,
             offerer_id=user_id,
             offered_item_id=offer_data.offered_item_id,
             message=offer_data.message,
@@ -20,90 +77,431 @@ class TradeService:
             parent_offer_id=offer_data.parent_offer_id
         )
 
-        self.db.add(db_offer)
-        self.db.commit()
-        self.db.refresh(db_offer)
-        return db_offer
+    @staticmethod
+    def _offer_created_event(offer: TradeOffer) -> dict:
+        return event(
+            OFFER, offer.id, "offer.created", offer.offerer_id,
+            status=TradeOfferStatus.PENDING.value,
+            item_id=offer.item_id,
+            item_owner_id=offer.item_owner_id,
+            offerer_id=offer.offerer_id,
+            offered_item_id=offer.offered_item_id,
+            parent_offer_id=offer.parent_offer_id
+        )
 
-    def get_received_offers(self, user_id: int) -> List[TradeOffer]:
-        """Get trade offers received by user"""
-        return self.db.query(TradeOffer).filter(
-            TradeOffer.item_owner_id == user_id
-        ).all()
+    def get_received_offers(self, user_id: int, status: TradeOfferStatus = None,
+                            created_after: datetime = None, created_before: datetime = None,
+                            cursor: str = None, limit: int = 20,
+                            fields: Fields = None) -> List[TradeOffer]:
+        """Get a page of trade offers received by user, newest first"""
+        return self._offer_inbox(TradeOffer.item_owner_id, user_id, status,
+                                 created_after, created_before, cursor, limit, fields)
 
-    def get_made_offers(self, user_id: int) -> List[TradeOffer]:
-        """Get trade offers made by user"""
-        return self.db.query(TradeOffer).filter(
-            TradeOffer.offerer_id == user_id
-        ).all()
+    def get_made_offers(self, user_id: int, status: TradeOfferStatus = None,
+                        created_after: datetime = None, created_before: datetime = None,
+                        cursor: str = None, limit: int = 20,
+                        fields: Fields = None) -> List[TradeOffer]:
+        """Get a page of trade offers made by user, newest first"""
+        return self._offer_inbox(TradeOffer.offerer_id, user_id, status,
+                                 created_after, created_before, cursor, limit, fields)
+
+    def _offer_inbox(self, participant_column, user_id: int, status: Optional[TradeOfferStatus],
+                     created_after: Optional[datetime], created_before: Optional[datetime],
+                     cursor: Optional[str], limit: int, fields: Fields = None) -> List[TradeOffer]:
+        """Keyset-paginated inbox query served by the (participant, status, created_at) indexes
+
+        Only columns and relationships in fields are loaded. Raises
+        ValueError for a malformed cursor.
+        """
+        query = self.db.query(TradeOffer).filter(participant_column == user_id)
+
+        if status:
+            query = query.filter(TradeOffer.status == status)
+
+        if created_after:
+            query = query.filter(TradeOffer.created_at >= created_after)
+
+        if created_before:
+            query = query.filter(TradeOffer.created_at < created_before)
+
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(TradeOffer.created_at, TradeOffer.id) <
+                tuple_(cursor_created_at, cursor_id)
+            )
+
+        # Inbox entries don't embed their counter-offer threads
+        return query.options(
+            *load_options(TradeOffer, fields, _OFFER_RELATIONSHIPS, _PAGE_COLUMNS),
+            noload(TradeOffer.counter_offers),
+        ).order_by(
+            TradeOffer.created_at.desc(), TradeOffer.id.desc()
+        ).limit(limit).all()
+
+    def get_pending_offer_counts(self, user_id: int) -> Dict[str, int]:
+        """Count pending offers received and made by user
+
+        Both counts are answered from the inbox indexes alone.
+        """
+        def count(participant_column) -> int:
+            return self.db.execute(
+                select(func.count()).select_from(TradeOffer).where(
+                    participant_column == user_id,
+                    TradeOffer.status == TradeOfferStatus.PENDING
+                )
+            ).scalar_one()
+
+        return {
+            "received": count(TradeOffer.item_owner_id),
+            "made": count(TradeOffer.offerer_id),
+        }
 
     def accept_trade_offer(self, offer_id: int, user_id: int) -> Optional[Trade]:
-        """Accept a trade offer"""
-        offer = self.db.query(TradeOffer).filter(
-            TradeOffer.id == offer_id).first()
-        if not offer or offer.item_owner_id != user_id:
+        """Accept a trade offer
+
+        Both items are claimed with a conditional UPDATE before the offer
+        moves from pending to accepted in a single statement, so concurrent
+        accepts on the same items, or an accept racing a counter offer,
+        can't both succeed. In the same transaction every other pending
+        offer involving either item is rejected.
+        """
+        offer = self.db.query(
+            TradeOffer.item_id, TradeOffer.offered_item_id
+        ).filter(
+            TradeOffer.id == offer_id,
+            TradeOffer.item_owner_id == user_id,
+            TradeOffer.status == TradeOfferStatus.PENDING
+        ).first()
+        if not offer:
+            return None
+        item_ids = [offer.item_id, offer.offered_item_id]
+
+        # Claiming the items first serializes competing accepts on the item
+        # rows; the loser finds them already traded and gives up
+        claimed_items = self.db.execute(
+            update(Item).where(
+                Item.id.in_(item_ids),
+                Item.status == ItemStatus.ACTIVE
+            ).values(status=ItemStatus.TRADED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed_items != len(item_ids):
+            self.db.rollback()
+            return None
+
+        accepted = self._transition_offer(
+            offer_id, TradeOfferStatus.ACCEPTED, TradeOffer.item_owner_id == user_id
+        ).first()
+        if not accepted:
+            self.db.rollback()
             return None
 
-        # Create trade
         trade = Trade(
-            item1_id=offer.item_id,
-            item2_id=offer.offered_item_id,
-            user1_id=offer.item_owner_id,
-            user2_id=offer.offerer_id,
-            status="accepted"
+            item1_id=accepted.item_id,
+            item2_id=accepted.offered_item_id,
+            user1_id=accepted.item_owner_id,
+            user2_id=accepted.offerer_id,
+            status=TradeStatus.ACCEPTED
         )
-
         self.db.add(trade)
-        offer.status = "accepted"
+        self.db.flush()
+        self._add_participants(trade.id)
+
+        competing = self.db.execute(
+            update(TradeOffer).where(
+                TradeOffer.id != offer_id,
+                TradeOffer.status == TradeOfferStatus.PENDING,
+                or_(TradeOffer.item_id.in_(item_ids),
+                    TradeOffer.offered_item_id.in_(item_ids))
+            ).values(
+                status=TradeOfferStatus.REJECTED,
+                version=TradeOffer.version + 1,
+                responded_at=func.now()
+            ).returning(TradeOffer.id, TradeOffer.offerer_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        self.ledger.record(
+            event(OFFER, offer_id, "offer.accepted", user_id,
+                  status=TradeOfferStatus.ACCEPTED.value, trade_id=trade.id),
+            event(TRADE, trade.id, "trade.created", user_id,
+                  status=TradeStatus.ACCEPTED.value, offer_id=offer_id,
+                  item1_id=trade.item1_id, item2_id=trade.item2_id,
+                  user1_id=trade.user1_id, user2_id=trade.user2_id),
+            *(event(OFFER, rejected.id, "offer.rejected", user_id,
+                    status=TradeOfferStatus.REJECTED.value, reason="item_traded")
+              for rejected in competing)
+        )
         self.db.commit()
         self.db.refresh(trade)
+        matching_service.offer_closed(offer_id)
+        notify([accepted.offerer_id], "offer.accepted", offer_id=offer_id, trade_id=trade.id)
+        for rejected in competing:
+            matching_service.offer_closed(rejected.id)
+            notify([rejected.offerer_id], "offer.rejected", offer_id=rejected.id)
         return trade
 
+    def _transition_offer(self, offer_id: int, new_status: TradeOfferStatus, *conditions):
+        """Move a pending offer to new_status in one conditional UPDATE
+
+        Returns the RETURNING result; it is empty if the offer wasn't
+        pending or didn't match conditions. The caller commits.
+        """
+        return self.db.execute(
+            update(TradeOffer).where(
+                TradeOffer.id == offer_id,
+                TradeOffer.status == TradeOfferStatus.PENDING,
+                *conditions
+            ).values(
+                status=new_status,
+                version=TradeOffer.version + 1,
+                responded_at=func.now()
+            ).returning(
+                TradeOffer.id, TradeOffer.item_id, TradeOffer.offered_item_id,
+                TradeOffer.item_owner_id, TradeOffer.offerer_id
+            ).execution_options(synchronize_session=False)
+        )
+
     def reject_trade_offer(self, offer_id: int, user_id: int) -> bool:
-        """Reject a trade offer"""
-        offer = self.db.query(TradeOffer).filter(
-            TradeOffer.id == offer_id).first()
-        if not offer or offer.item_owner_id != user_id:
+        """Reject a pending trade offer received by user"""
+        rejected = self._transition_offer(
+            offer_id, TradeOfferStatus.REJECTED, TradeOffer.item_owner_id == user_id
+        ).first()
+        if not rejected:
+            self.db.rollback()
             return False
 
-        offer.status = "rejected"
+        self.ledger.record(event(OFFER, offer_id, "offer.rejected", user_id,
+                                 status=TradeOfferStatus.REJECTED.value))
         self.db.commit()
+        matching_service.offer_closed(offer_id)
+        notify([rejected.offerer_id], "offer.rejected", offer_id=offer_id)
         return True
 
-    def create_counter_offer(self, offer_id: int, counter_offer: TradeOfferCreate, user_id: int) -> TradeOffer:
-        """Create a counter offer"""
+    def withdraw_trade_offer(self, offer_id: int, user_id: int) -> bool:
+        """Withdraw a pending trade offer made by user"""
+        withdrawn = self._transition_offer(
+            offer_id, TradeOfferStatus.WITHDRAWN, TradeOffer.offerer_id == user_id
+        ).first()
+        if not withdrawn:
+            self.db.rollback()
+            return False
+
+        self.ledger.record(event(OFFER, offer_id, "offer.withdrawn", user_id,
+                                 status=TradeOfferStatus.WITHDRAWN.value))
+        self.db.commit()
+        matching_service.offer_closed(offer_id)
+        notify([withdrawn.item_owner_id], "offer.withdrawn", offer_id=offer_id)
+        return True
+
+    def create_counter_offer(self, offer_id: int, counter_offer: TradeOfferCreate, user_id: int) -> Optional[TradeOffer]:
+        """Create a counter offer
+
+        The parent offer must still be pending and involve user; it is
+        marked countered in the same transaction.
+        """
         counter_offer.is_counter_offer = True
         counter_offer.parent_offer_id = offer_id
-        return self.create_trade_offer(counter_offer, user_id)
+        db_offer = self._new_offer(counter_offer, user_id)
+        if not db_offer:
+            return None
+
+        countered = self._transition_offer(
+            offer_id, TradeOfferStatus.COUNTERED,
+            or_(TradeOffer.item_owner_id == user_id, TradeOffer.offerer_id == user_id)
+        ).first()
+        if not countered:
+            self.db.rollback()
+            return None
 
-    def get_counter_offers(self, offer_id: int, user_id: int) -> List[TradeOffer]:
-        """Get counter offers for a trade offer"""
+        self.db.add(db_offer)
+        self.db.flush()
+        self.ledger.record(
+            event(OFFER, offer_id, "offer.countered", user_id,
+                  status=TradeOfferStatus.COUNTERED.value, counter_offer_id=db_offer.id),
+            self._offer_created_event(db_offer)
+        )
+        self.db.commit()
+        self.db.refresh(db_offer)
+        matching_service.offer_closed(offer_id)
+        matching_service.offer_opened(db_offer)
+        notify([db_offer.item_owner_id], "offer.countered", offer_id=db_offer.id,
+               parent_offer_id=offer_id)
+        return db_offer
+
+    def get_counter_offers(self, offer_id: int, user_id: int,
+                           fields: Fields = None) -> List[TradeOffer]:
+        """Get counter offers for a trade offer, loading only what fields need"""
+        relationships = {**_OFFER_RELATIONSHIPS,
+                         "counter_offers": lazyload(TradeOffer.counter_offers)}
         return self.db.query(TradeOffer).filter(
             TradeOffer.parent_offer_id == offer_id
-        ).all()
+        ).options(*load_options(TradeOffer, fields, relationships)).all()
+
+    def get_offer_thread(self, offer_id: int, user_id: int) -> Optional[TradeOffer]:
+        """Get an offer with its whole counter-offer tree loaded
+
+        The tree is fetched with one recursive CTE and the related items and
+        users are loaded in batches, so the number of queries does not grow
+        with the depth of the negotiation.
+        """
+        thread = select(TradeOffer.id).where(
+            TradeOffer.id == offer_id).cte("offer_thread", recursive=True)
+        thread = thread.union_all(
+            select(TradeOffer.id).where(TradeOffer.parent_offer_id == thread.c.id)
+        )
 
-    def get_active_trades(self, user_id: int) -> List[Trade]:
-        """Get active trades for user"""
-        return self.db.query(Trade).filter(
-            (Trade.user1_id == user_id) | (Trade.user2_id == user_id)
-        ).filter(Trade.status.in_(["pending", "accepted"])).all()
+        offers = self.db.query(TradeOffer).join(
+            thread, TradeOffer.id == thread.c.id
+        ).options(
+            selectinload(TradeOffer.item),
+            selectinload(TradeOffer.offered_item),
+            selectinload(TradeOffer.offerer),
+            selectinload(TradeOffer.item_owner),
+        ).order_by(TradeOffer.id).all()
+
+        root = next((offer for offer in offers if offer.id == offer_id), None)
+        if not root or user_id not in (root.offerer_id, root.item_owner_id):
+            return None
+
+        # Attach children in memory so serializing the tree never lazy-loads
+        children = {offer.id: [] for offer in offers}
+        for offer in offers:
+            if offer.id != offer_id and offer.parent_offer_id in children:
+                children[offer.parent_offer_id].append(offer)
+        for offer in offers:
+            set_committed_value(offer, "counter_offers", children[offer.id])
+
+        return root
+
+    def _add_participants(self, trade_id: int) -> None:
+        """Index a new trade under both of its users"""
+        columns = (Trade.id, Trade.status, Trade.created_at)
+        self.db.execute(
+            insert(TradeParticipant).from_select(
+                ["trade_id", "status", "created_at", "user_id"],
+                union_all(
+                    select(*columns, Trade.user1_id).where(Trade.id == trade_id),
+                    select(*columns, Trade.user2_id).where(Trade.id == trade_id),
+                )
+            )
+        )
+
+    def set_participant_status(self, trade_ids: List[int], status: TradeStatus) -> None:
+        """Mirror a trade status change into trade_participants; the caller commits"""
+        if trade_ids:
+            self.db.execute(
+                update(TradeParticipant).where(
+                    TradeParticipant.trade_id.in_(trade_ids)
+                ).values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+
+    def get_active_trades(self, user_id: int, cursor: str = None, limit: int = 20,
+                          fields: Fields = None) -> List[Trade]:
+        """Get a page of user's pending and accepted trades, newest first"""
+        return self._participant_trades(
+            user_id, TradeParticipant.status.in_(_ACTIVE_STATUSES), cursor, limit, fields)
+
+    def get_past_trades(self, user_id: int, cursor: str = None, limit: int = 20,
+                        fields: Fields = None) -> List[Trade]:
+        """Get a page of user's completed, rejected and cancelled trades, newest first"""
+        return self._participant_trades(
+            user_id, TradeParticipant.status.notin_(_ACTIVE_STATUSES), cursor, limit, fields)
+
+    def _participant_trades(self, user_id: int, status_filter, cursor: Optional[str],
+                            limit: int, fields: Fields = None) -> List[Trade]:
+        """Keyset-paginated trade list served by a partial trade_participants index
+
+        Only columns and relationships in fields are loaded. Raises
+        ValueError for a malformed cursor.
+        """
+        query = self.db.query(Trade).join(
+            TradeParticipant, TradeParticipant.trade_id == Trade.id
+        ).filter(TradeParticipant.user_id == user_id, status_filter)
+
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(TradeParticipant.created_at, TradeParticipant.trade_id) <
+                tuple_(cursor_created_at, cursor_id)
+            )
+
+        return query.options(
+            *load_options(Trade, fields, _TRADE_RELATIONSHIPS, _PAGE_COLUMNS)
+        ).order_by(
+            TradeParticipant.created_at.desc(), TradeParticipant.trade_id.desc()
+        ).limit(limit).all()
 
     def complete_trade(self, trade_id: int, user_id: int) -> bool:
-        """Mark a trade as completed"""
-        trade = self.db.query(Trade).filter(Trade.id == trade_id).first()
-        if not trade or (trade.user1_id != user_id and trade.user2_id != user_id):
+        """Mark an open trade as completed"""
+        trade = self._transition_trade(trade_id, user_id, TradeStatus.COMPLETED,
+                                       completed_at=func.now())
+        if not trade:
+            self.db.rollback()
             return False
 
-        trade.status = "completed"
+        self.set_participant_status([trade.id], TradeStatus.COMPLETED)
+        self.ledger.record(event(TRADE, trade.id, "trade.completed", user_id,
+                                 status=TradeStatus.COMPLETED.value))
         self.db.commit()
+        notify([trade.user1_id, trade.user2_id], "trade.completed", trade_id=trade.id)
         return True
 
     def cancel_trade(self, trade_id: int, user_id: int) -> bool:
-        """Cancel a trade"""
-        trade = self.db.query(Trade).filter(Trade.id == trade_id).first()
-        if not trade or (trade.user1_id != user_id and trade.user2_id != user_id):
+        """Cancel an open trade"""
+        trade = self._transition_trade(trade_id, user_id, TradeStatus.CANCELLED)
+        if not trade:
+            self.db.rollback()
             return False
 
-        trade.status = "cancelled"
+        self.set_participant_status([trade.id], TradeStatus.CANCELLED)
+        # Items claimed when the offer was accepted go back on the market
+        self.db.execute(
+            update(Item).where(
+                Item.id.in_([trade.item1_id, trade.item2_id]),
+                Item.status == ItemStatus.TRADED
+            ).values(status=ItemStatus.ACTIVE)
+            .execution_options(synchronize_session=False)
+        )
+        self.ledger.record(event(TRADE, trade.id, "trade.cancelled", user_id,
+                                 status=TradeStatus.CANCELLED.value))
         self.db.commit()
+        notify([trade.user1_id, trade.user2_id], "trade.cancelled", trade_id=trade.id)
         return True
+
+    def _transition_trade(self, trade_id: int, user_id: int, new_status: TradeStatus, **values):
+        """Close an open trade user is part of in one conditional UPDATE
+
+        Returns the updated row, or None if the trade doesn't exist, isn't
+        user's or was already completed or cancelled, e.g. by the sweeper.
+        The caller commits.
+        """
+        return self.db.execute(
+            update(Trade).where(
+                Trade.id == trade_id,
+                Trade.status.in_(ACTIVE_TRADE_STATUSES),
+                or_(Trade.user1_id == user_id, Trade.user2_id == user_id)
+            ).values(status=new_status, **values)
+            .returning(Trade.id, Trade.item1_id, Trade.item2_id, Trade.user1_id, Trade.user2_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+    def get_offer_history(self, offer_id: int, user_id: int, before: Optional[int] = None,
+                          limit: int = LEDGER_HISTORY_PAGE_SIZE) -> Optional[dict]:
+        """Get the ledger history of an offer user is part of"""
+        offer = self.db.query(TradeOffer.offerer_id, TradeOffer.item_owner_id).filter(
+            TradeOffer.id == offer_id).first()
+        if not offer or user_id not in offer:
+            return None
+        return self.ledger.get_history(OFFER, offer_id, before, limit)
+
+    def get_trade_history(self, trade_id: int, user_id: int, before: Optional[int] = None,
+                          limit: int = LEDGER_HISTORY_PAGE_SIZE) -> Optional[dict]:
+        """Get the ledger history of a trade user is part of"""
+        trade = self.db.query(Trade.user1_id, Trade.user2_id).filter(
+            Trade.id == trade_id).first()
+        if not trade or user_id not in trade:
+            return None
+        return self.ledger.get_history(TRADE, trade_id, before, limit)
@@ -1,10 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from app.models.review import UserReputation
 from app.models.user import User
-from app.schemas.user import UserUpdate, UserProfile
+from app.schemas.user import UserUpdate
+from app.services.read_models import PROFILE_COLUMNS, UserProfileRecord
+from app.utils.fields import Fields
 from typing import List, Optional
 
 
+REPUTATION_FIELDS = frozenset({"average_rating", "reviews_count"})
+
+
 class UserService:
     def __init__(self, db: Session):
         self.db = db
@@ -17,34 +23,10 @@ class UserService:
         """Get user by ID"""
         return self.db.query(User).filter(User.id == user_id).first()
 
-    def get_user_profile(self, user_id: int) -> Optional[UserProfile]:
-        """Get user profile with stats"""
-        user = self.get_user_by_id(user_id)
-        if not user:
-            return None
-
-        # Mock stats - replace with actual queries
-        return UserProfile(
-            id=user.id,
-            email=user.email,
-            username=user.username,
-            full_name=user.full_name,
-            phone_number=user.phone_number,
-            phone_verified=user.phone_verified,
-            is_active=user.is_active,
-            is_verified=user.is_verified,
-            profile_picture=user.profile_picture,
-            created_at=user.created_at,
-            last_login=user.last_login,
-            zip_code=user.zip_code,
-            city=user.city,
-            state=user.state,
-            bio=user.bio,
-            items_count=0,
-            trades_completed=0,
-            average_rating=0.0,
-            reviews_count=0
-        )
+    def get_user_profile(self, user_id: int) -> Optional[UserProfileRecord]:
+        """Get user profile with stats, as a read-only record"""
+        row = self.db.execute(self._profile_query().where(User.id == user_id)).first()
+        return UserProfileRecord(*row) if row else None
 
     def update_user(self, user_id: int, user_update: UserUpdate) -> Optional[User]:
         """Update user profile"""
@@ -61,12 +43,13 @@ class UserService:
         return user
 
     def search_users(self, q: str = None, city: str = None, state: str = None,
-                     limit: int = 20, offset: int = 0) -> List[UserProfile]:
-        """Search users"""
-        query = self.db.query(User)
+                     limit: int = 20, offset: int = 0,
+                     fields: Fields = None) -> List[UserProfileRecord]:
+        """Search users, returning read-only profile records narrowed to fields"""
+        query = self._profile_query(fields)
 
         if q:
-            query = query.filter(
+            query = query.where(
                 or_(
                     User.full_name.ilike(f"%{q}%"),
                     User.username.ilike(f"%{q}%")
@@ -74,10 +57,47 @@ class UserService:
             )
 
         if city:
-            query = query.filter(User.city.ilike(f"%{city}%"))
+            query = query.where(User.city.ilike(f"%{city}%"))
+
+        if state:
+            query = query.where(User.state.ilike(f"%{state}%"))
+
+        rows = self.db.execute(query.order_by(User.id).offset(offset).limit(limit))
+        if fields is not None:
+            return [dict(row._mapping) for row in rows]
+        return [UserProfileRecord(*row) for row in rows]
+
+    def get_leaderboard(self, state: str = None, city: str = None,
+                        limit: int = 20) -> List[dict]:
+        """Top users by reputation score, optionally in one state and/or city
+
+        Reads the first rows of a partial (location, reputation_score)
+        index, so the cost doesn't depend on how many reviews exist.
+        """
+        query = self.db.query(
+            User.id, User.username, User.full_name, User.city, User.state,
+            User.profile_picture, User.reputation_score, UserReputation.review_count
+        ).join(
+            UserReputation, UserReputation.user_id == User.id
+        ).filter(
+            User.reputation_score.isnot(None), User.is_active == True  # noqa: E712
+        )
 
         if state:
-            query = query.filter(User.state.ilike(f"%{state}%"))
+            query = query.filter(User.state == state)
+
+        if city:
+            query = query.filter(User.city == city)
+
+        rows = query.order_by(User.reputation_score.desc(), User.id.desc()).limit(limit).all()
+        return [row._asdict() for row in rows]
 
-        users = query.offset(offset).limit(limit).all()
-        return [self.get_user_profile(user.id) for user in users if user]
+    @staticmethod
+    def _profile_query(fields: Fields = None):
+        """Profile columns, joining reputation stats only when returned"""
+        # Mock stats - items_count and trades_completed stay 0 until replaced with actual queries
+        query = select(*(column for column in PROFILE_COLUMNS
+                         if fields is None or column.key in fields))
+        if fields is None or fields & REPUTATION_FIELDS:
+            query = query.outerjoin(UserReputation, UserReputation.user_id == User.id)
+        return query
@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.subscription import (
+    PaymentProvider, Subscription, SubscriptionStatus, WebhookEvent, WebhookEventStatus
+)
+from app.services import entitlement_service
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+WEBHOOK_CONSUMER_INTERVAL_SECONDS = float(os.getenv("WEBHOOK_CONSUMER_INTERVAL_SECONDS", "2"))
+
+events_received = registry.counter(
+    "webhook_events_received_total", "Webhook deliveries accepted", ["provider", "duplicate"])
+events_applied = registry.counter(
+    "webhook_events_applied_total", "Webhook events handled by the consumer", ["status"])
+
+# Provider subscription status -> ours
+STRIPE_STATUSES = {
+    "active": SubscriptionStatus.ACTIVE,
+    "trialing": SubscriptionStatus.ACTIVE,
+    "past_due": SubscriptionStatus.PAST_DUE,
+    "unpaid": SubscriptionStatus.PAST_DUE,
+    "canceled": SubscriptionStatus.CANCELLED,
+    "incomplete": SubscriptionStatus.INCOMPLETE,
+    "incomplete_expired": SubscriptionStatus.CANCELLED,
+}
+PAYPAL_EVENT_STATUSES = {
+    "BILLING.SUBSCRIPTION.ACTIVATED": SubscriptionStatus.ACTIVE,
+    "BILLING.SUBSCRIPTION.RE-ACTIVATED": SubscriptionStatus.ACTIVE,
+    "BILLING.SUBSCRIPTION.UPDATED": None,  # Status comes from the resource
+    "BILLING.SUBSCRIPTION.SUSPENDED": SubscriptionStatus.PAST_DUE,
+    "BILLING.SUBSCRIPTION.PAYMENT.FAILED": SubscriptionStatus.PAST_DUE,
+    "BILLING.SUBSCRIPTION.CANCELLED": SubscriptionStatus.CANCELLED,
+    "BILLING.SUBSCRIPTION.EXPIRED": SubscriptionStatus.CANCELLED,
+    "PAYMENT.SALE.COMPLETED": SubscriptionStatus.ACTIVE,
+}
+PAYPAL_STATUSES = {
+    "ACTIVE": SubscriptionStatus.ACTIVE,
+    "APPROVAL_PENDING": SubscriptionStatus.INCOMPLETE,
+    "APPROVED": SubscriptionStatus.INCOMPLETE,
+    "SUSPENDED": SubscriptionStatus.PAST_DUE,
+    "CANCELLED": SubscriptionStatus.CANCELLED,
+    "EXPIRED": SubscriptionStatus.CANCELLED,
+}
+
+
+class SubscriptionChange:
+    """What a webhook event does to one subscription"""
+
+    def __init__(self, subscription_id: str, occurred_at: datetime,
+                 status: Optional[SubscriptionStatus] = None,
+                 next_billing_date: Optional[datetime] = None):
+        self.subscription_id = subscription_id
+        self.occurred_at = occurred_at
+        self.status = status
+        self.next_billing_date = next_billing_date
+
+
+def _timestamp(value: int) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _iso(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def stripe_change(event: dict) -> Optional[SubscriptionChange]:
+    """Subscription change described by a Stripe event, if any"""
+    event_type = event.get("type", "")
+    obj = event.get("data", {}).get("object", {})
+    occurred_at = _timestamp(event["created"])
+
+    if event_type.startswith("customer.subscription."):
+        status = (SubscriptionStatus.CANCELLED if event_type == "customer.subscription.deleted"
+                  else STRIPE_STATUSES.get(obj.get("status")))
+        period_end = obj.get("current_period_end")
+        return SubscriptionChange(obj["id"], occurred_at, status,
+                                  _timestamp(period_end) if period_end else None)
+    if event_type in ("invoice.paid", "invoice.payment_succeeded") and obj.get("subscription"):
+        return SubscriptionChange(obj["subscription"], occurred_at, SubscriptionStatus.ACTIVE)
+    if event_type == "invoice.payment_failed" and obj.get("subscription"):
+        return SubscriptionChange(obj["subscription"], occurred_at, SubscriptionStatus.PAST_DUE)
+    return None
+
+
+def paypal_change(event: dict) -> Optional[SubscriptionChange]:
+    """Subscription change described by a PayPal event, if any"""
+    event_type = event.get("event_type", "")
+    if event_type not in PAYPAL_EVENT_STATUSES:
+        return None
+    resource = event.get("resource", {})
+    occurred_at = _iso(event["create_time"])
+
+    if event_type == "PAYMENT.SALE.COMPLETED":
+        if not resource.get("billing_agreement_id"):
+            return None
+        return SubscriptionChange(resource["billing_agreement_id"], occurred_at,
+                                  SubscriptionStatus.ACTIVE)
+
+    status = PAYPAL_EVENT_STATUSES[event_type] or PAYPAL_STATUSES.get(resource.get("status"))
+    next_billing = resource.get("billing_info", {}).get("next_billing_time")
+    return SubscriptionChange(resource["id"], occurred_at, status,
+                              _iso(next_billing) if next_billing else None)
+
+
+CHANGE_PARSERS = {
+    PaymentProvider.STRIPE: stripe_change,
+    PaymentProvider.PAYPAL: paypal_change,
+}
+
+
+class WebhookService:
+    """Durable webhook intake and the consumer that applies it
+
+    Requests only store the verified event, so providers get their 2xx in
+    one INSERT. The consumer claims pending events in batches, loads every
+    subscription they touch in one query and commits the batch at once.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def receive(self, provider: PaymentProvider, event_id: str, event_type: str,
+                payload: bytes) -> bool:
+        """Store a verified event; False if it was already received"""
+        self.db.add(WebhookEvent(
+            provider=provider,
+            event_id=event_id,
+            event_type=event_type,
+            payload=payload.decode()
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            events_received.inc(provider=provider.value, duplicate="true")
+            return False
+        events_received.inc(provider=provider.value, duplicate="false")
+        return True
+
+    def process_batch(self, batch_size: int = WEBHOOK_BATCH_SIZE) -> int:
+        """Apply up to batch_size pending events in arrival order; returns how many"""
+        events = self.db.query(WebhookEvent).filter(
+            WebhookEvent.status == WebhookEventStatus.PENDING
+        ).order_by(WebhookEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not events:
+            return 0
+
+        changes: List[Tuple[WebhookEvent, Optional[SubscriptionChange]]] = []
+        for event in events:
+            try:
+                changes.append((event, CHANGE_PARSERS[event.provider](json.loads(event.payload))))
+            except (KeyError, TypeError, ValueError) as e:
+                event.status = WebhookEventStatus.FAILED
+                event.error = f"{type(e).__name__}: {e}"
+
+        subscriptions = self._subscriptions_for(
+            (event.provider, change.subscription_id) for event, change in changes if change)
+
+        now = datetime.now(timezone.utc)
+        changed_users = set()
+        for event, change in changes:
+            subscription = change and subscriptions.get((event.provider, change.subscription_id))
+            if subscription is None:
+                event.status = WebhookEventStatus.IGNORED
+            else:
+                self._apply(subscription, change)
+                changed_users.add(subscription.user_id)
+                event.status = WebhookEventStatus.PROCESSED
+            event.processed_at = now
+
+        self.db.commit()
+        if changed_users:
+            entitlement_service.invalidate(*changed_users)
+        for event in events:
+            events_applied.inc(status=event.status.value)
+        return len(events)
+
+    def _subscriptions_for(self, keys) -> Dict[Tuple[PaymentProvider, str], Subscription]:
+        keys = set(keys)
+        if not keys:
+            return {}
+        subscriptions = self.db.query(Subscription).filter(
+            tuple_(Subscription.payment_provider, Subscription.provider_subscription_id).in_(keys)
+        ).all()
+        return {(subscription.payment_provider, subscription.provider_subscription_id): subscription
+                for subscription in subscriptions}
+
+    @staticmethod
+    def _apply(subscription: Subscription, change: SubscriptionChange) -> None:
+        """Apply a change unless a newer event has already been applied"""
+        last_event_at = subscription.last_event_at
+        if last_event_at is not None and last_event_at.tzinfo is None:
+            last_event_at = last_event_at.replace(tzinfo=timezone.utc)
+        if last_event_at is not None and change.occurred_at < last_event_at:
+            return
+
+        subscription.last_event_at = change.occurred_at
+        if change.status is not None and change.status != subscription.status:
+            subscription.status = change.status
+            if change.status == SubscriptionStatus.CANCELLED:
+                subscription.cancelled_at = change.occurred_at
+        if change.next_billing_date is not None:
+            subscription.next_billing_date = change.next_billing_date
+
+
+def run_consumer(max_batches: int = 50) -> int:
+    """Drain pending webhook events with its own session"""
+    started = time.perf_counter()
+    total = 0
+    db = SessionLocal()
+    try:
+        service = WebhookService(db)
+        for _ in range(max_batches):
+            processed = service.process_batch()
+            total += processed
+            if processed < WEBHOOK_BATCH_SIZE:
+                break
+    finally:
+        db.close()
+    if total:
+        logger.info("Applied %d webhook events in %.2fs", total, time.perf_counter() - started)
+    return total
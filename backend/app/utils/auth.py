@@ -1,34 +1,72 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from app.database import get_db
 from app.models.user import User
+from app.services.entitlement_service import EntitlementService
+from app.utils.timing import phase
+from typing import Optional
+import hmac
 import os
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get current authenticated user"""
+def get_user_from_token(token: str, db: Session) -> Optional[User]:
+    """Resolve a bearer token to its user, or None if it isn't valid"""
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            return None
     except JWTError:
-        raise credentials_exception
+        return None
+
+    return db.query(User).filter(User.email == email).first()
 
-    user = db.query(User).filter(User.email == email).first()
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Get current authenticated user"""
+    with phase("auth"):
+        user = get_user_from_token(token, db)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
+
+
+def get_premium_user(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Get current user, requiring an active subscription"""
+    if not EntitlementService(db).is_premium(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="An active subscription is required"
+        )
+    return current_user
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """Whether token is the ADMIN_TOKEN operator token; never when none is set"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token and token and hmac.compare_digest(token, admin_token))
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Require the ADMIN_TOKEN operator token; admin routes are off until it is set"""
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Admin endpoints are not configured"
+        )
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
@@ -0,0 +1,259 @@
+"""Negotiated response compression
+
+API responses are compressed on the fly by ``CompressionMiddleware`` once
+they pass a size threshold; streamed responses are compressed chunk by
+chunk and flushed, so each line still reaches the client as it's sent.
+Static files are compressed ahead of time (``python -m
+app.utils.compression static``) and ``PrecompressedStaticFiles`` serves
+the ``.br``/``.gz`` siblings directly.
+"""
+import gzip
+import mimetypes
+import os
+import sys
+import zlib
+from typing import Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Below this many bytes, compressing costs more time than the transfer saves
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+# Dynamic responses favour speed. On item pages gzip 5 is within 2% of
+# gzip 9's size at a third of its CPU, and brotli 4 is smaller than either
+# at under 1ms per 100KB, where brotli 11 takes hundreds of milliseconds
+# (benchmarks/bench_compression.py). Static files use the maximum once.
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Server preference when the client accepts several equally
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli else ("gzip",)
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "application/manifest+json", "image/svg+xml",
+}
+# Small, latency-sensitive frames that proxies and EventSource expect as is
+UNCOMPRESSED_TYPES = {"text/event-stream"}
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    """Whether a response of content_type is worth compressing"""
+    if not content_type:
+        return False
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in UNCOMPRESSED_TYPES:
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES \
+        or media_type.endswith("+json")
+
+
+def negotiate(accept_encoding: str, available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """The available encoding the client prefers, honouring q-values, or None"""
+    available = tuple(available)
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name:
+            weights[name.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality, mode=brotli.MODE_TEXT)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        """Everything compressed so far, decodable without the rest"""
+        if self._brotli:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """Compress text-like responses in the encoding the client prefers
+
+    Complete bodies under minimum_size, already-encoded responses and
+    binary types pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 gzip_level: int = COMPRESSION_GZIP_LEVEL,
+                 brotli_quality: int = COMPRESSION_BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await self.app(scope, receive, _CompressingSender(self, encoding, send))
+
+
+class _CompressingSender:
+    """ASGI send wrapper deciding on compression at the first body chunk"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            await self._begin(message)
+        elif self.passthrough:
+            await self.send(message)
+        else:
+            await self._stream(message)
+
+    async def _begin(self, message: Message) -> None:
+        start, self.start = self.start, None
+        headers = MutableHeaders(scope=start)
+        body = message.get("body", b"")
+        streaming = message.get("more_body", False)
+
+        if "content-encoding" in headers or not compressible(headers.get("content-type")):
+            self.passthrough = True
+        else:
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None or (not streaming and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+        if self.passthrough:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        self.compressor = _Compressor(self.encoding, self.middleware.gzip_level,
+                                      self.middleware.brotli_quality)
+        headers["Content-Encoding"] = self.encoding
+        if streaming:
+            del headers["Content-Length"]
+            await self.send(start)
+            await self._stream(message)
+            return
+
+        compressed = self.compressor.compress(body) + self.compressor.finish()
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _stream(self, message: Message) -> None:
+        body = self.compressor.compress(message.get("body", b""))
+        more_body = message.get("more_body", False)
+        body += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves a file's .br or .gz sibling when accepted"""
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200):
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        if not compressible(media_type):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        available = [encoding for encoding in ("br", "gzip")
+                     if os.path.isfile(full_path + SUFFIXES[encoding])]
+        encoding = negotiate(request_headers.get("accept-encoding", ""), available)
+        if encoding is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.add_vary_header("Accept-Encoding")
+            return response
+
+        variant = full_path + SUFFIXES[encoding]
+        response = FileResponse(variant, status_code=status_code, stat_result=os.stat(variant),
+                                method=scope["method"], media_type=media_type,
+                                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def precompress(directory: str, minimum_size: int = COMPRESSION_MIN_BYTES) -> int:
+    """Write maximally compressed .gz (and .br) siblings of text-like files
+
+    Files whose siblings are already newer are skipped, as are siblings
+    that wouldn't be smaller. Returns how many files were written.
+    """
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if name.endswith((".gz", ".br")) or not compressible(mimetypes.guess_type(name)[0]):
+                continue
+            stat = os.stat(path)
+            if stat.st_size < minimum_size:
+                continue
+
+            with open(path, "rb") as source:
+                data = source.read()
+            encoders = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli:
+                encoders[".br"] = lambda data: brotli.compress(data, quality=11)
+            for suffix, encode in encoders.items():
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                    continue
+                compressed = encode(data)
+                if len(compressed) < len(data):
+                    with open(target, "wb") as out:
+                        out.write(compressed)
+                    written += 1
+    return written
+
+
+if __name__ == "__main__":
+    for directory in sys.argv[1:] or ["static"]:
+        if os.path.isdir(directory):
+            print(f"{directory}: wrote {precompress(directory)} compressed files")
@@ -0,0 +1,91 @@
+from functools import lru_cache
+from typing import Callable, FrozenSet, List, Mapping, Optional, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model, field_validator
+from sqlalchemy.orm import load_only, noload
+
+Fields = Optional[FrozenSet[str]]
+
+# Always returned, so clients can key and page through results
+REQUIRED_FIELDS = frozenset({"id"})
+
+
+def parse_fields(value: Optional[str], schema: Type[BaseModel]) -> Fields:
+    """Fields of schema named in a comma-separated ``fields`` parameter, or None for all
+
+    A schema's ``sparse_dependencies`` adds the fields its validators need
+    to compute a requested one. Raises ValueError for names schema doesn't
+    have.
+    """
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - schema.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    for name in list(names):
+        names |= getattr(schema, "sparse_dependencies", {}).get(name, set())
+    return frozenset(names) | REQUIRED_FIELDS
+
+
+def sparse_fields(schema: Type[BaseModel]) -> Callable[..., Fields]:
+    """Dependency reading the ``fields`` query parameter for responses of schema"""
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated {schema.__name__} fields to return; all by default")
+    ) -> Fields:
+        try:
+            return parse_fields(fields, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return dependency
+
+
+@lru_cache(maxsize=256)
+def _sparse_model(schema: Type[BaseModel], fields: FrozenSet[str]) -> Type[BaseModel]:
+    """A copy of schema with only fields, keeping their validators"""
+    definitions = {name: (info.annotation, info)
+                   for name, info in schema.model_fields.items() if name in fields}
+    validators = {}
+    for name, decorator in schema.__pydantic_decorators__.field_validators.items():
+        targets = [field for field in decorator.info.fields if field in fields]
+        if targets:
+            validators[name] = field_validator(*targets, mode=decorator.info.mode)(decorator.func)
+    return create_model(f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True),
+                        __validators__=validators, **definitions)
+
+
+@lru_cache(maxsize=256)
+def _sparse_list_adapter(schema: Type[BaseModel], fields: FrozenSet[str]) -> TypeAdapter:
+    return TypeAdapter(List[_sparse_model(schema, fields)])
+
+
+def list_adapter(adapter: TypeAdapter, schema: Type[BaseModel], fields: Fields) -> TypeAdapter:
+    """adapter for full responses, or a cached one for a list of schema narrowed to fields"""
+    if fields is None:
+        return adapter
+    return _sparse_list_adapter(schema, fields)
+
+
+def load_options(entity, fields: Fields, relationships: Mapping[str, object],
+                 always: tuple = ()) -> list:
+    """Loader options for an ORM list query that only loads what fields need
+
+    relationships maps response fields to the loader option used when
+    they are requested; the rest aren't loaded at all.
+    """
+    if fields is None:
+        return list(relationships.values())
+
+    columns = set(always) | (fields & set(entity.__mapper__.column_attrs.keys()))
+    options = []
+    for name, loader in relationships.items():
+        attribute = getattr(entity, name)
+        if name in fields:
+            # Relationship loads need the foreign keys they join on
+            columns.update(column.key for column in attribute.property.local_columns)
+            options.append(loader)
+        else:
+            options.append(noload(attribute))
+    return [load_only(*(getattr(entity, name) for name in sorted(columns)))] + options
@@ -0,0 +1,158 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Upper bounds in seconds, suited to request and outbound call latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """A named metric with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down
+
+    multiprocess_mode says how values from several worker processes
+    combine: "sum" for per-process quantities such as in-flight requests,
+    "max" for values every worker computes the same way.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (),
+                 multiprocess_mode: str = "max"):
+        super().__init__(name, description, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets
+
+    Each label set maps to a list of per-bucket counts, the last bucket
+    being +Inf, followed by the sum of observations.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe how long the block takes"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def value(self, **labels) -> float:
+        """How many values have been observed"""
+        counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts else 0.0
+
+    def samples(self) -> Dict[LabelValues, List[float]]:
+        with self._lock:
+            return {key: list(counts) for key, counts in self._values.items()}
+
+
+class Registry:
+    """Process-wide collection of metrics, keyed by name"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, labelnames: Iterable[str],
+                       **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, labelnames, **options)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Iterable[str] = (),
+              multiprocess_mode: str = "max") -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames,
+                                   multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name: str, description: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+    def all(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+
+registry = Registry()
@@ -0,0 +1,25 @@
+"""Instrumentation for calls to third-party providers"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.utils import tracing
+from app.utils.metrics import registry
+
+external_calls = registry.histogram(
+    "external_call_duration_seconds", "Outbound provider call latency by outcome",
+    ["service", "outcome"])
+
+
+@contextmanager
+def outbound_call(service: str, operation: str = "") -> Iterator[None]:
+    """Time a call to service in a client span; it counts as an error if the block raises"""
+    started = time.perf_counter()
+    outcome = "error"
+    name = f"{service} {operation}" if operation else service
+    try:
+        with tracing.span(name, tracing.CLIENT, {"peer.service": service}):
+            yield
+        outcome = "ok"
+    finally:
+        external_calls.observe(time.perf_counter() - started, service=service, outcome=outcome)
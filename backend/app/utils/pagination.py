@@ -0,0 +1,31 @@
+import base64
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(
+            padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def next_cursor(rows: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after rows, or None if this was the last page"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -1,17 +1,29 @@
 import os
+from functools import lru_cache
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 import random
 import string
 
+from app.utils.outbound import outbound_call
+
 # Twilio configuration
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+TWILIO_TIMEOUT_SECONDS = float(os.getenv("TWILIO_TIMEOUT_SECONDS", "10"))
 
 # In-memory storage for verification codes (use Redis in production)
 verification_codes = {}
 
 
+@lru_cache(maxsize=1)
+def get_twilio_client() -> Client:
+    """One client for the process, so its pooled HTTPS connections are reused"""
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                  http_client=TwilioHttpClient(timeout=TWILIO_TIMEOUT_SECONDS))
+
+
 def send_verification_sms(phone_number: str) -> bool:
     """Send SMS verification code"""
     try:
@@ -23,15 +35,16 @@ def send_verification_sms(phone_number: str) -> bool:
                 f"Mock SMS sent to {phone_number}: Your verification code is {code}")
             return True
 
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        client = get_twilio_client()
         code = ''.join(random.choices(string.digits, k=6))
         verification_codes[phone_number] = code
 
-        message = client.messages.create(
-            body=f"Your Trade Me verification code is: {code}",
-            from_=TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
+        with outbound_call("twilio", "messages.create"):
+            message = client.messages.create(
+                body=f"Your Trade Me verification code is: {code}",
+                from_=TWILIO_PHONE_NUMBER,
+                to=phone_number
+            )
         return True
     except Exception as e:
         print(f"Error sending SMS: {e}")
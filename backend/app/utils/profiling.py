@@ -0,0 +1,198 @@
+"""On-demand request profiling
+
+A request carrying ``X-Profile: sample`` or ``X-Profile: trace`` (or the
+``profile`` query parameter) together with a valid ``X-Admin-Token`` is
+profiled by ``ProfilingMiddleware``:
+
+- sample: a background thread records the event loop thread's stack
+  every ``PROFILE_SAMPLE_INTERVAL_MS``; cheap enough for production
+- trace: every Python and C call is timed with ``sys.setprofile``;
+  exact, but the request runs several times slower
+
+With ``PROFILE_SAMPLE_EVERY`` set to N, one request in N is also sampled
+without being asked to.
+
+Profiles are written to ``PROFILE_DIR`` as folded stacks (one
+``frame;frame;frame weight`` line per stack; samples for sample mode,
+microseconds for trace mode), which speedscope and flamegraph.pl read.
+Only the newest ``PROFILE_KEEP`` files are kept. Both modes follow the
+event loop thread, so other requests it interleaves with show up too.
+"""
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.auth import admin_token_valid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Profile one request in this many with the sampler; 0 turns it off
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))
+
+MODES = ("sample", "trace")
+
+# sys.setprofile is per thread and the event loop has one, so one trace at a time
+_tracing = threading.Lock()
+
+
+def _label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> str:
+    """frame's call stack as a folded line, outermost first"""
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Counts the stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_stack(frame)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+
+class TracingProfiler:
+    """Times every call on the current thread with sys.setprofile
+
+    Time between two profile events is charged to the stack that was
+    running, in microseconds; C functions appear as leaves.
+    """
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self._running: Optional[str] = None
+        self._last = 0.0
+
+    def _event(self, frame, event, arg) -> None:
+        now = time.perf_counter()
+        if self._running is not None:
+            self.stacks[self._running] += (now - self._last) * 1_000_000
+        if event == "c_call":
+            self._running = f"{_stack(frame)};{getattr(arg, '__qualname__', repr(arg))} (C)"
+        elif event in ("call", "c_return", "c_exception"):
+            self._running = _stack(frame)
+        else:
+            # A return (or a coroutine suspending) resumes the caller
+            self._running = _stack(frame.f_back) if frame.f_back is not None else None
+        self._last = time.perf_counter()
+
+    def start(self) -> None:
+        self._last = time.perf_counter()
+        sys.setprofile(self._event)
+
+    def stop(self) -> None:
+        sys.setprofile(None)
+
+
+def write_profile(stacks: Counter, name: str, directory: str = PROFILE_DIR,
+                  keep: int = PROFILE_KEEP) -> str:
+    """Write stacks as folded lines to directory/name, dropping the oldest
+    profiles beyond keep; returns the path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "w") as out:
+        for stack, weight in stacks.most_common():
+            if int(weight):
+                out.write(f"{stack} {int(weight)}\n")
+    profiles = sorted((entry for entry in os.scandir(directory)
+                       if entry.is_file() and entry.name.endswith(".folded")),
+                      key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in profiles[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    return path
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it, and one in sample_every of the rest"""
+
+    def __init__(self, app: ASGIApp, sample_every: int = PROFILE_SAMPLE_EVERY,
+                 directory: str = PROFILE_DIR):
+        self.app = app
+        self.sample_every = sample_every
+        self.directory = directory
+        self._requests = itertools.count(1)
+
+    def _requested_mode(self, scope: Scope) -> Optional[str]:
+        headers = Headers(scope=scope)
+        mode = headers.get("x-profile")
+        if mode is None and b"profile=" in scope.get("query_string", b""):
+            mode = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+        if mode is None:
+            return None
+        mode = mode.lower() if mode.lower() in MODES else "sample"
+        return mode if admin_token_valid(headers.get("x-admin-token")) else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self._requested_mode(scope)
+        if mode is None and self.sample_every and next(self._requests) % self.sample_every == 0:
+            mode = "sample"
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if mode == "trace" and _tracing.acquire(blocking=False):
+            profiler = TracingProfiler()
+        else:
+            mode, profiler = "sample", SamplingProfiler(threading.get_ident())
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns() % 1_000_000:06d}-" \
+            f"{scope['method']}-{slug}-{mode}.folded"
+
+        async def send_with_name(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile", name)
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            profiler.stop()
+            if mode == "trace":
+                _tracing.release()
+            try:
+                write_profile(profiler.stacks, name, self.directory)
+            except OSError:
+                logger.exception("Could not write profile %s", name)
@@ -0,0 +1,237 @@
+"""Prometheus exposition of the metrics registry
+
+``/metrics`` renders every registered metric in the Prometheus text
+format. With several uvicorn workers in one container, set
+``METRICS_MULTIPROC_DIR`` to a directory they share: each worker writes
+a snapshot of its registry there every ``METRICS_FLUSH_INTERVAL_SECONDS``
+and whichever worker is scraped merges the live ones with its own.
+"""
+import hmac
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Header, HTTPException, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import engine
+from app.utils.metrics import Registry, registry
+
+logger = logging.getLogger(__name__)
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+# When set, scrapes must send it as a bearer token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests being handled", multiprocess_mode="sum")
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to response headers by route and status",
+    ["method", "route", "status"])
+pool_connections = registry.gauge(
+    "db_pool_connections", "SQLAlchemy pool connections by state", ["state"],
+    multiprocess_mode="sum")
+
+
+def update_pool_stats() -> None:
+    """Copy the engine pool's current counts into pool_connections"""
+    pool = engine.pool
+    for state, reading in (("checked_out", "checkedout"), ("idle", "checkedin"),
+                           ("overflow", "overflow"), ("size", "size")):
+        if hasattr(pool, reading):
+            pool_connections.set(getattr(pool, reading)(), state=state)
+
+
+def snapshot(source: Registry = registry) -> List[dict]:
+    """This process's metrics as JSON-serializable dicts"""
+    update_pool_stats()
+    metrics = []
+    for metric in source.all():
+        metrics.append({
+            "name": metric.name,
+            "kind": metric.kind,
+            "description": metric.description,
+            "labelnames": list(metric.labelnames),
+            "mode": getattr(metric, "multiprocess_mode", "sum"),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": [[list(key), value] for key, value in metric.samples().items()],
+        })
+    return metrics
+
+
+def write_snapshot(directory: str = METRICS_MULTIPROC_DIR) -> None:
+    """Publish this process's snapshot for the other workers to merge"""
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as out:
+        json.dump(snapshot(), out)
+    os.replace(f"{path}.tmp", path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect(directory: str = METRICS_MULTIPROC_DIR) -> List[List[dict]]:
+    """Snapshots of this process and of the live workers sharing directory
+
+    Snapshots left by workers that have exited are deleted.
+    """
+    snapshots = [snapshot()]
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension != ".json" or not stem.isdigit() or int(stem) == os.getpid():
+            continue
+        path = os.path.join(directory, name)
+        if not _alive(int(stem)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as source:
+                snapshots.append(json.load(source))
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics snapshot %s", path)
+    return snapshots
+
+
+def merge(snapshots: List[List[dict]]) -> List[dict]:
+    """Combine per-process snapshots: counters and histograms add up,
+    gauges follow their multiprocess mode"""
+    merged: Dict[str, dict] = {}
+    for metrics in snapshots:
+        for metric in metrics:
+            target = merged.setdefault(metric["name"], {**metric, "samples": {}})
+            samples = target["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = value
+                elif metric["kind"] == "histogram":
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                elif metric["kind"] == "gauge" and metric["mode"] == "max":
+                    samples[key] = max(current, value)
+                else:
+                    samples[key] = current + value
+    return list(merged.values())
+
+
+def _number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(names: List[str], values, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                         .replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(metrics: List[dict]) -> str:
+    """Metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in sorted(metrics, key=lambda metric: metric["name"]):
+        name, names = metric["name"], metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['description']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        for key, value in sorted(metric["samples"].items()):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], value[:-1]):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{name}_bucket{_labels(names, key, le)} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, key)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, key)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def exposition(directory: str = METRICS_MULTIPROC_DIR) -> str:
+    """Everything /metrics returns"""
+    return render(merge(collect(directory)))
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """Dependency refusing scrapes without METRICS_TOKEN, when one is set"""
+    if not METRICS_TOKEN:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+_routes: Dict[object, str] = {}
+
+
+def route_template(scope: Scope) -> str:
+    """The path template of the route that handled scope
+
+    Requests no route matched are "unmatched", so arbitrary paths can't
+    create new series.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        if endpoint not in _routes:
+            for route in scope["app"].routes:
+                if hasattr(route, "endpoint"):
+                    _routes.setdefault(route.endpoint, route.path)
+        return _routes.setdefault(endpoint, "unmatched")
+    # Mounted apps such as /static
+    return scope.get("root_path") or "unmatched"
+
+
+class MetricsMiddleware:
+    """Count in-flight requests and time each one by its route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+        requests_in_flight.inc()
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                request_duration.observe(time.perf_counter() - started, method=scope["method"],
+                                         route=route_template(scope), status=str(message["status"]))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            requests_in_flight.dec()
+            if not observed:
+                request_duration.observe(time.perf_counter() - started, method=scope["method"],
+                                         route=route_template(scope), status="500")
@@ -0,0 +1,98 @@
+"""Detection of repeated query shapes, the signature of N+1 loading
+
+A response model that lazy-loads a relation per row runs one statement
+of the same shape for every row. ``repeated_shapes`` groups statements
+by their shape (see ``statement_shape``) and reports those run more
+than a threshold number of times.
+
+``RepeatedQueryMiddleware`` applies it to every request when
+``N_PLUS_ONE_DETECTION`` is "warn" or "raise"; it is meant for
+development and adds nothing when off. Tests use ``check_queries``.
+"""
+import logging
+import os
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.database import engine
+from app.utils.slow_queries import statement_shape
+
+logger = logging.getLogger(__name__)
+
+# "off", "warn" (log each offending request) or "raise"
+N_PLUS_ONE_DETECTION = os.getenv("N_PLUS_ONE_DETECTION", "off").lower()
+# A shape may run this many times in one request before it is reported
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+
+class RepeatedQueryError(AssertionError):
+    """Statements of one shape ran more often than allowed"""
+
+
+def repeated_shapes(statements: Iterable[str],
+                    threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+    """Shapes among statements that ran more than threshold times, with their counts"""
+    counts = Counter(statement_shape(statement) for statement in statements)
+    return {shape: count for shape, count in counts.most_common() if count > threshold}
+
+
+def describe(repeats: Dict[str, int]) -> str:
+    return "; ".join(f"{count}x {shape[:160]}" for shape, count in repeats.items())
+
+
+def check_queries(statements: List[str], budget: Optional[int] = None,
+                  threshold: int = N_PLUS_ONE_THRESHOLD) -> None:
+    """Raise RepeatedQueryError if a shape repeats past threshold or,
+    with a budget, if more than budget statements ran"""
+    repeats = repeated_shapes(statements, threshold)
+    if repeats:
+        raise RepeatedQueryError(f"Repeated queries: {describe(repeats)}")
+    if budget is not None and len(statements) > budget:
+        raise RepeatedQueryError(
+            f"{len(statements)} queries over a budget of {budget}: "
+            + "; ".join(statement_shape(statement)[:80] for statement in statements))
+
+
+_statements: ContextVar[Optional[List[str]]] = ContextVar("request_statements", default=None)
+
+
+def _collect(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+class RepeatedQueryMiddleware:
+    """Report requests that ran one statement shape more than threshold times"""
+
+    def __init__(self, app: ASGIApp, mode: str = N_PLUS_ONE_DETECTION,
+                 threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.mode = mode
+        self.threshold = threshold
+        if not event.contains(engine, "before_cursor_execute", _collect):
+            event.listen(engine, "before_cursor_execute", _collect)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        statements: List[str] = []
+        token = _statements.set(statements)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statements.reset(token)
+
+        repeats = repeated_shapes(statements, self.threshold)
+        if not repeats:
+            return
+        message = f"{scope['method']} {scope['path']} repeated queries: {describe(repeats)}"
+        if self.mode == "raise":
+            raise RepeatedQueryError(message)
+        logger.warning(message)
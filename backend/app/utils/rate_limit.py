@@ -0,0 +1,44 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Async limiter allowing rate calls per second with bursts up to burst"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LimitedCaller:
+    """Runs coroutines with at most concurrency in flight and a rate cap
+
+    Used in front of payment providers so a large batch can't exceed
+    their API limits.
+    """
+
+    def __init__(self, concurrency: int, rate: float, burst: Optional[float] = None):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args) -> T:
+        async with self._semaphore:
+            await self._bucket.acquire()
+            return await func(*args)
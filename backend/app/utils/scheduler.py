@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import random
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """A blocking function run in a worker thread every interval seconds"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.task: Optional[asyncio.Task] = None
+
+    async def run_forever(self) -> None:
+        # Spread the first run so workers started together don't collide
+        await asyncio.sleep(random.uniform(0, min(self.interval, 30)))
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.func)
+            except Exception:
+                logger.exception("Periodic job %s failed", self.name)
+            await asyncio.sleep(self.interval)
+
+
+class Scheduler:
+    """Runs registered periodic jobs for the lifetime of the application"""
+
+    def __init__(self):
+        self.jobs: List[PeriodicJob] = []
+
+    def register(self, name: str, interval: float, func: Callable[[], object]) -> None:
+        self.jobs.append(PeriodicJob(name, interval, func))
+
+    def start(self) -> None:
+        for job in self.jobs:
+            job.task = asyncio.create_task(job.run_forever(), name=job.name)
+
+    async def stop(self) -> None:
+        tasks = [job.task for job in self.jobs if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self.jobs:
+            job.task = None
+
+
+scheduler = Scheduler()
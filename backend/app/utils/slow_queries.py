@@ -0,0 +1,204 @@
+"""Slow-query detection on the engine
+
+Statements taking longer than ``SLOW_QUERY_THRESHOLD_MS`` are recorded
+with their shape, redacted parameters, duration and the service (or
+router) function that ran them. Slow SELECTs also get a query plan,
+``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL or ``EXPLAIN QUERY PLAN``
+on SQLite, captured at most once per statement shape every
+``SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS`` since it runs the query again.
+
+Records go to a rotating JSON-lines file when ``SLOW_QUERY_LOG_FILE`` is
+set, and the most recent are kept for ``GET /api/admin/slow-queries``.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Negative disables detection
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(
+    os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", "10485760"))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", "200"))
+
+SERVICES = os.path.join("app", "services", "")
+ROUTERS = os.path.join("app", "routers", "")
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists and multi-row VALUES vary in length with the data
+_PLACEHOLDER = r"\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*"
+_PLACEHOLDER_LIST = re.compile(rf"\((?:{_PLACEHOLDER},)+{_PLACEHOLDER}\)")
+
+
+def statement_shape(statement: str) -> str:
+    """statement on one line with placeholder lists collapsed"""
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def redact(parameters) -> object:
+    """parameters with each value replaced by its type name"""
+    if isinstance(parameters, dict):
+        return {name: redact(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.relpath(code.co_filename)}:{frame.f_lineno} " \
+        f"{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def find_caller() -> Optional[str]:
+    """The innermost public service method on the stack
+
+    Falls back to a private service helper, then to a router function.
+    Described as "path:line qualname", or None if none is found.
+    """
+    frame = sys._getframe(1)
+    helper = router = None
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if SERVICES in path:
+            if not frame.f_code.co_name.startswith("_"):
+                return _describe(frame)
+            helper = helper or _describe(frame)
+        elif ROUTERS in path:
+            router = router or _describe(frame)
+        frame = frame.f_back
+    return helper or router
+
+
+class SlowQueryLog:
+    """Recent slow queries, also written to a rotating file when configured"""
+
+    def __init__(self, keep: int = SLOW_QUERY_KEEP, path: str = SLOW_QUERY_LOG_FILE):
+        self.records: Deque[dict] = deque(maxlen=keep)
+        self._explained: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._file_logger = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS)
+            self._file_logger = logging.getLogger(f"{__name__}.file")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+
+    def should_explain(self, shape: str) -> bool:
+        """Whether shape's plan is due, claiming it if so"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(shape)
+            if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+                return False
+            self._explained[shape] = now
+            return True
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+        logger.warning("Slow query %.1fms from %s: %s", record["duration_ms"],
+                       record["caller"], record["statement"][:200])
+        if self._file_logger:
+            self._file_logger.info(json.dumps(record, default=str))
+
+    def recent(self, limit: int) -> List[dict]:
+        """Up to limit records, newest first"""
+        with self._lock:
+            return list(reversed(self.records))[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
+            self._explained.clear()
+
+
+slow_queries = SlowQueryLog()
+
+
+def explain(conn, cursor, statement: str, parameters) -> Optional[str]:
+    """The plan of a SELECT, run on the connection cursor belongs to, or None
+
+    A raw DBAPI cursor bypasses engine events, so the plan's own query
+    isn't timed or explained in turn.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(prefix + statement, parameters)
+        rows = plan_cursor.fetchall()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        plan_cursor.close()
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def record(conn, cursor, statement: str, parameters, duration: float,
+           executemany: bool) -> dict:
+    """Build and store the record of one slow statement"""
+    shape = statement_shape(statement)
+    plan = None
+    if (SLOW_QUERY_EXPLAIN and not executemany and shape.upper().startswith(("SELECT", "WITH"))
+            and slow_queries.should_explain(shape)):
+        plan = explain(conn, cursor, statement, parameters)
+    entry = {
+        "recorded_at": datetime.now(timezone.utc),
+        "duration_ms": round(duration * 1000, 2),
+        "statement": shape,
+        "parameters": redact(parameters),
+        "caller": find_caller(),
+        "plan": plan,
+    }
+    slow_queries.add(entry)
+    return entry
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if SLOW_QUERY_THRESHOLD_MS >= 0:
+        conn.info["slow_query_started"] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("slow_query_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    if duration * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        try:
+            record(conn, cursor, statement, parameters, duration, executemany)
+        except Exception:
+            logger.exception("Could not record slow query")
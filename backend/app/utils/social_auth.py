@@ -1,10 +1,260 @@
-import requests
+"""Verification of Google, Facebook and Twitter login tokens
+
+Provider calls go through one pooled ``httpx.AsyncClient``, so logins
+reuse kept-alive TLS connections and a slow provider fails the login
+after ``SOCIAL_AUTH_TIMEOUT_SECONDS`` instead of stalling the worker.
+
+Google ID tokens (JWTs) are verified locally against Google's signing
+keys, fetched from its JWKS endpoint and cached for as long as its
+``Cache-Control`` allows; other tokens are checked with the provider.
+Verified tokens are cached for ``SOCIAL_AUTH_CACHE_SECONDS``, never past
+their expiry, so a retried login doesn't pay for the round trip again.
+
+With ``SOCIAL_AUTH_PROVIDER=stub`` the client talks to ``StubProvider``,
+a local stand-in with configurable latency and failures.
+"""
+import asyncio
+import hashlib
+import logging
 import os
-from typing import Optional, Dict
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+
+from app.utils.metrics import registry
+from app.utils.outbound import outbound_call
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a provider to answer, and to connect to it
+SOCIAL_AUTH_TIMEOUT_SECONDS = float(os.getenv("SOCIAL_AUTH_TIMEOUT_SECONDS", "5"))
+SOCIAL_AUTH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SOCIAL_AUTH_CONNECT_TIMEOUT_SECONDS", "2"))
+SOCIAL_AUTH_MAX_CONNECTIONS = int(os.getenv("SOCIAL_AUTH_MAX_CONNECTIONS", "20"))
+SOCIAL_AUTH_KEEPALIVE_SECONDS = float(os.getenv("SOCIAL_AUTH_KEEPALIVE_SECONDS", "60"))
+SOCIAL_AUTH_CACHE_SECONDS = float(os.getenv("SOCIAL_AUTH_CACHE_SECONDS", "60"))
+SOCIAL_AUTH_CACHE_SIZE = int(os.getenv("SOCIAL_AUTH_CACHE_SIZE", "10000"))
+# "stub" answers logins from StubProvider; only for development and load tests
+SOCIAL_AUTH_PROVIDER = os.getenv("SOCIAL_AUTH_PROVIDER", "provider")
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+FACEBOOK_ME_URL = "https://graph.facebook.com/me"
+# Used when the JWKS response has no max-age
+GOOGLE_JWKS_DEFAULT_SECONDS = 3600
+# A token signed by an unknown key refetches the keys at most this often
+GOOGLE_JWKS_MIN_REFRESH_SECONDS = 60
+
+token_cache_requests = registry.counter(
+    "social_auth_token_cache_requests_total", "Social token checks by cache result", ["result"])
+
+
+class VerifiedTokenCache:
+    """LRU of provider user info by token, each entry expiring on its own deadline
+
+    Tokens are stored hashed, so the cache holds no usable credentials.
+    """
+
+    def __init__(self, ttl: float = SOCIAL_AUTH_CACHE_SECONDS,
+                 max_size: int = SOCIAL_AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(provider: str, token: str) -> str:
+        return hashlib.sha256(f"{provider}:{token}".encode()).hexdigest()
+
+    def get(self, provider: str, token: str) -> Optional[Dict]:
+        key = self._key(provider, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, provider: str, token: str, user_info: Dict,
+            expires_in: Optional[float] = None) -> None:
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if ttl <= 0:
+            return
+        key = self._key(provider, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, user_info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_tokens = VerifiedTokenCache()
+
+
+class StubProvider(httpx.AsyncBaseTransport):
+    """Local stand-in for the Google and Facebook endpoints, for development, tests and load tests
+
+    Access tokens named ``stub-<user>`` belong to that user; ``id_token``
+    issues Google ID tokens signed with the stub's own key, which its
+    JWKS endpoint serves. Each request waits latency seconds, timing out
+    like a real provider if that is past the client's read timeout, and
+    error_rate of them get a 503.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._pem = self._key.private_bytes(serialization.Encoding.PEM,
+                                            serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption())
+        self.kid = f"stub-{self.rng.getrandbits(32):08x}"
+
+    def id_token(self, sub: str, email: str, name: str = "Stub User",
+                 audience: Optional[str] = None, expires_in: int = 3600,
+                 email_verified: bool = True) -> str:
+        now = int(time.time())
+        claims = {"iss": GOOGLE_ISSUERS[1], "aud": audience or os.getenv("GOOGLE_CLIENT_ID", ""),
+                  "sub": sub, "email": email, "email_verified": email_verified, "name": name,
+                  "iat": now, "exp": now + expires_in}
+        return jwt.encode(claims, self._pem, algorithm="RS256", headers={"kid": self.kid})
 
+    def _jwks(self) -> Dict:
+        key = jwk.construct(self._pem, "RS256").public_key().to_dict()
+        key.update(kid=self.kid, use="sig")
+        return {"keys": [key]}
 
-def verify_google_token(token: str) -> Optional[Dict]:
-    """Verify Google OAuth token and return user info"""
+    @staticmethod
+    def _user(token: Optional[str]) -> Optional[Dict]:
+        if not token or not token.startswith("stub-"):
+            return None
+        name = token[len("stub-"):]
+        return {"id": name, "email": f"{name}@example.com", "name": name.title()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url.copy_with(query=None))
+        self.calls[url] += 1
+        timeout = request.extensions.get("timeout", {}).get("read")
+        if timeout is not None and self.latency >= timeout:
+            await asyncio.sleep(timeout)
+            raise httpx.ReadTimeout("Stub provider timed out", request=request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rng.random() < self.error_rate:
+            return httpx.Response(503, json={"error": "unavailable"})
+
+        if url == GOOGLE_JWKS_URL:
+            return httpx.Response(200, json=self._jwks(),
+                                  headers={"Cache-Control": "public, max-age=3600"})
+        if url == GOOGLE_USERINFO_URL:
+            user = self._user(request.headers.get("authorization", "").removeprefix("Bearer "))
+        elif url == FACEBOOK_ME_URL:
+            user = self._user(request.url.params.get("access_token"))
+        else:
+            return httpx.Response(404, json={"error": "not found"})
+        if user is None:
+            return httpx.Response(401, json={"error": "invalid_token"})
+        return httpx.Response(200, json=user)
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client for provider calls, created on first use"""
+    global _client
+    if _client is None:
+        transport = None
+        if SOCIAL_AUTH_PROVIDER == "stub":
+            logger.warning("SOCIAL_AUTH_PROVIDER=stub: social logins are simulated")
+            transport = StubProvider()
+        _client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(SOCIAL_AUTH_TIMEOUT_SECONDS,
+                                  connect=SOCIAL_AUTH_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=SOCIAL_AUTH_MAX_CONNECTIONS,
+                                max_keepalive_connections=SOCIAL_AUTH_MAX_CONNECTIONS,
+                                keepalive_expiry=SOCIAL_AUTH_KEEPALIVE_SECONDS))
+    return _client
+
+
+def configure(transport: Optional[httpx.AsyncBaseTransport] = None,
+              timeout: float = SOCIAL_AUTH_TIMEOUT_SECONDS) -> None:
+    """Send provider calls through transport, forgetting cached keys and tokens"""
+    global _client, _jwks, _jwks_expires, _jwks_fetched
+    _client = httpx.AsyncClient(transport=transport, timeout=timeout) if transport else None
+    _jwks, _jwks_expires, _jwks_fetched = None, 0.0, 0.0
+    verified_tokens.clear()
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+_jwks: Optional[Dict] = None
+_jwks_expires = 0.0
+_jwks_fetched = 0.0
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+async def _google_keys(kid: Optional[str]) -> Optional[Dict]:
+    """Google's JWKS, refetched when it expires or doesn't have kid"""
+    global _jwks, _jwks_expires, _jwks_fetched
+    now = time.monotonic()
+    if _jwks is not None and now < _jwks_expires:
+        if any(key.get("kid") == kid for key in _jwks["keys"]):
+            return _jwks
+        if now - _jwks_fetched < GOOGLE_JWKS_MIN_REFRESH_SECONDS:
+            return _jwks
+    with outbound_call("google", "jwks"):
+        response = await get_client().get(GOOGLE_JWKS_URL)
+    response.raise_for_status()
+    max_age = _MAX_AGE.search(response.headers.get("cache-control", ""))
+    _jwks = response.json()
+    _jwks_fetched = now
+    _jwks_expires = now + (int(max_age.group(1)) if max_age else GOOGLE_JWKS_DEFAULT_SECONDS)
+    return _jwks
+
+
+async def _verify_google_id_token(token: str) -> Optional[Tuple[Dict, float]]:
+    """User info from a Google ID token and seconds until it expires, or None if invalid"""
+    keys = await _google_keys(jwt.get_unverified_header(token).get("kid"))
+    claims = jwt.decode(token, keys, algorithms=["RS256"],
+                        audience=os.getenv("GOOGLE_CLIENT_ID"), issuer=GOOGLE_ISSUERS)
+    # Accounts are matched by email, so it has to be one Google vouches for
+    if not claims.get("email") or not claims.get("email_verified"):
+        return None
+    user_info = {"id": claims["sub"], "email": claims["email"],
+                 "name": claims.get("name", claims["email"])}
+    return user_info, claims["exp"] - time.time()
+
+
+async def verify_google_token(token: str) -> Optional[Dict]:
+    """Verify a Google ID token, or an access token, and return user info"""
     try:
         # For development, return mock data
         if not os.getenv("GOOGLE_CLIENT_ID"):
@@ -14,19 +264,33 @@ def verify_google_token(token: str) -> Optional[Dict]:
                 "name": "Mock User"
             }
 
-        # In production, verify with Google API
-        response = requests.get(
-            f"https://www.googleapis.com/oauth2/v2/userinfo?access_token={token}"
-        )
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error verifying Google token: {e}")
+        user_info = verified_tokens.get("google", token)
+        if user_info is not None:
+            token_cache_requests.inc(result="hit")
+            return user_info
+        token_cache_requests.inc(result="miss")
+
+        expires_in = None
+        if token.count(".") == 2:
+            verified = await _verify_google_id_token(token)
+            if verified is None:
+                return None
+            user_info, expires_in = verified
+        else:
+            with outbound_call("google", "userinfo"):
+                response = await get_client().get(
+                    GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {token}"})
+            if response.status_code != 200:
+                return None
+            user_info = response.json()
+        verified_tokens.put("google", token, user_info, expires_in)
+        return user_info
+    except (httpx.HTTPError, JWTError, KeyError, ValueError) as e:
+        logger.warning("Could not verify Google token: %s: %s", type(e).__name__, e)
         return None
 
 
-def verify_facebook_token(token: str) -> Optional[Dict]:
+async def verify_facebook_token(token: str) -> Optional[Dict]:
     """Verify Facebook OAuth token and return user info"""
     try:
         # For development, return mock data
@@ -37,19 +301,26 @@ def verify_facebook_token(token: str) -> Optional[Dict]:
                 "name": "Mock User"
             }
 
-        # In production, verify with Facebook API
-        response = requests.get(
-            f"https://graph.facebook.com/me?access_token={token}&fields=id,name,email"
-        )
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception as e:
-        print(f"Error verifying Facebook token: {e}")
+        user_info = verified_tokens.get("facebook", token)
+        if user_info is not None:
+            token_cache_requests.inc(result="hit")
+            return user_info
+        token_cache_requests.inc(result="miss")
+
+        with outbound_call("facebook", "me"):
+            response = await get_client().get(
+                FACEBOOK_ME_URL, params={"access_token": token, "fields": "id,name,email"})
+        if response.status_code != 200:
+            return None
+        user_info = response.json()
+        verified_tokens.put("facebook", token, user_info)
+        return user_info
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Could not verify Facebook token: %s: %s", type(e).__name__, e)
         return None
 
 
-def verify_twitter_token(token: str) -> Optional[Dict]:
+async def verify_twitter_token(token: str) -> Optional[Dict]:
     """Verify Twitter OAuth token and return user info"""
     try:
         # For development, return mock data
@@ -0,0 +1,131 @@
+"""Per-request timing of database, auth and serialization work
+
+``TimingMiddleware`` starts a ``RequestTimings`` for every HTTP request
+and, when the response starts, reports it as a ``Server-Timing`` header;
+a log line with the same figures is written once the body is sent.
+Queries are counted by engine cursor events and other work is measured
+with ``phase``. Both only add to a context-local accumulator, so they are
+cheap enough to leave on.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import engine
+from app.utils import tracing
+
+logger = logging.getLogger(__name__)
+
+# The header shows how long the database and auth took; turn it off where
+# that shouldn't be visible to clients. The log line is always written.
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+
+
+class RequestTimings:
+    """Durations accumulated while handling one request"""
+
+    __slots__ = ("started", "db_queries", "db_seconds", "phases")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Value for a Server-Timing header, durations in milliseconds"""
+        metrics = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"']
+        metrics += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being handled, or None outside one"""
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's name phase
+
+    The block also gets a span of its own when the request is traced.
+    """
+    timings = _current.get()
+    with tracing.span(name):
+        if timings is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings.add(name, time.perf_counter() - started)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = conn.info.pop("query_started", None)
+    if timings is None or started is None:
+        return
+    timings.db_queries += 1
+    timings.db_seconds += time.perf_counter() - started
+
+
+class TimingMiddleware:
+    """Time each HTTP request and report where the time went"""
+
+    def __init__(self, app: ASGIApp, header: bool = SERVER_TIMING_HEADER):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.header:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current.reset(token)
+            logger.info(
+                "request method=%s path=%s status=%d total_ms=%.1f db_queries=%d db_ms=%.1f%s",
+                scope["method"], scope["path"], status_code, timings.elapsed() * 1000,
+                timings.db_queries, timings.db_seconds * 1000,
+                "".join(f" {name}_ms={seconds * 1000:.1f}"
+                        for name, seconds in timings.phases.items()))
@@ -0,0 +1,301 @@
+"""Lightweight, OpenTelemetry-compatible tracing
+
+``TracingMiddleware`` opens a server span per request, continuing the
+trace of an incoming W3C ``traceparent`` header. Within it, ``span``
+opens child spans: ``outbound_call`` wraps every provider call, database
+transactions get a span from begin to commit or rollback, and timing
+phases such as password hashing appear too.
+
+Finished spans are written by a background thread to
+``TRACE_EXPORT_FILE`` as OTLP/JSON lines, which the OpenTelemetry
+collector's ``otlpjsonfile`` receiver and Jaeger's importer read.
+Without an export file nothing is recorded.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import engine
+from app.utils.metrics import registry
+from app.utils.prometheus import route_template
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "")
+# Share of new traces recorded; requests continuing a sampled trace always are
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "trade-me-api")
+
+# OTLP span kinds and status codes
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+dropped_spans = registry.counter(
+    "trace_spans_dropped_total", "Finished spans dropped because the export queue was full")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 kind: int = INTERNAL, sampled: bool = True,
+                 attributes: Optional[Dict[str, object]] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        if self.sampled and exporter is not None:
+            exporter.export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self) -> dict:
+        attributes = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            attributes.append({"key": key, "value": typed})
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class FileExporter:
+    """Appends finished spans to path as OTLP/JSON lines from a background thread"""
+
+    def __init__(self, path: str, queue_size: int = TRACE_QUEUE_SIZE):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._thread = threading.Thread(
+                        target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            dropped_spans.inc()
+
+    def _run(self) -> None:
+        resource = {"attributes": [{"key": "service.name",
+                                    "value": {"stringValue": SERVICE_NAME}}]}
+        while True:
+            spans = [self._queue.get()]
+            while not self._queue.empty() and len(spans) < 512:
+                spans.append(self._queue.get_nowait())
+            stop = None in spans
+            spans = [span.to_otlp() for span in spans if span is not None]
+            if spans:
+                line = json.dumps({"resourceSpans": [{
+                    "resource": resource,
+                    "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+                }]})
+                try:
+                    with open(self.path, "a") as out:
+                        out.write(line + "\n")
+                except OSError:
+                    logger.exception("Could not write %d spans to %s", len(spans), self.path)
+            for _ in range(len(spans) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Wait until every exported span has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+exporter = FileExporter(TRACE_EXPORT_FILE) if TRACE_EXPORT_FILE else None
+
+
+def configure(new_exporter) -> None:
+    """Send finished spans to new_exporter, anything with export(span); None stops tracing"""
+    global exporter
+    exporter = new_exporter
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, kind: int = INTERNAL, parent: Optional[Span] = None,
+               attributes: Optional[Dict[str, object]] = None) -> Optional[Span]:
+    """A child of parent (by default the current span), or None if the trace isn't recorded
+
+    The span isn't made current; end it with ``Span.end``.
+    """
+    parent = parent or _current.get()
+    if exporter is None or parent is None or not parent.sampled:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL,
+         attributes: Optional[Dict[str, object]] = None) -> Iterator[Optional[Span]]:
+    """Run the block in a child span of the current one, recording errors"""
+    child = start_span(name, kind, attributes=attributes)
+    if child is None:
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def _parse_traceparent(value: Optional[str]):
+    match = _TRACEPARENT.match(value or "")
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+
+class TracingMiddleware:
+    """Open a server span per request and report its trace id"""
+
+    def __init__(self, app: ASGIApp, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        parent = _current.get()
+        remote = _parse_traceparent(headers.get("traceparent")) if parent is None else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        server = Span(f"{scope['method']} {scope['path']}", trace_id, parent_id, SERVER, sampled,
+                      {"http.request.method": scope["method"], "url.path": scope["path"]})
+
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                server.attributes["http.response.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    server.status = STATUS_ERROR
+                MutableHeaders(scope=message).append("X-Trace-Id", trace_id)
+            await send(message)
+
+        token = _current.set(server)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            server.set_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            route = route_template(scope)
+            server.name = f"{scope['method']} {route}"
+            server.attributes["http.route"] = route
+            server.end()
+
+
+@event.listens_for(engine, "begin")
+def _begin(conn):
+    transaction = start_span("db.transaction", CLIENT, attributes={
+        "db.system": conn.dialect.name, "db.statements": 0})
+    if transaction is not None:
+        conn.info["trace_span"] = transaction
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    transaction = conn.info.get("trace_span")
+    if transaction is not None:
+        transaction.attributes["db.statements"] += 1
+
+
+def _end_transaction(conn, outcome: str) -> None:
+    transaction = conn.info.pop("trace_span", None)
+    if transaction is not None:
+        transaction.attributes["db.outcome"] = outcome
+        transaction.end()
+
+
+@event.listens_for(engine, "commit")
+def _commit(conn):
+    _end_transaction(conn, "commit")
+
+
+@event.listens_for(engine, "rollback")
+def _rollback(conn):
+    _end_transaction(conn, "rollback")
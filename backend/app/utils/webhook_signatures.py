@@ -0,0 +1,106 @@
+import base64
+import json
+import os
+import threading
+import zlib
+from typing import Dict, Mapping
+from urllib.parse import urlparse
+
+import httpx
+import stripe
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from app.utils.outbound import outbound_call
+
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+PAYPAL_WEBHOOK_ID = os.getenv("PAYPAL_WEBHOOK_ID", "")
+# Hosts PayPal signing certificates may be fetched from; load tests add a
+# local stand-in here
+PAYPAL_CERT_HOSTS = [
+    host.strip() for host in
+    os.getenv("PAYPAL_CERT_HOSTS", "api.paypal.com,api.sandbox.paypal.com").split(",")
+    if host.strip()
+]
+LOCAL_HOSTS = {"localhost", "127.0.0.1"}
+
+
+class WebhookVerificationError(Exception):
+    """The webhook's signature is missing or doesn't match its payload"""
+
+
+class WebhookConfigurationError(Exception):
+    """The secret needed to verify a provider's webhooks isn't set"""
+
+
+def verify_stripe(payload: bytes, signature: str) -> dict:
+    """Check a Stripe-Signature header and return the parsed event"""
+    if not STRIPE_WEBHOOK_SECRET:
+        # An empty secret would accept signatures anyone can compute
+        raise WebhookConfigurationError("STRIPE_WEBHOOK_SECRET is not set")
+    try:
+        stripe.Webhook.construct_event(payload, signature, STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        raise WebhookVerificationError(str(e)) from e
+    return json.loads(payload)
+
+
+# Signing certificates by URL; PayPal rotates them rarely
+_certificates: Dict[str, x509.Certificate] = {}
+_certificates_lock = threading.Lock()
+
+
+async def _paypal_certificate(cert_url: str) -> x509.Certificate:
+    url = urlparse(cert_url)
+    if url.hostname not in PAYPAL_CERT_HOSTS:
+        raise WebhookVerificationError(f"Untrusted certificate host {url.hostname}")
+    if url.scheme != "https" and url.hostname not in LOCAL_HOSTS:
+        raise WebhookVerificationError("Certificate must be fetched over https")
+
+    certificate = _certificates.get(cert_url)
+    if certificate is None:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            with outbound_call("paypal", "certificate"):
+                response = await client.get(cert_url)
+        response.raise_for_status()
+        certificate = x509.load_pem_x509_certificate(response.content)
+        with _certificates_lock:
+            _certificates[cert_url] = certificate
+    return certificate
+
+
+async def verify_paypal(payload: bytes, headers: Mapping[str, str]) -> dict:
+    """Check PayPal transmission headers locally and return the parsed event
+
+    The signed message is transmission id, time, our webhook id and the
+    CRC32 of the body, joined by "|", signed with the key in the
+    certificate at PAYPAL-CERT-URL. Verifying it here avoids a call to
+    PayPal's verify-webhook-signature API per delivery.
+    """
+    if not PAYPAL_WEBHOOK_ID:
+        raise WebhookConfigurationError("PAYPAL_WEBHOOK_ID is not set")
+    try:
+        transmission_id = headers["paypal-transmission-id"]
+        transmission_time = headers["paypal-transmission-time"]
+        cert_url = headers["paypal-cert-url"]
+        signature = base64.b64decode(headers["paypal-transmission-sig"])
+    except (KeyError, ValueError) as e:
+        raise WebhookVerificationError("Missing or malformed PayPal headers") from e
+    if headers.get("paypal-auth-algo", "SHA256withRSA") != "SHA256withRSA":
+        raise WebhookVerificationError("Unsupported PayPal signing algorithm")
+
+    message = f"{transmission_id}|{transmission_time}|{PAYPAL_WEBHOOK_ID}|{zlib.crc32(payload)}"
+    try:
+        (await _paypal_certificate(cert_url)).public_key().verify(
+            signature, message.encode(), padding.PKCS1v15(), hashes.SHA256())
+    except InvalidSignature as e:
+        raise WebhookVerificationError("PayPal signature mismatch") from e
+    except httpx.HTTPError as e:
+        raise WebhookVerificationError(f"Couldn't fetch PayPal certificate: {e}") from e
+
+    try:
+        return json.loads(payload)
+    except ValueError as e:
+        raise WebhookVerificationError("Payload isn't JSON") from e
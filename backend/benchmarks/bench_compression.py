@@ -0,0 +1,115 @@
+"""Bytes saved versus CPU spent compressing API responses
+
+Renders item list pages of several sizes the way the list endpoints do
+and compresses each at a range of gzip levels and brotli qualities,
+reporting per response:
+
+  ratio      compressed size / original size
+  saved      bytes not sent
+  cpu        compression CPU time (process time)
+  net        transfer time saved on a --link-mbps link minus the CPU spent;
+             negative means compressing made the response slower
+
+An NDJSON stream is also compressed line by line with a flush after each
+line, as CompressionMiddleware does for streamed responses, to show what
+per-chunk flushing costs in ratio.
+
+    cd backend
+    python benchmarks/bench_compression.py [--link-mbps 5] [--iterations 200]
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import build_pages  # noqa: E402
+
+GZIP_LEVELS = (1, 5, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 11)
+
+
+def codecs():
+    import brotli
+
+    for level in GZIP_LEVELS:
+        yield f"gzip {level}", lambda data, level=level: gzip.compress(data, compresslevel=level)
+    for quality in BROTLI_QUALITIES:
+        yield f"br {quality}", lambda data, quality=quality: brotli.compress(
+            data, quality=quality, mode=brotli.MODE_TEXT)
+
+
+def cpu_per_call(func, data, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        func(data)
+    return (time.process_time() - started) / iterations
+
+
+def stream_codecs():
+    import brotli
+
+    def gzip_stream(lines, level):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return sum(len(compressor.compress(line) + compressor.flush(zlib.Z_SYNC_FLUSH))
+                   for line in lines) + len(compressor.flush())
+
+    def brotli_stream(lines, quality):
+        compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+        return sum(len(compressor.process(line) + compressor.flush())
+                   for line in lines) + len(compressor.finish())
+
+    yield "gzip 5", lambda lines: gzip_stream(lines, 5)
+    yield "br 4", lambda lines: brotli_stream(lines, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-sizes", default="1,5,20,100")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--link-mbps", type=float, default=5.0,
+                        help="client bandwidth used to price bytes saved")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    import orjson
+
+    from app.schemas.item import ITEM_RESPONSES
+    from app.utils.serialization import serialize
+
+    bytes_per_second = args.link_mbps * 1_000_000 / 8
+    for size in (int(value) for value in args.page_sizes.split(",")):
+        items = build_pages(size)[0]
+        body = serialize(ITEM_RESPONSES, items)
+        print(f"items x{size}: {len(body)} bytes")
+        for name, compress in codecs():
+            compressed = len(compress(body))
+            cpu = cpu_per_call(compress, body, args.iterations)
+            saved = len(body) - compressed
+            net = saved / bytes_per_second - cpu
+            print(f"  {name:<8} ratio {compressed / len(body):5.3f}  saved {saved:7d}B  "
+                  f"cpu {cpu * 1e6:8.1f}us  {len(body) / cpu / 1e6:7.1f}MB/s  "
+                  f"net {net * 1000:+8.3f}ms")
+
+    items = build_pages(200)[0]
+    lines = [orjson.dumps(record) + b"\n"
+             for record in orjson.loads(serialize(ITEM_RESPONSES, items))]
+    raw = sum(len(line) for line in lines)
+    print(f"ndjson stream of {len(lines)} lines: {raw} bytes")
+    for name, compress_stream in stream_codecs():
+        whole = len(next(compress for label, compress in codecs() if label == name)(b"".join(lines)))
+        started = time.process_time()
+        for _ in range(max(1, args.iterations // 10)):
+            streamed = compress_stream(lines)
+        cpu = (time.process_time() - started) / max(1, args.iterations // 10)
+        print(f"  {name:<8} flushed per line ratio {streamed / raw:5.3f} "
+              f"(whole body {whole / raw:5.3f})  cpu {cpu * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
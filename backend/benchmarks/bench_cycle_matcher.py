@@ -0,0 +1,79 @@
+"""Synthetic-graph benchmark for the trade cycle matcher
+
+Builds a want-graph with 100k open offers and measures the latency of
+incremental offer creation and withdrawal.
+
+    cd backend
+    python benchmarks/bench_cycle_matcher.py [--offers 100000] [--updates 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.matching_service import CycleMatcher  # noqa: E402
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--offers", type=int, default=100_000)
+    parser.add_argument("--items-per-user", type=int, default=2)
+    parser.add_argument("--users", type=int, default=25_000)
+    parser.add_argument("--updates", type=int, default=2_000)
+    parser.add_argument("--max-length", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    item_count = args.users * args.items_per_user
+
+    def owner(item_id):
+        return item_id // args.items_per_user
+
+    def random_offer():
+        # Wants cluster around nearby items, like users browsing their area
+        source = rng.randrange(item_count)
+        target = (source + rng.randint(-100, 100)) % item_count
+        return source, owner(source), target, owner(target)
+
+    matcher = CycleMatcher(max_length=args.max_length)
+    started = time.perf_counter()
+    cycles = 0
+    for offer_id in range(args.offers):
+        cycles += len(matcher.add_offer(offer_id, *random_offer()))
+    build_seconds = time.perf_counter() - started
+    print(f"built graph: {args.offers} offers, {cycles} cycles "
+          f"in {build_seconds:.2f}s")
+
+    add_latencies, remove_latencies = [], []
+    next_offer_id = args.offers
+    for _ in range(args.updates):
+        started = time.perf_counter()
+        matcher.add_offer(next_offer_id, *random_offer())
+        add_latencies.append(time.perf_counter() - started)
+        next_offer_id += 1
+
+        victim = rng.randrange(next_offer_id)
+        started = time.perf_counter()
+        matcher.remove_offer(victim)
+        remove_latencies.append(time.perf_counter() - started)
+
+    for name, samples in (("add", add_latencies), ("remove", remove_latencies)):
+        print(f"{name:>6}: mean {statistics.mean(samples) * 1e3:.3f} ms  "
+              f"p99 {percentile(samples, 0.99) * 1e3:.3f} ms  "
+              f"max {max(samples) * 1e3:.3f} ms")
+
+    worst = max(add_latencies + remove_latencies)
+    print("sub-second incremental updates:", "yes" if worst < 1.0 else "NO")
+
+
+if __name__ == "__main__":
+    main()
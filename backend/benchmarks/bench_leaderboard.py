@@ -0,0 +1,112 @@
+"""Leaderboard benchmark with millions of reviews
+
+Loads --users users whose reputation scores summarize --reviews reviews
+and times top-N leaderboard queries overall, by state and by city. The
+query reads the partial reputation indexes, so its cost depends on N
+rather than on the number of reviews.
+
+    cd backend
+    python benchmarks/bench_leaderboard.py [--users 500000] [--reviews 5000000] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 50_000
+STATES = {
+    "NY": ["New York", "Buffalo", "Albany"],
+    "CA": ["Los Angeles", "San Francisco", "San Diego"],
+    "TX": ["Austin", "Houston", "Dallas"],
+    "WA": ["Seattle", "Spokane"],
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--reviews", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    from sqlalchemy import insert
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import User, UserReputation
+    from app.services.review_service import RATINGS, reputation_score
+    from app.services.user_service import UserService
+
+    rng = random.Random(args.seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    # Reviews are only ever read through their per-user histograms, so the
+    # benchmark generates histograms directly
+    started = time.perf_counter()
+    reviews_per_user = args.reviews / args.users
+    for first in range(1, args.users + 1, CHUNK):
+        users, reputations = [], []
+        for user_id in range(first, min(first + CHUNK, args.users + 1)):
+            state = rng.choice(list(STATES))
+            histogram = {stars: 0 for stars in RATINGS}
+            quality = rng.random()
+            for _ in range(int(rng.expovariate(1 / reviews_per_user))):
+                stars = min(5, max(1, round(rng.gauss(2 + 3 * quality, 1))))
+                histogram[stars] += 1
+            count = sum(histogram.values())
+            users.append({
+                "id": user_id, "email": f"user{user_id}@example.com",
+                "username": f"user{user_id}", "full_name": f"User {user_id}",
+                "state": state, "city": rng.choice(STATES[state]),
+            })
+            if count:
+                reputations.append({"user_id": user_id, "review_count": count,
+                                    **{f"ratings_{stars}": histogram[stars] for stars in RATINGS}})
+        with engine.begin() as connection:
+            connection.execute(insert(User), users)
+            connection.execute(insert(UserReputation), reputations)
+        print(f"\rloaded {min(first + CHUNK - 1, args.users)} users", end="", flush=True)
+
+    with engine.begin() as connection:
+        counts = {stars: getattr(UserReputation, f"ratings_{stars}") for stars in RATINGS}
+        connection.execute(UserReputation.__table__.update().values(
+            score=reputation_score(counts, UserReputation.review_count)))
+        connection.execute(User.__table__.update().values(
+            reputation_score=UserReputation.__table__.c.score
+        ).where(UserReputation.__table__.c.user_id == User.__table__.c.id))
+    print(f"\nloaded in {time.perf_counter() - started:.0f}s")
+
+    db = SessionLocal()
+    service = UserService(db)
+    filters = [{}] + [{"state": state} for state in STATES] + [
+        {"city": city} for cities in STATES.values() for city in cities]
+    for label, choices in (("overall", filters[:1]),
+                           ("by state", [f for f in filters if "state" in f]),
+                           ("by city", [f for f in filters if "city" in f])):
+        samples = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            service.get_leaderboard(limit=20, **rng.choice(choices))
+            samples.append(time.perf_counter() - started)
+        print(f"top 20 {label:<9} mean {statistics.mean(samples) * 1000:.3f}ms  "
+              f"p95 {percentile(samples, 0.95) * 1000:.3f}ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
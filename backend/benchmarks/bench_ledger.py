@@ -0,0 +1,111 @@
+"""Write-overhead benchmark for the trade event ledger
+
+Runs the same offer transitions (create, then withdraw) with and without
+ledger events and reports the extra latency per transition, plus the cost
+of reading a history from snapshot plus tail.
+
+    cd backend
+    python benchmarks/bench_ledger.py [--transitions 2000] [--database-url URL]
+
+Defaults to a throwaway SQLite file; pass a Postgres URL for numbers that
+reflect production.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(label, samples):
+    print(f"{label:<28} mean {statistics.mean(samples) * 1000:.3f}ms  "
+          f"p50 {percentile(samples, 0.5) * 1000:.3f}ms  "
+          f"p99 {percentile(samples, 0.99) * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=2_000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import Item, ItemCategory, User
+    from app.schemas.trade import TradeOfferCreate
+    from app.services.ledger_service import OFFER, LedgerService, event
+    from app.services.trade_service import TradeService
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    owner = User(email="owner@example.com", username="owner", full_name="Owner")
+    offerer = User(email="offerer@example.com", username="offerer", full_name="Offerer")
+    category = ItemCategory(name="General")
+    db.add_all([owner, offerer, category])
+    db.commit()
+    listing = dict(category_id=category.id, description="", condition="Good",
+                   zip_code="10001", city="New York", state="NY")
+    wanted = Item(title="Wanted", owner_id=owner.id, **listing)
+    offered = Item(title="Offered", owner_id=offerer.id, **listing)
+    db.add_all([wanted, offered])
+    db.commit()
+    offer_data = TradeOfferCreate(item_id=wanted.id, offered_item_id=offered.id)
+
+    def run(with_ledger):
+        service = TradeService(db)
+        if not with_ledger:
+            service.ledger.record = lambda *events: None
+        latencies = []
+        for _ in range(args.transitions):
+            started = time.perf_counter()
+            offer = service.create_trade_offer(offer_data, offerer.id)
+            service.withdraw_trade_offer(offer.id, offerer.id)
+            latencies.append((time.perf_counter() - started) / 2)
+        return latencies
+
+    run(True)  # warm up connections and statement caches
+    baseline = run(False)
+    ledgered = run(True)
+    report("transition without ledger", baseline)
+    report("transition with ledger", ledgered)
+    overhead = statistics.mean(ledgered) - statistics.mean(baseline)
+    print(f"ledger overhead per transition: {overhead * 1000:.3f}ms "
+          f"({overhead / statistics.mean(baseline):.1%})")
+
+    # A long-lived stream: history from events alone vs snapshot plus a short tail
+    ledger = LedgerService(db)
+    ledger.record(*(event(OFFER, 0, "offer.note", offerer.id, step=step) for step in range(500)))
+    db.commit()
+    reads = []
+    for _ in range(200):
+        started = time.perf_counter()
+        ledger.get_history(OFFER, 0)
+        reads.append(time.perf_counter() - started)
+    report("history, 500 events", reads)
+
+    ledger.compact(timedelta(days=30), snapshot_every=1)
+    ledger.record(*(event(OFFER, 0, "offer.note", offerer.id, step=step) for step in range(5)))
+    db.commit()
+    reads = []
+    for _ in range(200):
+        started = time.perf_counter()
+        ledger.get_history(OFFER, 0)
+        reads.append(time.perf_counter() - started)
+    report("history, snapshot + 5", reads)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Idle-connection benchmark for the notification stream
+
+Starts one uvicorn worker, opens many idle SSE connections for one user,
+then measures the worker's memory per connection and how long a single
+trade offer takes to reach every connection.
+
+    cd backend
+    python benchmarks/bench_notifications.py [--connections 10000]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def seed(database_url):
+    """Create two users with an item each and return their ids and tokens"""
+    os.environ["DATABASE_URL"] = database_url
+    from app.database import Base, SessionLocal, engine
+    from app.models import Item, ItemCategory, User
+    from app.utils.security import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    category = ItemCategory(name="General")
+    alice = User(email="alice@example.com", username="alice", full_name="Alice")
+    bob = User(email="bob@example.com", username="bob", full_name="Bob")
+    db.add_all([category, alice, bob])
+    db.commit()
+    items = [Item(title=title, description=title, condition="Good", zip_code="10001",
+                  city="New York", state="NY", owner_id=owner.id, category_id=category.id)
+             for title, owner in (("Chair", alice), ("Lamp", bob))]
+    db.add_all(items)
+    db.commit()
+    seeded = {
+        "alice_token": create_access_token({"sub": alice.email}),
+        "bob_token": create_access_token({"sub": bob.email}),
+        "chair_id": items[0].id,
+        "lamp_id": items[1].id,
+    }
+    db.close()
+    return seeded
+
+
+async def open_stream(port, token):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/notifications/stream HTTP/1.1\r\nHost: bench\r\n"
+                 f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    await reader.readuntil(b"retry: 5000\n\n")
+    return reader, writer
+
+
+async def run(args, port, seeded, server):
+    baseline = rss_kb(server.pid)
+    started = time.perf_counter()
+    streams = []
+    for start in range(0, args.connections, 500):
+        batch = range(start, min(start + 500, args.connections))
+        streams.extend(await asyncio.gather(
+            *(open_stream(port, seeded["alice_token"]) for _ in batch)))
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(1)
+    loaded = rss_kb(server.pid)
+    print(f"opened {len(streams)} idle connections in {connect_seconds:.1f}s")
+    print(f"worker RSS {baseline / 1024:.0f} MB -> {loaded / 1024:.0f} MB "
+          f"({(loaded - baseline) / len(streams):.1f} KB per connection)")
+
+    async def wait_for_event(reader):
+        await reader.readuntil(b"event: offer.created")
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        response = await client.post(
+            "/api/trades/offers",
+            headers={"Authorization": f"Bearer {seeded['bob_token']}"},
+            json={"item_id": seeded["chair_id"], "offered_item_id": seeded["lamp_id"]})
+        response.raise_for_status()
+    await asyncio.gather(*(wait_for_event(reader) for reader, _ in streams))
+    print(f"fan-out of one offer to {len(streams)} connections: "
+          f"{(time.perf_counter() - started) * 1e3:.0f} ms")
+
+    for _, writer in streams:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if limit < args.connections + 100:
+        sys.exit(f"open file limit {limit} is too low for {args.connections} connections")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{workdir}/bench.db"
+        seeded = seed(database_url)
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL=database_url)
+        server = subprocess.Popen(
+            [sys.executable, "-c",
+             "import resource, uvicorn;"
+             "_, hard = resource.getrlimit(resource.RLIMIT_NOFILE);"
+             "resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard));"
+             f"uvicorn.run('main:app', port={port}, log_level='warning', backlog=4096)"],
+            cwd=BACKEND_DIR, env=env)
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"http://127.0.0.1:{port}/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            asyncio.run(run(args, port, seeded, server))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Browse pages through ORM instances vs Core read-model records
+
+Loads --items items (with photos) owned by --users users and times
+serving a page of --page-size items and user profiles, including
+serialization, three ways:
+
+  orm         Query(Item) with lazy-loaded owner/category/photos (previous path)
+  orm eager   Query(Item) with joinedload/selectinload
+  records     ItemService / UserService read-model records
+
+Latency is per page with a fresh session each time. Memory is what
+tracemalloc sees held by the fetched page (before serialization) and the
+peak while serving it.
+
+    cd backend
+    python benchmarks/bench_read_models.py [--users 20000] [--items 100000] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 20_000
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--photos", type=int, default=3, help="photos per item")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    from sqlalchemy import insert
+    from sqlalchemy.orm import joinedload, selectinload
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import Item, ItemCategory, ItemPhoto, User, UserReputation
+    from app.schemas.item import ITEM_RESPONSES
+    from app.schemas.user import USER_PROFILES, UserProfile
+    from app.services.item_service import ItemService
+    from app.services.user_service import UserService
+    from app.utils.serialization import serialize
+
+    rng = random.Random(args.seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(insert(ItemCategory), [
+            {"id": n, "name": f"Category {n}"} for n in range(1, 21)])
+        for first in range(1, args.users + 1, CHUNK):
+            ids = range(first, min(first + CHUNK, args.users + 1))
+            connection.execute(insert(User), [
+                {"id": n, "email": f"user{n}@example.com", "username": f"user{n}",
+                 "full_name": f"User {n}", "city": "Austin", "state": "TX"} for n in ids])
+            connection.execute(insert(UserReputation), [
+                {"user_id": n, "review_count": 3, "ratings_5": 3, "score": 4.2}
+                for n in ids if n % 2])
+        for first in range(1, args.items + 1, CHUNK):
+            ids = range(first, min(first + CHUNK, args.items + 1))
+            connection.execute(insert(Item), [
+                {"id": n, "title": f"Item {n}", "description": "A well kept item " * 8,
+                 "condition": "Good", "zip_code": "78701", "city": "Austin", "state": "TX",
+                 "owner_id": rng.randint(1, args.users), "category_id": rng.randint(1, 20)}
+                for n in ids])
+            connection.execute(insert(ItemPhoto), [
+                {"item_id": n, "photo_url": f"/uploads/{n}_{p}.jpg", "is_primary": p == 0,
+                 "order_index": p} for n in ids for p in range(args.photos)])
+    print(f"loaded {args.items} items in {time.perf_counter() - started:.1f}s")
+
+    item_pages = max(1, args.items // args.page_size)
+    user_pages = max(1, args.users // args.page_size)
+
+    def orm_items(db, offset, eager):
+        query = db.query(Item).filter(Item.is_visible == True)
+        if eager:
+            query = query.options(joinedload(Item.owner), joinedload(Item.category),
+                                  selectinload(Item.photos))
+        return query.order_by(Item.id).offset(offset).limit(args.page_size).all()
+
+    def orm_users(db, offset, eager):
+        users = db.query(User).order_by(User.id).offset(offset).limit(args.page_size).all()
+        profiles = []
+        for user in users:
+            reputation = db.get(UserReputation, user.id)
+            profiles.append(UserProfile.model_validate(user).model_copy(update={
+                "average_rating": reputation.score if reputation else None,
+                "reviews_count": reputation.review_count if reputation else 0}))
+        return profiles
+
+    def record_items(db, offset, eager):
+        return ItemService(db).get_items(limit=args.page_size, offset=offset)
+
+    def record_users(db, offset, eager):
+        return UserService(db).search_users(limit=args.page_size, offset=offset)
+
+    def measure(page, eager, adapter, pages):
+        samples = []
+        for _ in range(args.iterations):
+            db = SessionLocal()
+            offset = rng.randrange(pages) * args.page_size
+            started = time.perf_counter()
+            serialize(adapter, page(db, offset, eager))
+            samples.append(time.perf_counter() - started)
+            db.close()
+
+        db = SessionLocal()
+        tracemalloc.start()
+        rows = page(db, 0, eager)
+        held = tracemalloc.get_traced_memory()[0]
+        serialize(adapter, rows)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del rows
+        db.close()
+        return samples, held, peak
+
+    for label, adapter, pages, runs in (
+        ("items", ITEM_RESPONSES, item_pages,
+         (("orm", orm_items, False), ("orm eager", orm_items, True),
+          ("records", record_items, False))),
+        ("user profiles", USER_PROFILES, user_pages,
+         (("orm", orm_users, False), ("records", record_users, False))),
+    ):
+        print(f"{label}, {args.page_size} per page")
+        for name, page, eager in runs:
+            samples, held, peak = measure(page, eager, adapter, pages)
+            print(f"  {name:<10} mean {statistics.mean(samples) * 1000:7.2f}ms  "
+                  f"p50 {percentile(samples, 0.5) * 1000:7.2f}ms  "
+                  f"p95 {percentile(samples, 0.95) * 1000:7.2f}ms  "
+                  f"p99 {percentile(samples, 0.99) * 1000:7.2f}ms  "
+                  f"held {held / 1024:6.0f}KiB  peak {peak / 1024:6.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
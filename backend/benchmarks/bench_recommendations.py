@@ -0,0 +1,61 @@
+"""Latency benchmark for trade-match recommendations
+
+Scores a synthetic 1M-item catalog for random users and reports top-k
+latency.
+
+    cd backend
+    python benchmarks/bench_recommendations.py [--items 1000000] [--queries 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.recommendation_service import CONDITIONS, ItemFeatureMatrix  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    started = time.perf_counter()
+    matrix = ItemFeatureMatrix(
+        item_ids=np.arange(1, args.items + 1),
+        owner_ids=rng.integers(1, args.users + 1, args.items),
+        category_ids=rng.integers(1, args.categories + 1, args.items),
+        condition_ranks=rng.integers(0, len(CONDITIONS), args.items),
+        latitudes=rng.uniform(25, 49, args.items),
+        longitudes=rng.uniform(-124, -67, args.items),
+        owner_ratings=rng.uniform(0, 1, args.items),
+    )
+    print(f"built {len(matrix)}-item feature matrix in "
+          f"{time.perf_counter() - started:.2f}s")
+
+    latencies = []
+    for user_id in rng.integers(1, args.users + 1, args.queries):
+        wanted = {int(category): int(count) for category, count in
+                  zip(rng.integers(1, args.categories + 1, 3), rng.integers(1, 5, 3))}
+        started = time.perf_counter()
+        results = matrix.recommend(int(user_id), wanted, args.limit)
+        latencies.append(time.perf_counter() - started)
+        assert len(results) <= args.limit
+
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"top-{args.limit}: mean {statistics.mean(latencies) * 1e3:.1f} ms  "
+          f"p95 {p95 * 1e3:.1f} ms  max {max(latencies) * 1e3:.1f} ms")
+    print("under 50 ms at p95:", "yes" if p95 < 0.05 else "NO")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Renewal throughput against a stub provider with realistic latency
+
+Loads --subscriptions due weekly subscriptions and renews them in claimed
+chunks through the stub gateway, compared with a one-at-a-time loop over
+a sample. Also shows how renewal slots spread a sign-up burst over the
+day.
+
+    cd backend
+    python benchmarks/bench_renewals.py [--subscriptions 20000] [--latency 0.05] \\
+        [--concurrency 20] [--rate 200] [--database-url URL]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 50_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscriptions", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="stub provider latency per call in seconds")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=200,
+                        help="provider calls per second")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--naive-sample", type=int, default=100)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    from sqlalchemy import insert
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import User
+    from app.models.subscription import PaymentProvider, Subscription, SubscriptionStatus
+    from app.services.renewal_service import (
+        RenewalService, StubGateway, first_billing_date, overdue_seconds
+    )
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    # Everyone signed up in the same hour a week ago
+    signed_up = datetime.now(timezone.utc) - timedelta(days=8)
+    started = time.perf_counter()
+    for first in range(1, args.subscriptions + 1, CHUNK):
+        ids = range(first, min(first + CHUNK, args.subscriptions + 1))
+        with engine.begin() as connection:
+            connection.execute(insert(User), [
+                {"id": n, "email": f"user{n}@example.com", "username": f"user{n}",
+                 "full_name": f"User {n}"} for n in ids])
+            connection.execute(insert(Subscription), [
+                {"user_id": n, "payment_provider": PaymentProvider.STRIPE,
+                 "provider_subscription_id": f"sub_{n}", "provider_customer_id": f"cus_{n}",
+                 "status": SubscriptionStatus.ACTIVE,
+                 "next_billing_date": first_billing_date(n, now=signed_up)} for n in ids])
+    print(f"loaded {args.subscriptions} subscriptions in {time.perf_counter() - started:.1f}s")
+
+    per_hour = Counter(first_billing_date(n, now=signed_up).hour
+                       for n in range(1, args.subscriptions + 1))
+    print(f"renewals per hour of day: min {min(per_hour.values())}  "
+          f"max {max(per_hour.values())}  (all in one hour without slots)")
+
+    db = SessionLocal()
+    naive = RenewalService(db, StubGateway(latency=args.latency), concurrency=1, rate=1e9)
+    started = time.perf_counter()
+    for _ in range(args.naive_sample):
+        asyncio.run(naive.renew_batch(batch_size=1))
+    naive_rate = args.naive_sample / (time.perf_counter() - started)
+    print(f"one at a time:  {naive_rate:8.0f} renewals/s  "
+          f"(~{args.subscriptions / naive_rate / 60:.0f} min for all)")
+
+    service = RenewalService(db, StubGateway(latency=args.latency),
+                             concurrency=args.concurrency, rate=args.rate)
+    started = time.perf_counter()
+    totals = asyncio.run(service.renew_due(batch_size=args.batch_size, max_batches=10**9))
+    elapsed = time.perf_counter() - started
+    renewed = sum(totals.values())
+    print(f"chunked:        {renewed / elapsed:8.0f} renewals/s  "
+          f"({renewed} in {elapsed:.1f}s, {totals})")
+    print(f"lag after run:  {overdue_seconds(db):.0f}s")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
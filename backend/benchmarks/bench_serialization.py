@@ -0,0 +1,137 @@
+"""Serialization cost of list pages: FastAPI's response_model path vs TypeAdapters
+
+Builds pages of --page-size ORM objects in memory (no database) for each
+list schema and times, per page:
+
+  response_model  FastAPI's serialize_response + jsonable_encoder + json
+  adapter+orjson  TypeAdapter validate/dump_python, rendered with orjson
+  adapter json    TypeAdapter validate + dump_json, as app.utils.serialization does
+
+    cd backend
+    python benchmarks/bench_serialization.py [--page-size 100] [--iterations 300]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def build_pages(size):
+    from app.models import Item, ItemCategory, ItemPhoto, Review, TradeOffer, User
+    from app.models.item import ItemStatus
+    from app.models.trade import TradeOfferStatus
+
+    now = datetime.now(timezone.utc)
+    category = ItemCategory(id=1, name="Electronics", description="Gadgets", icon="chip")
+
+    def user(n):
+        return User(id=n, email=f"user{n}@example.com", username=f"user{n}",
+                    full_name=f"User {n}", city="Austin", state="TX", zip_code="78701",
+                    bio="Likes trading", phone_verified=True, is_active=True,
+                    is_verified=True, created_at=now)
+
+    def item(n):
+        return Item(id=n, title=f"Item {n}", description="A well kept item " * 8,
+                    condition="Good", zip_code="78701", city="Austin", state="TX",
+                    status=ItemStatus.ACTIVE, is_visible=True, owner_id=n, category_id=1,
+                    latitude=30.27, longitude=-97.74, created_at=now, updated_at=now,
+                    owner=user(n), category=category,
+                    photos=[ItemPhoto(id=n * 10 + p, photo_url=f"/uploads/{n}_{p}.jpg",
+                                      is_primary=p == 0, order_index=p, created_at=now)
+                            for p in range(3)])
+
+    items = [item(n) for n in range(1, size + 1)]
+    offers = [TradeOffer(id=n, status=TradeOfferStatus.PENDING, item_id=n, item_owner_id=n,
+                         offerer_id=n + 1, offered_item_id=n + 1, is_counter_offer=False,
+                         message="Interested?", created_at=now, item=items[n - 1],
+                         offered_item=items[n % size], offerer=items[n % size].owner,
+                         item_owner=items[n - 1].owner, counter_offers=[])
+              for n in range(1, size + 1)]
+    reviews = [Review(id=n, rating=5, title="Smooth trade", comment="Would trade again " * 4,
+                      is_public=True, is_anonymous=False, reviewer_id=n, reviewee_id=n + 1,
+                      trade_id=n, created_at=now, reviewer=items[n - 1].owner,
+                      reviewee=items[n % size].owner)
+               for n in range(1, size + 1)]
+    users = [entry.owner for entry in items]
+    return items, offers, reviews, users
+
+
+async def time_response_model(schema, page, iterations):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    field = create_response_field(name="Response", type_=List[schema])
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        JSONResponse(await serialize_response(field=field, response_content=page))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def time_call(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    import orjson
+
+    from app.schemas.item import ITEM_RESPONSES, ItemResponse
+    from app.schemas.review import REVIEW_RESPONSES, ReviewResponse
+    from app.schemas.trade import TRADE_OFFER_RESPONSES, TradeOfferResponse
+    from app.schemas.user import USER_PROFILES, UserProfile
+    from app.utils.serialization import FastJSONResponse, serialize
+
+    items, offers, reviews, users = build_pages(args.page_size)
+    for label, schema, adapter, page in (
+        ("ItemResponse", ItemResponse, ITEM_RESPONSES, items),
+        ("TradeOfferResponse", TradeOfferResponse, TRADE_OFFER_RESPONSES, offers),
+        ("ReviewResponse", ReviewResponse, REVIEW_RESPONSES, reviews),
+        ("UserProfile", UserProfile, USER_PROFILES, users),
+    ):
+        def adapter_orjson():
+            validated = adapter.validate_python(page, from_attributes=True)
+            FastJSONResponse(orjson.dumps(adapter.dump_python(validated, mode="json")))
+
+        results = (
+            ("response_model", asyncio.run(time_response_model(schema, page, args.iterations))),
+            ("adapter+orjson", time_call(adapter_orjson, args.iterations)),
+            ("adapter json", time_call(lambda: FastJSONResponse(serialize(adapter, page)),
+                                       args.iterations)),
+        )
+        baseline = statistics.mean(results[0][1])
+        print(f"{label} x{args.page_size}")
+        for name, samples in results:
+            mean = statistics.mean(samples)
+            print(f"  {name:<15} mean {mean * 1000:7.3f}ms  p50 {percentile(samples, 0.5) * 1000:7.3f}ms  "
+                  f"p95 {percentile(samples, 0.95) * 1000:7.3f}ms  p99 {percentile(samples, 0.99) * 1000:7.3f}ms  "
+                  f"x{baseline / mean:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Active-trade lookup benchmark over a large trade history
+
+Loads --trades trades (mostly completed or cancelled) and compares the old
+OR-on-both-user-columns query with the trade_participants partial-index
+lookup for random users.
+
+    cd backend
+    python benchmarks/bench_trade_participants.py [--trades 10000000] [--database-url URL]
+
+Defaults to a throwaway SQLite file; pass a Postgres URL for numbers that
+reflect production. Loading 10M trades takes a few minutes.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 50_000
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(label, samples):
+    print(f"{label:<22} mean {statistics.mean(samples) * 1000:.3f}ms  "
+          f"p50 {percentile(samples, 0.5) * 1000:.3f}ms  "
+          f"p95 {percentile(samples, 0.95) * 1000:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--active-fraction", type=float, default=0.03)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import insert, or_, select
+
+    from app.database import Base, SessionLocal, engine
+    from app.models import Item, ItemCategory, User
+    from app.models.trade import ACTIVE_TRADE_STATUSES, Trade, TradeParticipant, TradeStatus
+    from app.services.trade_service import TradeService
+
+    rng = random.Random(args.seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(insert(ItemCategory), [{"id": 1, "name": "General"}])
+        for first in range(1, args.users + 1, CHUNK):
+            ids = range(first, min(first + CHUNK, args.users + 1))
+            connection.execute(insert(User), [
+                {"id": n, "email": f"user{n}@example.com", "username": f"user{n}",
+                 "full_name": f"User {n}"} for n in ids])
+            connection.execute(insert(Item), [
+                {"id": n, "owner_id": n, "category_id": 1, "title": f"Item {n}",
+                 "description": "", "condition": "Good", "zip_code": "10001",
+                 "city": "New York", "state": "NY"} for n in ids])
+
+    closed = [TradeStatus.COMPLETED, TradeStatus.CANCELLED, TradeStatus.REJECTED]
+    epoch = datetime(2020, 1, 1)
+    for first in range(1, args.trades + 1, CHUNK):
+        rows = []
+        for trade_id in range(first, min(first + CHUNK, args.trades + 1)):
+            user1, user2 = rng.sample(range(1, args.users + 1), 2)
+            active = rng.random() < args.active_fraction
+            rows.append({
+                "id": trade_id, "user1_id": user1, "user2_id": user2,
+                "item1_id": user1, "item2_id": user2,
+                "status": rng.choice(ACTIVE_TRADE_STATUSES) if active else rng.choice(closed),
+                "created_at": epoch + timedelta(seconds=trade_id * 10),
+            })
+        with engine.begin() as connection:
+            connection.execute(insert(Trade), rows)
+            connection.execute(insert(TradeParticipant), [
+                {"trade_id": row["id"], "user_id": row[user_key], "status": row["status"],
+                 "created_at": row["created_at"]}
+                for row in rows for user_key in ("user1_id", "user2_id")])
+        print(f"\rloaded {min(first + CHUNK - 1, args.trades)} trades", end="", flush=True)
+    print(f"\nloaded in {time.perf_counter() - started:.0f}s")
+
+    db = SessionLocal()
+    users = [rng.randint(1, args.users) for _ in range(args.lookups)]
+
+    def or_query(user_id):
+        return db.execute(
+            select(Trade.id).where(
+                or_(Trade.user1_id == user_id, Trade.user2_id == user_id),
+                Trade.status.in_(ACTIVE_TRADE_STATUSES)
+            ).order_by(Trade.created_at.desc()).limit(20)
+        ).all()
+
+    def timed(lookup, user_ids):
+        samples = []
+        for user_id in user_ids:
+            started = time.perf_counter()
+            lookup(user_id)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    service = TradeService(db)
+    # The OR scan is slow enough that a handful of lookups is representative
+    report("OR on user columns", timed(or_query, users[:10]))
+    report("trade_participants", timed(lambda user_id: service.get_active_trades(user_id),
+                                       users))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
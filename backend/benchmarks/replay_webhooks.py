@@ -0,0 +1,213 @@
+"""Replay a webhook event log against the intake endpoints for load tests
+
+Acts as a local stand-in for Stripe and PayPal: every event is re-signed
+the way the provider would sign it and POSTed to a running backend, with
+an optional share of redeliveries to mimic provider retries.
+
+    cd backend
+    # Target started with STRIPE_WEBHOOK_SECRET=whsec_replay,
+    # PAYPAL_WEBHOOK_ID=WH-REPLAY and PAYPAL_CERT_HOSTS=127.0.0.1
+    python benchmarks/replay_webhooks.py --target http://127.0.0.1:8000 \\
+        [--from-db | --file events.jsonl | --synthetic 10000] [--concurrency 50]
+
+Event sources:
+  --from-db      webhook_events previously stored at DATABASE_URL
+  --file         JSON lines of {"provider": "stripe" | "paypal", "payload": {...}}
+  --synthetic N  generated Stripe subscription events
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import http.server
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StripeStandIn:
+    """Signs payloads with a webhook secret like Stripe does"""
+
+    path = "/api/payments/webhook/stripe"
+
+    def __init__(self, secret: str):
+        self.secret = secret.encode()
+
+    def headers(self, payload: bytes) -> dict:
+        timestamp = int(time.time())
+        signature = hmac.new(self.secret, f"{timestamp}.".encode() + payload,
+                             hashlib.sha256).hexdigest()
+        return {"Stripe-Signature": f"t={timestamp},v1={signature}"}
+
+
+class PayPalStandIn:
+    """Signs payloads with a throwaway key and serves its certificate locally"""
+
+    path = "/api/payments/webhook/paypal"
+
+    def __init__(self, webhook_id: str):
+        self.webhook_id = webhook_id
+        self.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "replay stand-in")])
+        now = datetime.now(timezone.utc)
+        certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+                       .public_key(self.key.public_key()).serial_number(1)
+                       .not_valid_before(now).not_valid_after(now + timedelta(days=1))
+                       .sign(self.key, hashes.SHA256()))
+        pem = certificate.public_bytes(serialization.Encoding.PEM)
+
+        class CertificateHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(pem)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), CertificateHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.cert_url = f"http://127.0.0.1:{server.server_address[1]}/cert.pem"
+
+    def headers(self, payload: bytes) -> dict:
+        transmission_id = str(uuid.uuid4())
+        transmission_time = datetime.now(timezone.utc).isoformat()
+        message = f"{transmission_id}|{transmission_time}|{self.webhook_id}|{zlib.crc32(payload)}"
+        signature = self.key.sign(message.encode(), padding.PKCS1v15(), hashes.SHA256())
+        return {
+            "PAYPAL-TRANSMISSION-ID": transmission_id,
+            "PAYPAL-TRANSMISSION-TIME": transmission_time,
+            "PAYPAL-CERT-URL": self.cert_url,
+            "PAYPAL-AUTH-ALGO": "SHA256withRSA",
+            "PAYPAL-TRANSMISSION-SIG": base64.b64encode(signature).decode(),
+        }
+
+
+def events_from_db():
+    from app.database import SessionLocal
+    from app.models.subscription import WebhookEvent
+
+    db = SessionLocal()
+    try:
+        for provider, payload in db.query(WebhookEvent.provider, WebhookEvent.payload).order_by(
+                WebhookEvent.id).yield_per(1000):
+            yield provider.value, payload.encode()
+    finally:
+        db.close()
+
+
+def events_from_file(path):
+    with open(path) as lines:
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                yield record["provider"], json.dumps(record["payload"]).encode()
+
+
+def synthetic_events(count, subscriptions, rng):
+    statuses = ["active", "past_due", "canceled", "active"]
+    now = int(time.time())
+    for n in range(count):
+        yield "stripe", json.dumps({
+            "id": f"evt_replay_{n}",
+            "type": "customer.subscription.updated",
+            "created": now + n,
+            "data": {"object": {"id": f"sub_{rng.randrange(subscriptions)}",
+                                "status": rng.choice(statuses)}},
+        }).encode()
+
+
+async def replay(args, events):
+    stand_ins = {
+        "stripe": StripeStandIn(args.stripe_secret),
+        "paypal": PayPalStandIn(args.paypal_webhook_id),
+    }
+    rng = random.Random(args.seed)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 4)
+    latencies, outcomes = [], Counter()
+
+    async def sender(client):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            provider, payload = item
+            stand_in = stand_ins[provider]
+            started = time.perf_counter()
+            try:
+                response = await client.post(stand_in.path, content=payload,
+                                             headers=stand_in.headers(payload))
+                outcome = response.json().get("status") if response.status_code == 200 \
+                    else str(response.status_code)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            outcomes[outcome] += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=30) as client:
+        senders = [asyncio.create_task(sender(client)) for _ in range(args.concurrency)]
+        started = time.perf_counter()
+        for provider, payload in events:
+            await queue.put((provider, payload))
+            if rng.random() < args.redeliver:
+                await queue.put((provider, payload))
+        for _ in senders:
+            await queue.put(None)
+        await asyncio.gather(*senders)
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    print(f"sent {len(latencies)} deliveries in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.0f}/s)")
+    print(f"ack latency mean {statistics.mean(ordered) * 1000:.1f}ms  "
+          f"p50 {ordered[len(ordered) // 2] * 1000:.1f}ms  "
+          f"p99 {ordered[int(len(ordered) * 0.99)] * 1000:.1f}ms")
+    print("responses:", dict(outcomes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--from-db", action="store_true")
+    source.add_argument("--file")
+    source.add_argument("--synthetic", type=int)
+    parser.add_argument("--subscriptions", type=int, default=1000,
+                        help="distinct subscription ids in synthetic events")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redeliver", type=float, default=0.1,
+                        help="share of events sent twice, like provider retries")
+    parser.add_argument("--stripe-secret", default="whsec_replay")
+    parser.add_argument("--paypal-webhook-id", default="WH-REPLAY")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.from_db:
+        events = events_from_db()
+    elif args.file:
+        events = events_from_file(args.file)
+    else:
+        events = synthetic_events(args.synthetic, args.subscriptions, random.Random(args.seed))
+    asyncio.run(replay(args, events))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 from dotenv import load_dotenv
 
 from app.database import engine, Base
-from app.routers import auth, items, trades, users, payments, reviews
+from app.routers import (
+    admin, auth, items, trades, users, payments, reviews, notifications, batch
+)
+from app.services.expiry_service import SWEEPER_INTERVAL_SECONDS, run_sweep
+from app.services.ledger_service import LEDGER_COMPACTION_INTERVAL_SECONDS, run_compaction
+from app.services.matching_service import CYCLE_MATCHER_REFRESH_SECONDS, refresh_matcher
+from app.services.notification_service import broker
+from app.services.recommendation_service import RECOMMENDATION_REFRESH_SECONDS, refresh_matrix
+from app.services.renewal_service import RENEWAL_INTERVAL_SECONDS, run_renewals
+from app.services.webhook_service import WEBHOOK_CONSUMER_INTERVAL_SECONDS, run_consumer
+from app.utils.compression import CompressionMiddleware, PrecompressedStaticFiles
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.query_audit import N_PLUS_ONE_DETECTION, RepeatedQueryMiddleware
+from app.utils import prometheus, social_auth, tracing
+from app.utils.scheduler import scheduler
+from app.utils.timing import TimingMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -13,10 +30,47 @@ load_dotenv()
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+
+# Background jobs; set ENABLE_BACKGROUND_JOBS=false on instances that shouldn't run them
+if os.getenv("ENABLE_BACKGROUND_JOBS", "true").lower() == "true":
+    scheduler.register("expiry_sweeper", SWEEPER_INTERVAL_SECONDS, run_sweep)
+    scheduler.register("ledger_compaction", LEDGER_COMPACTION_INTERVAL_SECONDS, run_compaction)
+    scheduler.register("webhook_consumer", WEBHOOK_CONSUMER_INTERVAL_SECONDS, run_consumer)
+    scheduler.register("subscription_renewals", RENEWAL_INTERVAL_SECONDS, run_renewals)
+
+# Per-process read models, refreshed off the request path on every instance
+scheduler.register("recommendation_matrix", RECOMMENDATION_REFRESH_SECONDS, refresh_matrix)
+scheduler.register("cycle_matcher", CYCLE_MATCHER_REFRESH_SECONDS, refresh_matcher)
+
+# Workers sharing METRICS_MULTIPROC_DIR publish their metrics for whichever one is scraped
+if prometheus.METRICS_MULTIPROC_DIR:
+    os.makedirs(prometheus.METRICS_MULTIPROC_DIR, exist_ok=True)
+    scheduler.register("metrics_snapshot", prometheus.METRICS_FLUSH_INTERVAL_SECONDS,
+                       prometheus.write_snapshot)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start background connections used for pushing notifications
+    await broker.start()
+    # Build the read models before serving so no request has to
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, refresh_matrix)
+    await loop.run_in_executor(None, refresh_matcher)
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    await broker.stop()
+    await social_auth.aclose()
+    if isinstance(tracing.exporter, tracing.FileExporter):
+        tracing.exporter.shutdown()
+
+
 app = FastAPI(
     title="Trade Me API",
     description="A barter platform API for trading everyday items",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -48,6 +102,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Development aid: report requests that lazy-load per row
+if N_PLUS_ONE_DETECTION in ("warn", "raise"):
+    app.add_middleware(RepeatedQueryMiddleware)
+
+# gzip/brotli for responses over COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Server-Timing header and a log line with DB, auth and serialization time per request
+app.add_middleware(TimingMiddleware)
+
+# Per-route latency histograms and in-flight requests for /metrics
+app.add_middleware(prometheus.MetricsMiddleware)
+
+# Folded-stack profiles of requests sent with X-Profile and the admin token
+app.add_middleware(ProfilingMiddleware)
+
+# A span per request, with DB transactions and provider calls as children, for TRACE_EXPORT_FILE
+app.add_middleware(tracing.TracingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -55,10 +128,14 @@ app.include_router(items.router, prefix="/api/items", tags=["items"])
 app.include_router(trades.router, prefix="/api/trades", tags=["trades"])
 app.include_router(payments.router, prefix="/api/payments", tags=["payments"])
 app.include_router(reviews.router, prefix="/api/reviews", tags=["reviews"])
+app.include_router(notifications.router,
+                   prefix="/api/notifications", tags=["notifications"])
+app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
-# Static files for uploaded images
+# Static files, with .br/.gz siblings written at build time served when accepted
 if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 
 @app.get("/")
@@ -70,6 +147,12 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics", include_in_schema=False,
+         dependencies=[Depends(prometheus.require_metrics_token)])
+def metrics():
+    return Response(prometheus.exposition(), media_type=prometheus.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
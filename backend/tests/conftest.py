@@ -0,0 +1,94 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# Use a lightweight SQLite database for tests to avoid external dependencies
+TEST_DB_URL = "sqlite:///./test.db"
+os.environ["DATABASE_URL"] = TEST_DB_URL
+
+# Ensure the project root is on the path before importing the application
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models import Item, ItemCategory, User  # noqa: E402
+from app.services import entitlement_service, matching_service, recommendation_service  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created schema"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    matching_service.invalidate()
+    recommendation_service.invalidate()
+    entitlement_service.invalidate()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Factory for persisted users"""
+    def _make_user(username: str, **fields) -> User:
+        user = User(
+            email=f"{username}@example.com",
+            username=username,
+            full_name=username.title(),
+            **fields
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_item(db):
+    """Factory for persisted items, creating a default category on demand"""
+    def _make_item(owner: User, title: str = "Item", category: ItemCategory = None,
+                   **fields) -> Item:
+        if category is None:
+            category = db.query(ItemCategory).filter(
+                ItemCategory.name == "General").first()
+            if not category:
+                category = ItemCategory(name="General")
+                db.add(category)
+                db.commit()
+        values = dict(description=f"{title} description", condition="Good",
+                      zip_code="10001", city="New York", state="NY")
+        values.update(fields)
+        item = Item(title=title, owner_id=owner.id,
+                    category_id=category.id, **values)
+        db.add(item)
+        db.commit()
+        db.refresh(item)
+        return item
+    return _make_item
+
+
+def auth_headers(user: User) -> dict:
+    """Bearer headers for an authenticated request as user"""
+    token = create_access_token(data={"sub": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed on the engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,90 @@
+import asyncio
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.schemas.batch import BATCH_MAX_REQUESTS, BatchSubRequest
+from app.services.batch_service import BatchRunner
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+
+def test_item_screen_in_one_round_trip(db, make_user, make_item):
+    alice = make_user("alice")
+    lamp = make_item(alice, "Lamp")
+    paths = [f"/api/items/{lamp.id}", f"/api/users/{alice.id}",
+             f"/api/reviews/user/{alice.id}", "/api/items/categories"]
+
+    response = client.post("/api/batch/", json={
+        "requests": [{"id": str(n), "path": path} for n, path in enumerate(paths)]})
+
+    assert response.status_code == 200
+    envelope = response.json()
+    assert [entry["id"] for entry in envelope["responses"]] == ["0", "1", "2", "3"]
+    for entry, path in zip(envelope["responses"], paths):
+        assert entry["status"] == 200
+        assert entry["body"] == client.get(path).json()
+        assert entry["duration_ms"] >= 0
+    assert envelope["responses"][0]["body"]["title"] == "Lamp"
+
+
+def test_sub_requests_share_credentials_and_fail_independently(db, make_user):
+    alice = make_user("alice")
+
+    response = client.post("/api/batch/", headers=auth_headers(alice), json={"requests": [
+        {"path": "/api/users/me"},
+        {"path": "/api/users/me", "headers": {"Authorization": "Bearer nope"}},
+        {"path": "/api/items/999"},
+    ]})
+
+    me, forged, missing = response.json()["responses"]
+    assert me["status"] == 200 and me["body"]["username"] == "alice"
+    assert forged["status"] == 401
+    assert missing["status"] == 404 and missing["body"] == {"detail": "Item not found"}
+
+
+def test_oversized_sub_responses_are_replaced(db, make_user, make_item):
+    alice = make_user("alice")
+    make_item(alice, "Lamp")
+    runner = BatchRunner(app, {}, max_response_bytes=64)
+
+    items, categories = asyncio.run(runner.run([
+        BatchSubRequest(path="/api/items/"), BatchSubRequest(path="/api/items/categories")]))
+
+    assert items["status"] == 413 and "64 bytes" in items["body"]["detail"]
+    assert categories["status"] == 200
+
+
+def test_raising_sub_request_does_not_fail_the_batch():
+    broken = FastAPI()
+
+    @broken.get("/api/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @broken.get("/api/ok")
+    def ok():
+        return {"ok": True}
+
+    failed, succeeded = asyncio.run(BatchRunner(broken, {}).run([
+        BatchSubRequest(path="/api/boom"), BatchSubRequest(path="/api/ok")]))
+
+    assert failed["status"] == 500 and failed["body"] == {"detail": "Internal Server Error"}
+    assert succeeded["status"] == 200
+    assert orjson.loads(orjson.dumps(succeeded["body"])) == {"ok": True}
+
+
+def test_envelope_limits(db):
+    too_many = [{"path": "/api/items/categories"}] * (BATCH_MAX_REQUESTS + 1)
+    assert client.post("/api/batch/", json={"requests": too_many}).status_code == 422
+    assert client.post("/api/batch/", json={"requests": [
+        {"path": "/api/batch/"}]}).status_code == 422
+    assert client.post("/api/batch/", json={"requests": [
+        {"path": "/health"}]}).status_code == 422
+    assert client.post("/api/batch/", json={"requests": [
+        {"path": "/api/notifications/stream?token=x"}]}).status_code == 422
+    assert client.post("/api/batch/", json={"requests": [
+        {"method": "DELETE", "path": "/api/items/1"}]}).status_code == 422
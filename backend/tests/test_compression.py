@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import zlib
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from starlette.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import (
+    CompressionMiddleware, PrecompressedStaticFiles, negotiate, precompress
+)
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("accept,expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_large_lists_are_compressed(db, make_user, make_item, encoding):
+    alice = make_user("alice")
+    for n in range(20):
+        make_item(alice, f"Item {n}")
+
+    plain = client.get("/api/items/", headers={"Accept-Encoding": "identity"})
+    response = client.get("/api/items/", headers={"Accept-Encoding": encoding})
+
+    assert "content-encoding" not in plain.headers
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(plain.content) / 3
+    assert response.json() == plain.json()
+
+
+def test_small_responses_are_sent_as_is():
+    response = client.get("/health", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_streams_are_compressed_and_flushed_per_chunk():
+    lines = [b'{"n": %d, "padding": "%s"}\n' % (n, b"x" * 50) for n in range(3)]
+    stream_app = CompressionMiddleware(
+        StreamingResponse(iter(lines), media_type="application/x-ndjson"))
+    scope = {"type": "http", "method": "GET", "path": "/export",
+             "headers": [(b"accept-encoding", b"gzip")]}
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()  # The client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(stream_app(scope, receive, send))
+
+    start, *chunks = sent
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # Each line decodes from its own chunk, without waiting for the end of the stream
+    assert [decoder.decompress(chunk["body"]) for chunk in chunks][:3] == lines
+
+
+def test_precompressed_static_files(tmp_path):
+    script = b"function hello() { return 'hello'; }\n" * 100
+    (tmp_path / "app.js").write_bytes(script)
+    (tmp_path / "photo.jpg").write_bytes(b"\xff\xd8" * 1000)
+    (tmp_path / "tiny.css").write_bytes(b"body{}")
+
+    assert precompress(str(tmp_path)) == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "app.js", "app.js.br", "app.js.gz", "photo.jpg", "tiny.css"]
+    assert gzip.decompress((tmp_path / "app.js.gz").read_bytes()) == script
+    assert brotli.decompress((tmp_path / "app.js.br").read_bytes()) == script
+    assert precompress(str(tmp_path)) == 0
+
+    static_app = FastAPI()
+    static_app.mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)))
+    static = TestClient(static_app)
+    for accept, encoding in [("gzip", "gzip"), ("gzip, br", "br")]:
+        response = static.get("/static/app.js", headers={"Accept-Encoding": accept})
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["content-type"].startswith("text/javascript") or \
+            response.headers["content-type"].startswith("application/javascript")
+        assert response.content == script
+    plain = static.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.content == script
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+import json
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.subscription import PaymentProvider, Subscription, SubscriptionStatus
+from app.services import entitlement_service
+from app.services.entitlement_service import EntitlementService, cache_requests
+from app.services.payment_service import PaymentService
+from app.services.webhook_service import WebhookService
+from app.utils.auth import get_premium_user
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+premium_app = FastAPI()
+
+
+@premium_app.get("/premium")
+def premium(user=Depends(get_premium_user)):
+    return {"id": user.id}
+
+
+premium_client = TestClient(premium_app)
+
+
+def test_premium_dependency_is_served_from_cache_until_invalidated(db, make_user):
+    user = make_user("alice")
+    headers = auth_headers(user)
+    assert premium_client.get("/premium", headers=headers).status_code == 403
+
+    PaymentService(db).create_stripe_subscription(user.id)
+    hits, misses = cache_requests.value(result="hit"), cache_requests.value(result="miss")
+    assert premium_client.get("/premium", headers=headers).status_code == 200
+    assert premium_client.get("/premium", headers=headers).status_code == 200
+    assert cache_requests.value(result="miss") == misses + 1
+    assert cache_requests.value(result="hit") == hits + 1
+
+    response = client.get("/api/payments/entitlement", headers=headers)
+    assert response.json()["premium"] is True
+    assert response.json()["status"] == "active"
+
+    PaymentService(db).cancel_subscription(user.id)
+    assert premium_client.get("/premium", headers=headers).status_code == 403
+
+
+def test_webhook_changes_invalidate_cached_entitlement(db, make_user):
+    user = make_user("bob")
+    db.add(Subscription(user_id=user.id, payment_provider=PaymentProvider.STRIPE,
+                        provider_subscription_id="sub_1", provider_customer_id="cus_1",
+                        status=SubscriptionStatus.ACTIVE))
+    db.commit()
+    service = EntitlementService(db)
+    assert service.is_premium(user.id)
+
+    payload = json.dumps({"id": "evt_1", "type": "invoice.payment_failed",
+                          "created": int(time.time()),
+                          "data": {"object": {"subscription": "sub_1"}}}).encode()
+    webhooks = WebhookService(db)
+    webhooks.receive(PaymentProvider.STRIPE, "evt_1", "invoice.payment_failed", payload)
+    webhooks.process_batch()
+
+    assert not service.is_premium(user.id)
+
+
+def test_entitlement_lapses_after_billing_date_and_ttl(db, make_user, monkeypatch):
+    user = make_user("carol")
+    db.add(Subscription(user_id=user.id, payment_provider=PaymentProvider.STRIPE,
+                        provider_subscription_id="sub_2", provider_customer_id="cus_2",
+                        status=SubscriptionStatus.ACTIVE,
+                        next_billing_date=datetime.now(timezone.utc) - timedelta(days=2)))
+    db.commit()
+    service = EntitlementService(db)
+    assert not service.is_premium(user.id)
+
+    # A write by another worker is only seen once the entry expires
+    db.query(Subscription).filter(Subscription.user_id == user.id).update(
+        {"next_billing_date": datetime.now(timezone.utc) + timedelta(days=7)})
+    db.commit()
+    assert not service.is_premium(user.id)
+    monkeypatch.setattr(entitlement_service.entitlements, "ttl", 0)
+    assert service.is_premium(user.id)
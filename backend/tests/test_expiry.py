@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.item import Item, ItemStatus
+from app.models.trade import Trade, TradeOffer, TradeOfferStatus, TradeStatus
+from app.services import expiry_service
+from app.services.expiry_service import ExpiryService
+from app.services.trade_service import TradeService
+
+
+def make_offer(db, owner, offerer, item, offered_item, age):
+    offer = TradeOffer(item_id=item.id, item_owner_id=owner.id, offerer_id=offerer.id,
+                       offered_item_id=offered_item.id,
+                       created_at=datetime.now(timezone.utc) - age)
+    db.add(offer)
+    db.commit()
+    return offer
+
+
+def make_accepted_trade(db, user1, user2, item1, item2, age):
+    item1.status = item2.status = ItemStatus.TRADED
+    trade = Trade(user1_id=user1.id, user2_id=user2.id, item1_id=item1.id, item2_id=item2.id,
+                  status=TradeStatus.ACCEPTED, created_at=datetime.now(timezone.utc) - age)
+    db.add(trade)
+    db.commit()
+    return trade
+
+
+def test_stale_offers_expire_in_batches(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    stale = [make_offer(db, alice, bob, chair, lamp, timedelta(days=20)).id for _ in range(5)]
+    fresh = make_offer(db, alice, bob, chair, lamp, timedelta(days=1)).id
+
+    totals = ExpiryService(db).sweep(timedelta(days=14), timedelta(days=30), batch_size=2)
+
+    assert totals == {"offers_expired": 5, "trades_cancelled": 0}
+    db.expire_all()
+    statuses = {offer.id: offer.status for offer in db.query(TradeOffer).all()}
+    assert all(statuses[offer_id] == TradeOfferStatus.EXPIRED for offer_id in stale)
+    assert statuses[fresh] == TradeOfferStatus.PENDING
+
+
+def test_abandoned_trades_are_cancelled_and_items_relisted(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    desk, rug = make_item(alice, "Desk"), make_item(bob, "Rug")
+    abandoned = make_accepted_trade(db, alice, bob, chair, lamp, timedelta(days=45)).id
+    recent = make_accepted_trade(db, alice, bob, desk, rug, timedelta(days=2)).id
+
+    ExpiryService(db).sweep(timedelta(days=14), timedelta(days=30))
+
+    db.expire_all()
+    assert db.get(Trade, abandoned).status == TradeStatus.CANCELLED
+    assert db.get(Trade, recent).status == TradeStatus.ACCEPTED
+    assert db.get(Item, chair.id).status == ItemStatus.ACTIVE
+    assert db.get(Item, desk.id).status == ItemStatus.TRADED
+
+
+def test_cancel_trade_relists_items(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    trade = make_accepted_trade(db, alice, bob, chair, lamp, timedelta(hours=1))
+
+    assert TradeService(db).cancel_trade(trade.id, bob.id)
+
+    db.expire_all()
+    assert db.get(Item, chair.id).status == ItemStatus.ACTIVE
+    assert db.get(Item, lamp.id).status == ItemStatus.ACTIVE
+
+
+def test_closed_trades_cannot_be_reopened(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    desk, rug = make_item(alice, "Desk"), make_item(bob, "Rug")
+    completed = make_accepted_trade(db, alice, bob, chair, lamp, timedelta(hours=1)).id
+    cancelled = make_accepted_trade(db, alice, bob, desk, rug, timedelta(hours=1)).id
+    service = TradeService(db)
+    assert service.complete_trade(completed, alice.id)
+    assert service.cancel_trade(cancelled, alice.id)
+
+    # Cancelling after completion must not relist items that changed hands
+    assert not service.cancel_trade(completed, bob.id)
+    assert not service.complete_trade(cancelled, bob.id)
+
+    db.expire_all()
+    assert db.get(Trade, completed).status == TradeStatus.COMPLETED
+    assert db.get(Trade, cancelled).status == TradeStatus.CANCELLED
+    assert db.get(Item, chair.id).status == ItemStatus.TRADED
+    assert db.get(Item, desk.id).status == ItemStatus.ACTIVE
+
+
+def test_strangers_cannot_close_trades(db, make_user, make_item):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    trade = make_accepted_trade(db, alice, bob, chair, lamp, timedelta(hours=1)).id
+
+    assert not TradeService(db).cancel_trade(trade, carol.id)
+    db.expire_all()
+    assert db.get(Trade, trade).status == TradeStatus.ACCEPTED
+
+
+def test_run_sweep_records_metrics(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    make_offer(db, alice, bob, chair, lamp, timedelta(days=30))
+    before = expiry_service.rows_processed.value(kind="offers_expired")
+
+    totals = expiry_service.run_sweep()
+
+    assert totals["offers_expired"] == 1
+    assert expiry_service.rows_processed.value(kind="offers_expired") == before + 1
+    assert expiry_service.last_run_rows.value(kind="offers_expired") == 1
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.models.trade_event import TradeEvent, TradeSnapshot
+from app.schemas.trade import TradeOfferCreate
+from app.services.ledger_service import OFFER, LedgerService, event
+from app.services.trade_service import TradeService
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+
+def test_transitions_are_recorded_in_the_ledger(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    service = TradeService(db)
+    offer = service.create_trade_offer(
+        TradeOfferCreate(item_id=chair.id, offered_item_id=lamp.id), bob.id)
+    counter = service.create_counter_offer(
+        offer.id, TradeOfferCreate(item_id=lamp.id, offered_item_id=chair.id), alice.id)
+    trade = service.accept_trade_offer(counter.id, bob.id)
+    service.complete_trade(trade.id, alice.id)
+
+    response = client.get(f"/api/trades/offers/{offer.id}/history", headers=auth_headers(bob))
+    assert response.status_code == 200
+    history = response.json()
+    assert history["status"] == "countered"
+    assert history["data"]["counter_offer_id"] == counter.id
+    assert [entry["type"] for entry in history["events"]] == ["offer.created", "offer.countered"]
+
+    response = client.get(f"/api/trades/{trade.id}/history", headers=auth_headers(alice))
+    assert response.status_code == 200
+    history = response.json()
+    assert history["status"] == "completed"
+    assert history["data"]["offer_id"] == counter.id
+    assert [entry["actor_id"] for entry in history["events"]] == [bob.id, alice.id]
+
+    carol = make_user("carol")
+    response = client.get(f"/api/trades/{trade.id}/history", headers=auth_headers(carol))
+    assert response.status_code == 404
+
+
+def test_compaction_folds_old_events_into_snapshots(db):
+    ledger = LedgerService(db)
+    ledger.record(
+        event(OFFER, 1, "offer.created", 7, status="pending", item_id=3),
+        event(OFFER, 1, "offer.rejected", 8, status="rejected"),
+        event(OFFER, 2, "offer.created", 7, status="pending", item_id=4),
+    )
+    db.commit()
+    old = datetime.now(timezone.utc) - timedelta(days=60)
+    db.query(TradeEvent).filter(TradeEvent.aggregate_id == 1).update({"created_at": old})
+    db.commit()
+    before = ledger.get_history(OFFER, 1)
+
+    totals = ledger.compact(timedelta(days=30))
+
+    assert totals == {"snapshotted": 1, "deleted": 2}
+    assert db.query(TradeEvent).filter(TradeEvent.aggregate_id == 1).count() == 0
+    after = ledger.get_history(OFFER, 1)
+    assert (after["status"], after["data"]) == (before["status"], before["data"])
+    # Deleted events are still counted, but no longer listed
+    assert after["event_count"] == 2 and after["events"] == []
+    # Recent, short streams are left alone
+    assert ledger.get_history(OFFER, 2)["status"] == "pending"
+    assert db.query(TradeSnapshot).count() == 1
+
+
+def test_history_reads_snapshot_plus_tail(db):
+    ledger = LedgerService(db)
+    ledger.record(*(event(OFFER, 1, "offer.note", 7, step=step) for step in range(5)))
+    db.commit()
+    ledger.compact(timedelta(days=30), snapshot_every=5)
+    ledger.record(event(OFFER, 1, "offer.rejected", 8, status="rejected"))
+    db.commit()
+
+    snapshot = db.query(TradeSnapshot).one()
+    history = ledger.get_history(OFFER, 1)
+
+    # Snapshots hold folded state only, not the growing transition log
+    assert snapshot.state == {"data": {"step": 4}, "event_count": 5}
+    assert history["event_count"] == 6
+    assert len(history["events"]) == 6
+    assert history["data"] == {"step": 4, "status": "rejected"}
+
+
+def test_history_pages_back_through_events(db):
+    ledger = LedgerService(db)
+    ledger.record(*(event(OFFER, 1, "offer.note", 7, step=step) for step in range(5)))
+    db.commit()
+    ids = [row.id for row in db.query(TradeEvent.id).order_by(TradeEvent.id)]
+
+    first = ledger.get_history(OFFER, 1, limit=2)
+    second = ledger.get_history(OFFER, 1, before=first["next_before"], limit=2)
+    last = ledger.get_history(OFFER, 1, before=second["next_before"], limit=2)
+
+    assert [entry["id"] for entry in first["events"]] == ids[3:]
+    assert [entry["id"] for entry in second["events"]] == ids[1:3]
+    assert [entry["id"] for entry in last["events"]] == ids[:1]
+    assert last["next_before"] is None
+    assert first["event_count"] == 5
+
+
+def test_repeated_snapshots_move_forward_only(db):
+    ledger = LedgerService(db)
+    ledger.record(event(OFFER, 1, "offer.created", 7, status="pending"))
+    db.commit()
+    ledger.snapshot(OFFER, 1)
+    ledger.snapshot(OFFER, 1)
+    db.commit()
+    ledger.record(event(OFFER, 1, "offer.rejected", 8, status="rejected"))
+    db.commit()
+    ledger.snapshot(OFFER, 1)
+    db.commit()
+
+    snapshot = db.query(TradeSnapshot).one()
+    assert snapshot.state == {"data": {"status": "rejected"}, "event_count": 2}
@@ -0,0 +1,89 @@
+from fastapi.testclient import TestClient
+
+from app.models import TradeOffer
+from app.schemas.trade import TradeOfferCreate
+from app.services.matching_service import CycleMatcher, matcher_requests, refresh_matcher
+from app.services.trade_service import TradeService
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+
+def test_matcher_detects_and_breaks_three_way_cycle():
+    matcher = CycleMatcher(max_length=4)
+    # Items 1, 2, 3 owned by users 10, 20, 30; each owner wants the next item
+    assert matcher.add_offer(100, 1, 10, 2, 20) == []
+    assert matcher.add_offer(101, 2, 20, 3, 30) == []
+    assert matcher.add_offer(102, 3, 30, 1, 10) == [(1, 2, 3)]
+
+    assert matcher.cycles_for_owner(20) == [(1, 2, 3)]
+    assert [leg["receives_item_id"] for leg in matcher.legs((1, 2, 3))] == [2, 3, 1]
+
+    assert matcher.remove_offer(101) == 1
+    assert matcher.cycles_for_owner(20) == []
+
+
+def test_matcher_respects_length_bound_and_distinct_owners():
+    matcher = CycleMatcher(max_length=3)
+    for offer_id, (source, target) in enumerate([(1, 2), (2, 3), (3, 4), (4, 1)]):
+        matcher.add_offer(offer_id, source, source * 10, target, target * 10)
+    assert matcher.cycles_for_owner(10) == []
+
+    # Two items of the same owner can't both be part of one cycle
+    matcher = CycleMatcher()
+    matcher.add_offer(1, 1, 10, 2, 20)
+    matcher.add_offer(2, 2, 20, 3, 10)
+    matcher.add_offer(3, 3, 10, 1, 10)
+    assert matcher.cycles_for_owner(10) == []
+
+
+def test_cycles_endpoint_tracks_created_and_withdrawn_offers(db, make_user, make_item):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    chair, lamp, rug = make_item(alice, "Chair"), make_item(bob, "Lamp"), make_item(carol, "Rug")
+
+    service = TradeService(db)
+    service.create_trade_offer(
+        TradeOfferCreate(item_id=lamp.id, offered_item_id=chair.id), alice.id)
+    service.create_trade_offer(
+        TradeOfferCreate(item_id=rug.id, offered_item_id=lamp.id), bob.id)
+
+    response = client.get("/api/trades/cycles", headers=auth_headers(carol))
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Once the matcher is loaded, new offers are matched incrementally
+    offer = service.create_trade_offer(
+        TradeOfferCreate(item_id=chair.id, offered_item_id=rug.id), carol.id)
+    cycles = client.get("/api/trades/cycles", headers=auth_headers(carol)).json()
+    assert len(cycles) == 1
+    assert {leg["user_id"] for leg in cycles[0]["legs"]} == {alice.id, bob.id, carol.id}
+
+    response = client.post(f"/api/trades/offers/{offer.id}/withdraw",
+                           headers=auth_headers(carol))
+    assert response.status_code == 200
+    assert client.get("/api/trades/cycles", headers=auth_headers(alice)).json() == []
+
+
+def test_offers_from_other_workers_arrive_with_the_refresh_job(db, make_user, make_item):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    chair, lamp, rug = make_item(alice, "Chair"), make_item(bob, "Lamp"), make_item(carol, "Rug")
+    headers = auth_headers(carol)
+    assert client.get("/api/trades/cycles", headers=headers).json() == []
+
+    # Written by another worker, so this process's matcher wasn't told
+    db.add_all([
+        TradeOffer(item_id=lamp.id, item_owner_id=bob.id, offerer_id=alice.id,
+                   offered_item_id=chair.id),
+        TradeOffer(item_id=rug.id, item_owner_id=carol.id, offerer_id=bob.id,
+                   offered_item_id=lamp.id),
+        TradeOffer(item_id=chair.id, item_owner_id=alice.id, offerer_id=carol.id,
+                   offered_item_id=rug.id),
+    ])
+    db.commit()
+    rebuilds = matcher_requests.value(result="rebuild")
+    assert client.get("/api/trades/cycles", headers=headers).json() == []
+    assert matcher_requests.value(result="rebuild") == rebuilds
+
+    assert refresh_matcher() == 3
+    assert len(client.get("/api/trades/cycles", headers=headers).json()) == 1
@@ -0,0 +1,84 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from app.utils import prometheus
+from app.utils.metrics import Registry
+from main import app
+
+client = TestClient(app)
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+
+    text = prometheus.render(prometheus.merge([prometheus.snapshot(registry)]))
+
+    assert latency.value(route="/a") == 4
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="/a"} 4.05' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+
+
+def test_merge_combines_workers_by_kind():
+    def worker(requests, in_flight, lag, counts):
+        return [
+            {"name": "requests_total", "kind": "counter", "description": "", "labelnames": [],
+             "mode": "sum", "buckets": [], "samples": [[[], requests]]},
+            {"name": "in_flight", "kind": "gauge", "description": "", "labelnames": [],
+             "mode": "sum", "buckets": [], "samples": [[[], in_flight]]},
+            {"name": "lag", "kind": "gauge", "description": "", "labelnames": [],
+             "mode": "max", "buckets": [], "samples": [[[], lag]]},
+            {"name": "latency", "kind": "histogram", "description": "", "labelnames": [],
+             "mode": "sum", "buckets": [1.0], "samples": [[[], counts]]},
+        ]
+
+    merged = {metric["name"]: metric["samples"][()]
+              for metric in prometheus.merge([worker(3, 1, 10, [1, 0, 0.5]),
+                                              worker(4, 2, 30, [2, 1, 4.0])])}
+
+    assert merged == {"requests_total": 7, "in_flight": 3, "lag": 30, "latency": [3, 1, 4.5]}
+
+
+def test_collect_reads_live_workers_and_drops_dead_ones(tmp_path):
+    live = [{"name": "other_worker_total", "kind": "counter", "description": "Other",
+             "labelnames": [], "mode": "sum", "buckets": [], "samples": [[[], 5]]}]
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(live))
+    (tmp_path / "999999999.json").write_text(json.dumps(live))
+
+    text = prometheus.exposition(str(tmp_path))
+
+    assert "other_worker_total 5" in text
+    assert not (tmp_path / "999999999.json").exists()
+
+
+def test_metrics_endpoint_reports_routes_and_pool(db, make_user, make_item):
+    make_item(make_user("alice"))
+    client.get("/api/items/1")
+    client.get("/api/items/does-not-exist-anywhere/at/all")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert ('http_request_duration_seconds_count{method="GET",route="/api/items/{item_id}",'
+            'status="200"}') in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'db_pool_connections{state="checked_out"}' in text
+    assert "http_requests_in_flight 1" in text
+
+
+def test_metrics_token(monkeypatch):
+    monkeypatch.setattr(prometheus, "METRICS_TOKEN", "scrape-me")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.services.notification_service import LocalBroker, PostgresBroker
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+
+def test_local_broker_delivers_to_subscribed_users_only():
+    async def scenario():
+        broker = LocalBroker()
+        alice, bob = broker.subscribe(1), broker.subscribe(2)
+        broker.publish([1], {"type": "offer.created"})
+        assert await alice.get(timeout=1) == {"type": "offer.created"}
+        assert await bob.get(timeout=0.05) is None
+
+        broker.unsubscribe(alice)
+        assert broker.subscriber_count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_keeps_newest_events():
+    async def scenario():
+        broker = LocalBroker()
+        subscription = broker.subscribe(1)
+        subscription.queue = asyncio.Queue(2)
+        for n in range(5):
+            broker.publish([1], {"n": n})
+        await asyncio.sleep(0)
+        assert [(await subscription.get(timeout=1))["n"] for _ in range(2)] == [3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_postgres_publish_does_not_wait_for_notify():
+    release, sent = threading.Event(), []
+
+    class SlowConnection:
+        closed = False
+
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params):
+            release.wait(5)
+            sent.append(params)
+
+        def close(self):
+            self.closed = True
+
+    broker = PostgresBroker("postgresql://unused")
+    broker._connect = SlowConnection
+
+    broker.publish([2, 1], {"type": "offer.created"})
+    broker.publish([1], {"type": "offer.accepted"})
+    assert sent == []
+
+    release.set()
+    asyncio.run(broker.stop())
+    assert [params[1] for params in sent] == [
+        '{"user_ids": [1, 2], "event": {"type": "offer.created"}}',
+        '{"user_ids": [1], "event": {"type": "offer.accepted"}}',
+    ]
+
+
+def test_websocket_receives_offer_events(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    token = auth_headers(alice)["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/api/notifications/ws?token={token}") as websocket:
+        response = client.post("/api/trades/offers", headers=auth_headers(bob),
+                               json={"item_id": chair.id, "offered_item_id": lamp.id})
+        assert response.status_code == 200
+        event = websocket.receive_json()
+        assert event["type"] == "offer.created"
+        assert event["offer_id"] == response.json()["id"]
+
+
+def test_notification_channels_require_a_valid_token(db):
+    response = client.get("/api/notifications/stream", params={"token": "bogus"})
+    assert response.status_code == 401
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.profiling import ProfilingMiddleware, write_profile
+
+api = FastAPI()
+
+
+def busy_work(rounds: int) -> int:
+    return sum(sum(range(1000)) for _ in range(rounds))
+
+
+@api.get("/work")
+async def work():
+    busy_work(5000)
+    await asyncio.sleep(0)
+    return {"ok": True}
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "operator")
+    return tmp_path
+
+
+def read_profile(directory, name):
+    lines = (directory / name).read_text().splitlines()
+    return {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+
+
+@pytest.mark.parametrize("mode", ["sample", "trace"])
+def test_requested_profile_is_written(profiles, mode):
+    client = TestClient(ProfilingMiddleware(api, directory=str(profiles)))
+
+    response = client.get("/work", headers={"X-Profile": mode, "X-Admin-Token": "operator"})
+
+    assert response.status_code == 200
+    name = response.headers["x-profile"]
+    assert name.endswith(f"-GET-work-{mode}.folded")
+    stacks = read_profile(profiles, name)
+    assert any("busy_work (test_profiling.py" in stack for stack in stacks)
+    if mode == "trace":
+        # Microseconds, the busy loop taking most of them
+        busy = sum(weight for stack, weight in stacks.items() if "busy_work" in stack)
+        assert busy > sum(stacks.values()) / 2
+
+
+def test_query_flag_and_token(profiles):
+    client = TestClient(ProfilingMiddleware(api, directory=str(profiles)))
+
+    assert "x-profile" not in client.get("/work?profile=sample").headers
+    assert "x-profile" not in client.get(
+        "/work?profile=sample", headers={"X-Admin-Token": "wrong"}).headers
+    assert "x-profile" in client.get(
+        "/work?profile=sample", headers={"X-Admin-Token": "operator"}).headers
+
+
+def test_one_in_n_requests_are_sampled(profiles):
+    client = TestClient(ProfilingMiddleware(api, sample_every=3, directory=str(profiles)))
+
+    sampled = ["x-profile" in client.get("/work").headers for _ in range(6)]
+
+    assert sampled == [False, False, True, False, False, True]
+
+
+def test_retention_keeps_newest(tmp_path):
+    for n in range(5):
+        write_profile(Counter({f"main;step{n}": 1}), f"{n}.folded", str(tmp_path), keep=3)
+        os.utime(tmp_path / f"{n}.folded", (n, n))
+
+    assert sorted(os.listdir(tmp_path)) == ["2.folded", "3.folded", "4.folded"]
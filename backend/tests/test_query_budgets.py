@@ -0,0 +1,151 @@
+"""Query budgets for every router's read endpoints
+
+The market has ROWS of everything each endpoint lists, more than the
+N+1 threshold, so a relation lazy-loaded per row fails check_queries
+even where the total stays within budget. Budgets are the current query
+counts; raise one only with a reason.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.models import Item, ItemPhoto, Review, User
+from app.models.subscription import PaymentProvider, Subscription
+from app.schemas.review import ReviewCreate
+from app.schemas.trade import TradeOfferCreate
+from app.services.review_service import ReviewService
+from app.services.trade_service import TradeService
+from app.utils.query_audit import (
+    N_PLUS_ONE_THRESHOLD, RepeatedQueryError, RepeatedQueryMiddleware, check_queries
+)
+from conftest import auth_headers, count_queries
+from main import app
+
+client = TestClient(app)
+
+ROWS = N_PLUS_ONE_THRESHOLD + 3
+
+
+@pytest.fixture
+def market(db, make_user, make_item):
+    """Subscribed alice trades, reviews and exchanges offers with ROWS
+    other users, each owning a photographed item to offer and another to trade"""
+    alice = make_user("alice", city="Boston", state="MA")
+    alice_items = [make_item(alice, f"Alice item {n}") for n in range(3 * ROWS)]
+    trades = TradeService(db)
+    others, offers, accepted = [], [], []
+    for n in range(ROWS):
+        other = make_user(f"trader{n}", city="Boston", state="MA")
+        item = make_item(other, f"Item {n}")
+        db.add(ItemPhoto(item_id=item.id, photo_url=f"/{n}.jpg", is_primary=True))
+        others.append(other)
+        # Received, made and accepted offers each use their own alice item
+        offers.append(trades.create_trade_offer(
+            TradeOfferCreate(item_id=alice_items[n].id, offered_item_id=item.id), other.id))
+        trades.create_trade_offer(
+            TradeOfferCreate(item_id=item.id, offered_item_id=alice_items[ROWS + n].id), alice.id)
+        offer = trades.create_trade_offer(
+            TradeOfferCreate(item_id=alice_items[2 * ROWS + n].id,
+                             offered_item_id=make_item(other, f"Traded {n}").id), other.id)
+        accepted.append(trades.accept_trade_offer(offer.id, alice.id))
+    for trade in accepted[:ROWS // 2]:
+        trades.complete_trade(trade.id, alice.id)
+    reviews = ReviewService(db)
+    for other, trade in zip(others, accepted):
+        reviews.create_review(ReviewCreate(reviewee_id=alice.id, trade_id=trade.id, rating=4,
+                                           title="Good", comment="Fine"), other.id)
+        db.add(Review(reviewer_id=alice.id, reviewee_id=other.id, trade_id=trade.id,
+                      rating=5, title="Great", comment="Smooth"))
+    db.add(Subscription(user_id=alice.id, payment_provider=PaymentProvider.STRIPE,
+                        provider_subscription_id="sub_alice", provider_customer_id="cus_alice"))
+    db.commit()
+    counter = trades.create_counter_offer(
+        offers[0].id, TradeOfferCreate(item_id=offers[0].offered_item_id,
+                                       offered_item_id=alice_items[0].id), alice.id)
+    return {"alice": alice.id, "headers": auth_headers(alice), "item": alice_items[0].id,
+            "offer": offers[0].id, "counter": counter.id, "trade": accepted[0].id,
+            "review": db.query(Review.id).filter(Review.reviewer_id == alice.id).first()[0]}
+
+
+# (path, authenticated, query budget)
+BUDGETS = [
+    # items
+    ("/api/items/", False, 2),
+    ("/api/items/?fields=title,owner", False, 1),
+    ("/api/items/categories", False, 1),
+    ("/api/items/{item}", False, 4),
+    ("/api/items/user/{alice}", False, 2),
+    ("/api/items/recommendations", True, 4),
+    # users
+    ("/api/users/", False, 1),
+    ("/api/users/me", True, 2),
+    ("/api/users/{alice}", False, 1),
+    ("/api/users/leaderboard?state=MA", False, 1),
+    # trades
+    ("/api/trades/offers/received", True, 6),
+    ("/api/trades/offers/made", True, 6),
+    ("/api/trades/offers/pending/count", True, 3),
+    ("/api/trades/offers/{offer}/thread", True, 6),
+    ("/api/trades/offers/{offer}/counters", True, 7),
+    ("/api/trades/offers/{offer}/history", True, 5),
+    ("/api/trades/active", True, 6),
+    ("/api/trades/history", True, 6),
+    ("/api/trades/{trade}/history", True, 5),
+    ("/api/trades/cycles", True, 2),
+    # reviews
+    ("/api/reviews/user/{alice}", False, 3),
+    ("/api/reviews/trade/{trade}", False, 3),
+    ("/api/reviews/{review}", False, 3),
+    # payments
+    ("/api/payments/status", True, 2),
+    ("/api/payments/entitlement", True, 2),
+]
+
+
+@pytest.mark.parametrize("path,authenticated,budget", BUDGETS)
+def test_query_budget(market, path, authenticated, budget):
+    headers = market["headers"] if authenticated else {}
+    url = path.format(**market)
+
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200, response.text
+    check_queries(statements, budget=budget)
+
+
+def test_lazy_loading_per_row_is_caught(db, make_user, make_item):
+    for n in range(ROWS):
+        make_item(make_user(f"owner{n}"), f"Item {n}")
+    db.expunge_all()
+
+    with count_queries() as statements:
+        for item in db.query(Item).all():
+            item.owner.username
+
+    with pytest.raises(RepeatedQueryError, match=f"{ROWS}x SELECT users"):
+        check_queries(statements)
+
+
+@pytest.mark.parametrize("mode", ["warn", "raise"])
+def test_middleware_reports_repeats(db, make_user, caplog, mode):
+    for n in range(ROWS):
+        make_user(f"user{n}")
+
+    async def lazy_endpoint(scope, receive, send):
+        session = SessionLocal()
+        try:
+            for user_id in range(1, ROWS + 1):
+                session.get(User, user_id)
+        finally:
+            session.close()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    audited = TestClient(RepeatedQueryMiddleware(lazy_endpoint, mode=mode))
+    if mode == "raise":
+        with pytest.raises(RepeatedQueryError, match="GET /lazy"):
+            audited.get("/lazy")
+    else:
+        assert audited.get("/lazy").status_code == 200
+        assert "GET /lazy repeated queries" in caplog.text
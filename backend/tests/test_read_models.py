@@ -0,0 +1,47 @@
+from app.models import ItemPhoto
+from app.services.item_service import ItemService
+from app.services.read_models import ItemRecord, UserProfileRecord
+from app.services.review_service import ReviewService
+from app.services.user_service import UserService
+from conftest import count_queries
+
+
+def test_browse_items_are_records_with_photos_in_two_queries(db, make_user, make_item):
+    alice, bob = make_user("alice", city="Austin"), make_user("bob")
+    first = make_item(alice, "Lamp", city="Austin")
+    make_item(bob, "Chair", city="Boston")
+    db.add_all([ItemPhoto(item_id=first.id, photo_url="/b.jpg", order_index=1),
+                ItemPhoto(item_id=first.id, photo_url="/a.jpg", order_index=0,
+                          is_primary=True)])
+    db.commit()
+    bob_id = bob.id
+    db.expunge_all()
+
+    with count_queries() as queries:
+        items = ItemService(db).get_items(city="aus")
+
+    assert len(queries) == 2
+    assert len(db.identity_map) == 0
+    assert [type(item) for item in items] == [ItemRecord]
+    lamp = items[0]
+    assert (lamp.title, lamp.owner.username, lamp.category.name) == ("Lamp", "alice", "General")
+    assert [photo.photo_url for photo in lamp.photos] == ["/a.jpg", "/b.jpg"]
+    assert [item.title for item in ItemService(db).get_user_items(bob_id)] == ["Chair"]
+
+
+def test_user_search_reads_profiles_with_reputation_in_one_query(db, make_user):
+    users = [make_user(f"trader{n}") for n in range(3)]
+    reviewed_id = users[1].id
+    ReviewService(db)._adjust_reputation(reviewed_id, {5: 1})
+    db.commit()
+    db.expunge_all()
+
+    with count_queries() as queries:
+        profiles = UserService(db).search_users(q="trader")
+
+    assert len(queries) == 1
+    assert all(isinstance(profile, UserProfileRecord) for profile in profiles)
+    assert [profile.reviews_count for profile in profiles] == [0, 1, 0]
+    assert profiles[1].average_rating is not None
+    assert UserService(db).get_user_profile(reviewed_id).reviews_count == 1
+    assert UserService(db).get_user_profile(999) is None
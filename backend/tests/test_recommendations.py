@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+
+from app.models import ItemCategory, Trade
+from app.schemas.review import ReviewCreate
+from app.services.recommendation_service import matrix_requests, refresh_matrix
+from app.services.review_service import ReviewService
+from conftest import auth_headers
+from main import app
+
+client = TestClient(app)
+
+
+def test_recommendations_rank_by_affinity_distance_and_rating(db, make_user, make_item):
+    books, tools = ItemCategory(name="Books"), ItemCategory(name="Tools")
+    db.add_all([books, tools])
+    db.commit()
+    nyc = dict(latitude=40.71, longitude=-74.0)
+    la = dict(latitude=34.05, longitude=-118.24)
+
+    alice, bob, carol, dave = (make_user(name) for name in ("alice", "bob", "carol", "dave"))
+    own = make_item(alice, "Novel", books, condition="Good", **nyc)
+    near_book = make_item(bob, "Atlas", books, condition="Good", **nyc)
+    far_book = make_item(carol, "Poems", books, condition="Good", **la)
+    near_tool = make_item(dave, "Drill", tools, condition="Poor", **nyc)
+
+    trade = Trade(item1_id=own.id, item2_id=near_book.id, user1_id=alice.id, user2_id=bob.id)
+    db.add(trade)
+    db.commit()
+    ReviewService(db).create_review(
+        ReviewCreate(reviewee_id=bob.id, trade_id=trade.id, rating=5, title="Great"), alice.id)
+
+    response = client.get("/api/items/recommendations", headers=auth_headers(alice))
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["item_id"] for result in results] == [near_book.id, far_book.id, near_tool.id]
+    assert all(result["matched_item_id"] == own.id for result in results)
+    assert results[0]["distance_km"] == 0.0
+
+
+def test_recommendations_empty_without_active_items(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    make_item(bob, "Lamp")
+    response = client.get("/api/items/recommendations", headers=auth_headers(alice))
+    assert response.json() == []
+
+
+def test_requests_read_the_matrix_the_refresh_job_builds(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    make_item(alice, "Novel")
+    make_item(bob, "Lamp")
+    assert refresh_matrix() == 2
+    make_item(bob, "Chair")
+    headers = auth_headers(alice)
+
+    rebuilds = matrix_requests.value(result="rebuild")
+    assert len(client.get("/api/items/recommendations", headers=headers).json()) == 1
+    assert matrix_requests.value(result="rebuild") == rebuilds
+
+    refresh_matrix()
+    assert len(client.get("/api/items/recommendations", headers=headers).json()) == 2
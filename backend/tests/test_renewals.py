@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.models.subscription import PaymentProvider, Subscription, SubscriptionStatus
+from app.services.entitlement_service import EntitlementService
+from app.services import renewal_service
+from app.services.renewal_service import (
+    ProviderGateway, RenewalError, RenewalResult, RenewalService, StubGateway,
+    first_billing_date, make_gateway, overdue_seconds, renewals
+)
+from app.utils.rate_limit import LimitedCaller
+
+
+def make_subscription(db, user, next_billing_date):
+    subscription = Subscription(user_id=user.id, payment_provider=PaymentProvider.STRIPE,
+                                provider_subscription_id=f"sub_{user.id}",
+                                provider_customer_id=f"cus_{user.id}",
+                                status=SubscriptionStatus.ACTIVE,
+                                next_billing_date=next_billing_date)
+    db.add(subscription)
+    db.commit()
+    return subscription
+
+
+def test_first_billing_dates_are_spread_across_the_day():
+    now = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+    dates = [first_billing_date(user_id, now=now) for user_id in range(1, 1001)]
+    assert all(timedelta(days=7) <= due - now < timedelta(days=8) for due in dates)
+    hours = {due.hour for due in dates}
+    assert len(hours) == 24
+
+
+def test_due_subscriptions_are_renewed_or_lapsed_in_chunks(db, make_user):
+    now = datetime.now(timezone.utc)
+    due = [make_subscription(db, make_user(f"due{n}"), now - timedelta(hours=n + 1))
+           for n in range(5)]
+    later = make_subscription(db, make_user("later"), now + timedelta(days=3))
+    declined_user = make_user("declined")
+    declined = make_subscription(db, declined_user, now - timedelta(hours=1))
+    entitlements = EntitlementService(db)
+    assert entitlements.is_premium(declined_user.id)
+    cached_billing_date = entitlements.get_entitlement(due[0].user_id).next_billing_date
+
+    class Gateway(StubGateway):
+        async def renew(self, claim):
+            if claim.id == declined.id:
+                self.calls += 1
+                return RenewalResult(SubscriptionStatus.PAST_DUE)
+            return await super().renew(claim)
+
+    gateway = Gateway()
+    renewed_before = renewals.value(outcome="renewed")
+    totals = asyncio.run(RenewalService(db, gateway).renew_due(batch_size=2))
+
+    assert totals == {"renewed": 5, "lapsed": 1}
+    assert gateway.calls == 6
+    assert renewals.value(outcome="renewed") == renewed_before + 5
+    db.expire_all()
+    for subscription in due:
+        assert subscription.renewal_claimed_at is None
+        assert subscription.next_billing_date.replace(tzinfo=timezone.utc) > now
+    assert later.renewal_claimed_at is None
+    assert declined.status == SubscriptionStatus.PAST_DUE
+    assert not entitlements.is_premium(declined_user.id)
+    # Renewed users' cached entitlements are dropped too, not left with the old date
+    assert entitlements.get_entitlement(due[0].user_id).next_billing_date > cached_billing_date
+    assert overdue_seconds(db) == 0.0
+
+
+def test_failed_renewals_keep_their_claim_until_it_expires(db, make_user):
+    make_subscription(db, make_user("alice"), datetime.now(timezone.utc) - timedelta(hours=1))
+
+    class Unavailable(StubGateway):
+        async def renew(self, claim):
+            raise RenewalError("timeout")
+
+    assert asyncio.run(RenewalService(db, Unavailable()).renew_batch()) == {"error": 1}
+    assert RenewalService(db).claim_due() == []
+    assert overdue_seconds(db) > 3000
+
+    expired = RenewalService(db, claim_ttl=timedelta(seconds=-1))
+    assert len(expired.claim_due()) == 1
+
+
+def test_limited_caller_bounds_concurrency():
+    in_flight, peak = 0, 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    async def main():
+        caller = LimitedCaller(concurrency=3, rate=1000)
+        await asyncio.gather(*(caller.call(call) for _ in range(12)))
+
+    asyncio.run(main())
+    assert peak == 3
+
+
+def test_only_handled_billing_cycles_are_claimed(db, make_user):
+    now = datetime.now(timezone.utc)
+    weekly = make_subscription(db, make_user("weekly"), now - timedelta(hours=1))
+    monthly = make_subscription(db, make_user("monthly"), now - timedelta(days=2))
+    monthly.billing_cycle = "monthly"
+    db.commit()
+
+    claims = RenewalService(db, StubGateway()).claim_due()
+
+    assert [claim.id for claim in claims] == [weekly.id]
+
+
+def test_gateway_defaults_to_the_providers(monkeypatch):
+    assert isinstance(make_gateway(), ProviderGateway)
+    monkeypatch.setattr(renewal_service, "RENEWAL_GATEWAY", "stub")
+    assert isinstance(make_gateway(), StubGateway)
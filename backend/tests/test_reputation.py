@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+
+from app.models import Trade, User
+from app.schemas.review import ReviewCreate, ReviewUpdate
+from app.services.review_service import (
+    REPUTATION_PRIOR_MEAN, REPUTATION_PRIOR_WEIGHT, ReviewService
+)
+from main import app
+
+client = TestClient(app)
+
+
+def bayesian(*ratings):
+    return ((REPUTATION_PRIOR_WEIGHT * REPUTATION_PRIOR_MEAN + sum(ratings))
+            / (REPUTATION_PRIOR_WEIGHT + len(ratings)))
+
+
+def review(db, reviewer, reviewee, rating):
+    trade = Trade(item1_id=1, item2_id=2, user1_id=reviewer.id, user2_id=reviewee.id)
+    db.add(trade)
+    db.commit()
+    return ReviewService(db).create_review(
+        ReviewCreate(reviewee_id=reviewee.id, trade_id=trade.id, rating=rating,
+                     title="Review"), reviewer.id)
+
+
+def score(db, user):
+    db.expire_all()
+    return db.get(User, user.id).reputation_score
+
+
+def test_reputation_follows_review_create_update_delete(db, make_user):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    assert score(db, bob) is None
+
+    first = review(db, alice, bob, 5)
+    review(db, carol, bob, 2)
+    assert score(db, bob) == bayesian(5, 2)
+
+    service = ReviewService(db)
+    service.update_review(first.id, ReviewUpdate(rating=4), alice.id)
+    assert score(db, bob) == bayesian(4, 2)
+
+    service.update_review(first.id, ReviewUpdate(title="Edited"), alice.id)
+    assert score(db, bob) == bayesian(4, 2)
+
+    service.delete_review(first.id, alice.id)
+    assert score(db, bob) == bayesian(2)
+
+
+def test_leaderboard_ranks_and_filters_by_location(db, make_user):
+    reviewer = make_user("reviewer")
+    nyc = make_user("nyc", city="New York", state="NY")
+    buffalo = make_user("buffalo", city="Buffalo", state="NY")
+    austin = make_user("austin", city="Austin", state="TX")
+    make_user("unrated", city="New York", state="NY")
+    for user, ratings in ((nyc, [5, 5, 5]), (buffalo, [5]), (austin, [4] * 6)):
+        for rating in ratings:
+            review(db, reviewer, user, rating)
+
+    response = client.get("/api/users/leaderboard")
+    assert response.status_code == 200
+    assert [entry["username"] for entry in response.json()] == ["nyc", "austin", "buffalo"]
+    assert response.json()[0]["review_count"] == 3
+
+    response = client.get("/api/users/leaderboard", params={"state": "NY"})
+    assert [entry["username"] for entry in response.json()] == ["nyc", "buffalo"]
+
+    response = client.get("/api/users/leaderboard", params={"city": "Buffalo", "limit": 1})
+    assert [entry["username"] for entry in response.json()] == ["buffalo"]
+
+
+def test_profile_shows_plain_average_next_to_score(db, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    review(db, alice, bob, 5)
+
+    profile = client.get(f"/api/users/{bob.id}").json()
+
+    assert profile["average_rating"] == 5.0
+    assert profile["reputation_score"] == bayesian(5)
+    assert profile["reviews_count"] == 1
+    assert client.get(f"/api/users/{alice.id}").json()["average_rating"] is None
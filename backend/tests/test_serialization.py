@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.models import Review, Trade
+from app.schemas.item import ITEM_RESPONSES, ItemResponse
+from app.schemas.review import ReviewResponse
+from app.utils.serialization import FastJSONResponse
+from main import app
+
+client = TestClient(app)
+
+
+def test_item_list_matches_response_model_output(db, make_user, make_item):
+    alice = make_user("alice")
+    items = [make_item(alice, f"Item {n}") for n in range(3)]
+
+    response = client.get("/api/items/", params={"limit": 10})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    expected = jsonable_encoder([ItemResponse.model_validate(item) for item in items])
+    assert sorted(response.json(), key=lambda item: item["id"]) == expected
+    assert response.json()[0]["owner"]["username"] == "alice"
+    assert response.json()[0]["status"] == "active"
+    assert json.loads(ITEM_RESPONSES.dump_json(ITEM_RESPONSES.validate_python(
+        items, from_attributes=True))) == expected
+
+
+def test_review_lists_embed_user_summaries(db, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    trade = Trade(item1_id=1, item2_id=2, user1_id=alice.id, user2_id=bob.id)
+    db.add(trade)
+    db.commit()
+    review = Review(reviewer_id=alice.id, reviewee_id=bob.id, trade_id=trade.id,
+                    rating=5, title="Great")
+    db.add(review)
+    db.commit()
+
+    response = client.get(f"/api/reviews/user/{bob.id}")
+
+    assert response.status_code == 200
+    assert response.json() == jsonable_encoder([ReviewResponse.model_validate(review)])
+    assert response.json()[0]["reviewer"]["username"] == "alice"
+
+
+def test_anonymous_reviewers_are_hidden(db, make_user):
+    alice, bob = make_user("alice"), make_user("bob")
+    trade = Trade(item1_id=1, item2_id=2, user1_id=alice.id, user2_id=bob.id)
+    db.add(trade)
+    db.commit()
+    review = Review(reviewer_id=alice.id, reviewee_id=bob.id, trade_id=trade.id,
+                    rating=2, title="Meh", is_anonymous=True)
+    db.add(review)
+    db.commit()
+
+    listed, = client.get(f"/api/reviews/user/{bob.id}").json()
+    single = client.get(f"/api/reviews/{review.id}").json()
+    sparse, = client.get(f"/api/reviews/user/{bob.id}",
+                         params={"fields": "reviewer,reviewer_id"}).json()
+
+    for body in (listed, single):
+        assert body["reviewer"] is None and body["reviewer_id"] is None
+        assert body["reviewee"]["username"] == "bob"
+    assert sparse == {"id": review.id, "is_anonymous": True,
+                      "reviewer": None, "reviewer_id": None}
+
+
+def test_fast_json_response_renders_numpy_and_bytes():
+    assert FastJSONResponse({"score": np.float32(0.5), 1: "a"}).body == b'{"score":0.5,"1":"a"}'
+    assert FastJSONResponse(b'[1,2]').body == b'[1,2]'
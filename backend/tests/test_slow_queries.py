@@ -0,0 +1,88 @@
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.services.item_service import ItemService
+from app.utils import slow_queries
+from app.utils.slow_queries import SlowQueryLog, redact, statement_shape
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def record_everything(monkeypatch):
+    """Treat every statement as slow"""
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", 0)
+    slow_queries.slow_queries.clear()
+    yield slow_queries.slow_queries
+    slow_queries.slow_queries.clear()
+
+
+def test_statement_shape_and_redaction():
+    shape = statement_shape("SELECT *\n  FROM items WHERE id IN (?, ?, ?) AND city = ?")
+
+    assert shape == "SELECT * FROM items WHERE id IN (...) AND city = ?"
+    assert redact(("secret@example.com", 3, None)) == ["<str>", "<int>", None]
+    assert redact({"email": "secret@example.com"}) == {"email": "<str>"}
+
+
+def test_slow_select_is_recorded_with_plan_and_caller(db, make_user, make_item, record_everything):
+    make_item(make_user("alice"), "Bike", city="Boston")
+
+    ItemService(db).get_items(city="Boston")
+
+    entry = next(entry for entry in record_everything.recent(50)
+                 if entry["statement"].startswith("SELECT") and "FROM items" in entry["statement"])
+    assert "Boston" not in json.dumps(entry, default=str)
+    assert "<str>" in entry["parameters"]
+    assert "item_service.py" in entry["caller"] and "ItemService.get_items" in entry["caller"]
+    assert entry["plan"] and "items" in entry["plan"]
+
+
+def test_plans_are_captured_once_per_shape(db, record_everything):
+    db.execute(text("SELECT 1 WHERE 1 = :value"), {"value": 1})
+    db.execute(text("SELECT 1 WHERE 1 = :value"), {"value": 2})
+    db.execute(text("UPDATE users SET city = city"))
+
+    first, second, update = [entry for entry in reversed(record_everything.recent(50))
+                             if "SELECT 1" in entry["statement"] or "UPDATE" in entry["statement"]]
+    assert first["plan"] is not None
+    assert second["plan"] is None
+    assert update["plan"] is None
+
+
+def test_rotating_file(tmp_path):
+    path = tmp_path / "slow" / "queries.log"
+    log = SlowQueryLog(keep=1, path=str(path))
+
+    log.add({"duration_ms": 300.0, "caller": None, "statement": "SELECT 1"})
+    log.add({"duration_ms": 400.0, "caller": None, "statement": "SELECT 2"})
+    for handler in logging.getLogger("app.utils.slow_queries.file").handlers:
+        handler.flush()
+
+    assert [json.loads(line)["statement"] for line in path.read_text().splitlines()][-2:] == \
+        ["SELECT 1", "SELECT 2"]
+    assert [entry["statement"] for entry in log.recent(10)] == ["SELECT 2"]
+
+
+def test_admin_endpoint_requires_token(db, monkeypatch, record_everything):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/api/admin/slow-queries").status_code == 503
+
+    monkeypatch.setenv("ADMIN_TOKEN", "operator")
+    assert client.get("/api/admin/slow-queries",
+                      headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    client.get("/api/items/")
+    response = client.get("/api/admin/slow-queries?limit=5",
+                          headers={"X-Admin-Token": "operator"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["threshold_ms"] == 0
+    assert 0 < len(body["queries"]) <= 5
+    assert any("items" in query["statement"] for query in body["queries"])
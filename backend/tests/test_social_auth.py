@@ -0,0 +1,102 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import User
+from app.utils import social_auth
+from app.utils.outbound import external_calls
+from app.utils.social_auth import (
+    FACEBOOK_ME_URL, GOOGLE_JWKS_URL, GOOGLE_USERINFO_URL, StubProvider, VerifiedTokenCache
+)
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client")
+    monkeypatch.setenv("FACEBOOK_CLIENT_ID", "client")
+    stub = StubProvider(seed=1)
+    social_auth.configure(stub)
+    yield stub
+    social_auth.configure(None)
+
+
+def google_login(token):
+    return client.post("/api/auth/google", params={"google_token": token})
+
+
+def test_id_token_is_verified_against_cached_keys(db, provider):
+    first = google_login(provider.id_token("g-1", "ann@gmail.com", "Ann"))
+    second = google_login(provider.id_token("g-2", "ben@gmail.com", "Ben"))
+
+    assert first.status_code == second.status_code == 200
+    assert provider.calls == {GOOGLE_JWKS_URL: 1}
+    assert db.query(User).filter(User.google_id == "g-2").one().email == "ben@gmail.com"
+
+
+@pytest.mark.parametrize("claims", [
+    {"audience": "someone-else"},
+    {"expires_in": -60},
+    {"email_verified": False},
+])
+def test_invalid_id_tokens_are_rejected(db, provider, claims):
+    response = google_login(provider.id_token("g-1", "ann@gmail.com", **claims))
+
+    assert response.status_code == 401
+
+
+def test_id_token_from_another_key_is_rejected(db, provider):
+    forged = StubProvider(seed=1).id_token("g-1", "ann@gmail.com")
+
+    assert google_login(forged).status_code == 401
+
+
+def test_verified_access_tokens_are_cached(db, provider):
+    assert google_login("stub-ann").status_code == 200
+    assert google_login("stub-ann").status_code == 200
+    assert client.post("/api/auth/facebook", params={"facebook_token": "stub-ann"}).status_code \
+        == 200
+
+    assert provider.calls == {GOOGLE_USERINFO_URL: 1, FACEBOOK_ME_URL: 1}
+    assert google_login("not-a-user").status_code == 401
+
+
+def test_cache_never_outlives_the_token():
+    cache = VerifiedTokenCache(ttl=60)
+    cache.put("google", "long", {"id": "1"})
+    cache.put("google", "short", {"id": "2"}, expires_in=0.01)
+    cache.put("google", "expired", {"id": "3"}, expires_in=-1)
+
+    time.sleep(0.02)
+
+    assert cache.get("google", "long") == {"id": "1"}
+    assert cache.get("google", "short") is None
+    assert cache.get("google", "expired") is None
+    assert len(cache) == 1
+
+
+def test_provider_errors_fail_the_login(db, provider):
+    provider.error_rate = 1.0
+
+    assert google_login("stub-ann").status_code == 401
+    assert client.post("/api/auth/facebook", params={"facebook_token": "stub-ann"}).status_code \
+        == 401
+
+
+def test_slow_provider_times_out(db, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client")
+    social_auth.configure(StubProvider(latency=5.0), timeout=0.05)
+    errors = external_calls.value(service="google", outcome="error")
+    try:
+        started = time.perf_counter()
+        response = google_login("stub-ann")
+        elapsed = time.perf_counter() - started
+    finally:
+        social_auth.configure(None)
+
+    assert response.status_code == 401
+    assert elapsed < 1.0
+    assert external_calls.value(service="google", outcome="error") == errors + 1
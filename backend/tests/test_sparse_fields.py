@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import ItemPhoto, Review
+from app.schemas.trade import TradeOfferCreate
+from app.services.trade_service import TradeService
+from conftest import auth_headers, count_queries
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def market(db, make_user, make_item):
+    """alice owns a photographed lamp bob traded for, and bob reviewed alice"""
+    alice, bob = make_user("alice"), make_user("bob")
+    lamp, chair = make_item(alice, "Lamp"), make_item(bob, "Chair")
+    db.add(ItemPhoto(item_id=lamp.id, photo_url="/lamp.jpg", is_primary=True))
+    offers = TradeService(db)
+    offer = offers.create_trade_offer(
+        TradeOfferCreate(item_id=lamp.id, offered_item_id=chair.id, message="Swap?"), bob.id)
+    trade = offers.accept_trade_offer(
+        offers.create_trade_offer(
+            TradeOfferCreate(item_id=chair.id, offered_item_id=lamp.id), alice.id).id, bob.id)
+    db.add(Review(reviewer_id=bob.id, reviewee_id=alice.id, trade_id=trade.id, rating=5,
+                  title="Great", comment="Smooth"))
+    db.commit()
+    return {"alice": alice, "bob": bob, "offer": offer, "trade": trade}
+
+
+# (path, as user, fields, SQL that must run, SQL that must not)
+MATRIX = [
+    ("/api/items/", None, "title,city,primary_photo_url",
+     ["items.title", "items.city", "FROM item_photos"],
+     ["items.description", "JOIN users", "JOIN item_categories"]),
+    ("/api/items/", None, "title",
+     ["items.title"], ["items.description", "FROM item_photos", "JOIN users"]),
+    ("/api/items/", None, "owner,category",
+     ["JOIN users", "JOIN item_categories"], ["items.description", "FROM item_photos"]),
+    ("/api/items/user/{alice}", None, "status",
+     ["items.status"], ["items.title", "FROM item_photos"]),
+    ("/api/users/", None, "username",
+     ["users.username"], ["users.email", "user_reputations"]),
+    ("/api/users/", None, "username,reviews_count",
+     ["user_reputations.review_count"], ["users.email", "user_reputations.score"]),
+    ("/api/trades/offers/received", "alice", "status,offerer",
+     ["trade_offers.status", "trade_offers.offerer_id", "users.username"],
+     ["trade_offers.message", "FROM items"]),
+    ("/api/trades/offers/made", "bob", "message",
+     ["trade_offers.message"], ["trade_offers.offered_item_id", "FROM items"]),
+    ("/api/trades/active", "alice", "status,item1",
+     ["trades.status", "items.title"], ["trades.notes", "items.description"]),
+    ("/api/reviews/user/{alice}", None, "rating",
+     ["reviews.rating"], ["reviews.comment", "FROM users"]),
+    ("/api/reviews/trade/{trade}", None, "rating,reviewer",
+     ["reviews.reviewer_id", "users.username"], ["reviews.comment", "users.email"]),
+]
+
+
+@pytest.mark.parametrize("path,user,fields,selected,pruned", MATRIX)
+def test_fields_narrow_payload_and_columns(market, path, user, fields, selected, pruned):
+    path = path.format(alice=market["alice"].id, trade=market["trade"].id)
+    headers = auth_headers(market[user]) if user else {}
+    with count_queries() as statements:
+        response = client.get(path, params={"fields": fields}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    requested = {"id", *fields.split(",")}
+    # Reviewer fields bring is_anonymous along, which explains a blank reviewer
+    assert body and all(requested <= set(entry) <= requested | {"is_anonymous"}
+                        for entry in body)
+    sql = "\n".join(statements)
+    for fragment in selected:
+        assert fragment in sql
+    for fragment in pruned:
+        # The current user's own row is loaded for authentication
+        assert fragment not in sql.replace("users.email = ?", "")
+
+
+def test_sparse_values_match_full_response(market):
+    full = client.get("/api/items/").json()
+    sparse = client.get("/api/items/", params={"fields": "title,owner,primary_photo_url"}).json()
+    assert sparse == [{key: item[key] for key in ("id", "title", "owner", "primary_photo_url")}
+                      for item in full]
+    assert sparse[0]["primary_photo_url"] == "/lamp.jpg"
+
+
+def test_unknown_fields_are_rejected(market):
+    response = client.get("/api/items/", params={"fields": "title,secret"})
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
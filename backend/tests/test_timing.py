@@ -0,0 +1,53 @@
+import logging
+import re
+
+from fastapi.testclient import TestClient
+
+from app.utils.timing import TimingMiddleware
+from main import app
+from conftest import auth_headers, count_queries
+
+client = TestClient(app)
+
+
+def server_timing(response) -> dict:
+    """Server-Timing metrics as name -> (duration, description)"""
+    metrics = {}
+    for metric in response.headers["server-timing"].split(", "):
+        name, *params = metric.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(values["dur"]), values.get("desc", "").strip('"'))
+    return metrics
+
+
+def test_server_timing_counts_queries_and_phases(db, make_user):
+    alice = make_user("alice")
+    headers = auth_headers(alice)
+
+    with count_queries() as statements:
+        response = client.get("/api/trades/offers/received", headers=headers)
+
+    assert response.status_code == 200
+    metrics = server_timing(response)
+    assert metrics["db"][1] == f"{len(statements)} queries"
+    assert {"auth", "serialize", "total"} <= metrics.keys()
+    assert metrics["total"][0] >= metrics["db"][0]
+
+
+def test_request_log_line(db, caplog):
+    with caplog.at_level(logging.INFO, logger="app.utils.timing"):
+        client.get("/health")
+
+    line = next(record.getMessage() for record in caplog.records
+                if record.name == "app.utils.timing")
+    assert re.match(r"request method=GET path=/health status=200 total_ms=[\d.]+ "
+                    r"db_queries=0 db_ms=0\.0$", line)
+
+
+def test_header_can_be_turned_off():
+    quiet = TestClient(TimingMiddleware(app.router, header=False))
+
+    response = quiet.get("/health")
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
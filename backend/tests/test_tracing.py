@@ -0,0 +1,126 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.utils import security, social_auth, tracing
+from app.utils.outbound import outbound_call
+from main import app
+
+client = TestClient(app)
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def named(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def spans():
+    exporter = ListExporter()
+    tracing.configure(exporter)
+    yield exporter
+    tracing.configure(None)
+
+
+def test_login_trace_has_hash_and_transaction_spans(db, make_user, spans, monkeypatch):
+    # A fast scheme; the trace shape doesn't depend on bcrypt
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["sha256_crypt"]))
+    make_user("alice", password_hash=security.get_password_hash("secret"))
+    spans.spans.clear()
+
+    response = client.post("/api/auth/login",
+                           params={"email": "alice@example.com", "password": "secret"})
+
+    assert response.status_code == 200
+    [server] = spans.named("POST /api/auth/login")
+    assert server.kind == tracing.SERVER
+    assert server.attributes["http.response.status_code"] == 200
+    assert response.headers["x-trace-id"] == server.trace_id
+    [hashing] = spans.named("hash")
+    assert hashing.parent_id == server.span_id
+    transactions = spans.named("db.transaction")
+    assert transactions and all(span.parent_id == server.span_id for span in transactions)
+    assert sum(span.attributes["db.statements"] for span in transactions) >= 1
+
+
+def test_provider_call_is_a_client_span(db, spans, monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client")
+    social_auth.configure(social_auth.StubProvider())
+    try:
+        response = client.post("/api/auth/google", params={"google_token": "stub-bob"})
+    finally:
+        social_auth.configure(None)
+
+    assert response.status_code == 200
+    [server] = spans.named("POST /api/auth/google")
+    [google] = spans.named("google userinfo")
+    assert google.kind == tracing.CLIENT
+    assert google.parent_id == server.span_id
+    assert google.attributes["peer.service"] == "google"
+
+
+def test_incoming_traceparent_is_continued(spans):
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    response = client.get("/health", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    [server] = spans.named("GET /health")
+    assert (server.trace_id, server.parent_id) == (trace_id, parent_id)
+    assert response.headers["x-trace-id"] == trace_id
+
+
+def test_unsampled_traceparent_records_nothing(spans):
+    client.get("/health", headers={
+        "traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"})
+
+    assert spans.spans == []
+
+
+def test_failed_call_marks_span_as_error(spans):
+    root = tracing.Span("root", "1" * 32, None)
+    token = tracing._current.set(root)
+    try:
+        with pytest.raises(TimeoutError):
+            with outbound_call("twilio", "messages.create"):
+                raise TimeoutError("read timed out")
+    finally:
+        tracing._current.reset(token)
+
+    [call] = spans.named("twilio messages.create")
+    assert call.status == tracing.STATUS_ERROR
+    assert call.status_message == "TimeoutError: read timed out"
+
+
+def test_no_exporter_records_nothing():
+    response = client.get("/health")
+
+    assert "x-trace-id" not in response.headers
+    assert tracing.start_span("orphan") is None
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    exporter = tracing.FileExporter(str(tmp_path / "spans.jsonl"))
+    tracing.configure(exporter)
+    try:
+        client.get("/health")
+        exporter.flush()
+    finally:
+        tracing.configure(None)
+        exporter.shutdown()
+
+    [line] = (tmp_path / "spans.jsonl").read_text().splitlines()
+    [resource] = json.loads(line)["resourceSpans"]
+    assert resource["resource"]["attributes"][0]["value"]["stringValue"] == tracing.SERVICE_NAME
+    [span] = resource["scopeSpans"][0]["spans"]
+    assert span["name"] == "GET /health"
+    assert span["kind"] == tracing.SERVER
+    assert {"key": "http.response.status_code", "value": {"intValue": "200"}} \
+        in span["attributes"]
@@ -0,0 +1,294 @@
+import threading
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app.database import SessionLocal, engine
+from app.models.item import Item, ItemStatus
+from app.models.trade import Trade, TradeOffer, TradeOfferStatus, TradeParticipant
+from app.schemas.trade import TradeOfferCreate, TradeOfferResponse
+from app.services.trade_service import TradeService
+from conftest import auth_headers, count_queries
+from main import app
+
+client = TestClient(app)
+
+
+def make_thread(db, owner, offerer, owner_item, offerer_item, depth):
+    """Create an offer followed by depth alternating counter offers"""
+    root = TradeOffer(item_id=owner_item.id, item_owner_id=owner.id,
+                      offerer_id=offerer.id, offered_item_id=offerer_item.id)
+    db.add(root)
+    db.commit()
+    parent = root
+    for level in range(depth):
+        sender, receiver = (owner, offerer) if level % 2 == 0 else (offerer, owner)
+        counter = TradeOffer(item_id=parent.offered_item_id, item_owner_id=receiver.id,
+                             offerer_id=sender.id, offered_item_id=parent.item_id,
+                             is_counter_offer=True, parent_offer_id=parent.id)
+        db.add(counter)
+        db.commit()
+        parent = counter
+    return root
+
+
+def thread_depth(offer):
+    if not offer["counter_offers"]:
+        return 0
+    return 1 + max(thread_depth(child) for child in offer["counter_offers"])
+
+
+def test_offer_thread_query_count_is_independent_of_depth(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    shallow = make_thread(db, alice, bob, chair, lamp, depth=1).id
+    deep = make_thread(db, alice, bob, chair, lamp, depth=6).id
+    alice_id = alice.id
+
+    counts = []
+    for root_id in (shallow, deep):
+        db.expunge_all()
+        with count_queries() as statements:
+            thread = TradeService(db).get_offer_thread(root_id, alice_id)
+            TradeOfferResponse.model_validate(thread)
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+
+def test_offer_thread_endpoint_returns_nested_tree(db, make_user, make_item):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    root = make_thread(db, alice, bob, chair, lamp, depth=3)
+
+    response = client.get(f"/api/trades/offers/{root.id}/thread",
+                          headers=auth_headers(bob))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == root.id
+    assert body["item"]["title"] == "Chair"
+    assert body["offerer"]["username"] == "bob"
+    assert thread_depth(body) == 3
+
+    response = client.get(f"/api/trades/offers/{root.id}/thread",
+                          headers=auth_headers(carol))
+    assert response.status_code == 404
+
+
+def make_offers(db, owner, offerer, owner_item, offerer_item, count, status=None):
+    """Create count offers one minute apart, oldest first"""
+    start = datetime(2026, 1, 1, 12, 0)
+    offers = []
+    for n in range(count):
+        offer = TradeOffer(item_id=owner_item.id, item_owner_id=owner.id,
+                           offerer_id=offerer.id, offered_item_id=offerer_item.id,
+                           created_at=start + timedelta(minutes=n))
+        if status:
+            offer.status = status
+        db.add(offer)
+        offers.append(offer)
+    db.commit()
+    return [offer.id for offer in offers]
+
+
+def test_received_offers_keyset_pagination(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    offer_ids = make_offers(db, alice, bob, chair, lamp, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/trades/offers/received", params=params,
+                              headers=auth_headers(alice))
+        assert response.status_code == 200
+        seen.extend(offer["id"] for offer in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == list(reversed(offer_ids))
+
+    response = client.get("/api/trades/offers/received", params={"cursor": "bogus"},
+                          headers=auth_headers(alice))
+    assert response.status_code == 400
+
+
+def test_offer_inbox_filters_and_pending_count(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    pending = make_offers(db, alice, bob, chair, lamp, 3)
+    rejected = make_offers(db, alice, bob, chair, lamp, 2,
+                           status=TradeOfferStatus.REJECTED)
+
+    response = client.get("/api/trades/offers/made", params={"status": "pending"},
+                          headers=auth_headers(bob))
+    assert sorted(offer["id"] for offer in response.json()) == pending
+
+    response = client.get("/api/trades/offers/received",
+                          params={"created_after": "2026-01-01T12:01:00",
+                                  "created_before": "2026-01-01T12:02:00"},
+                          headers=auth_headers(alice))
+    assert sorted(offer["id"] for offer in response.json()) == [pending[1], rejected[1]]
+
+    response = client.get("/api/trades/offers/pending/count",
+                          headers=auth_headers(alice))
+    assert response.json() == {"received": 3, "made": 0}
+
+
+def accept_concurrently(offer_ids, user_id):
+    """Accept each offer from its own thread and session at the same moment"""
+    barrier = threading.Barrier(len(offer_ids))
+    results = []
+
+    def accept(offer_id):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            trade = TradeService(session).accept_trade_offer(offer_id, user_id)
+            results.append(trade.id if trade else None)
+        except OperationalError:
+            session.rollback()
+            results.append(None)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=accept, args=(offer_id,)) for offer_id in offer_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_competing_accepts_create_exactly_one_trade(db, make_user, make_item):
+    alice = make_user("alice")
+    chair = make_item(alice, "Chair")
+    offer_ids = []
+    for n in range(8):
+        bidder = make_user(f"bidder{n}")
+        offer = TradeOffer(item_id=chair.id, item_owner_id=alice.id, offerer_id=bidder.id,
+                           offered_item_id=make_item(bidder, f"Lamp {n}").id)
+        db.add(offer)
+        db.commit()
+        offer_ids.append(offer.id)
+
+    results = accept_concurrently(offer_ids, alice.id)
+
+    assert len([trade_id for trade_id in results if trade_id]) == 1
+    db.expire_all()
+    assert db.query(Trade).count() == 1
+    statuses = [db.get(TradeOffer, offer_id).status for offer_id in offer_ids]
+    assert statuses.count(TradeOfferStatus.ACCEPTED) == 1
+    assert statuses.count(TradeOfferStatus.REJECTED) == len(offer_ids) - 1
+    trade = db.query(Trade).one()
+    assert {db.get(Item, trade.item1_id).status, db.get(Item, trade.item2_id).status} == {ItemStatus.TRADED}
+
+
+def test_repeated_accept_of_one_offer_is_idempotent(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    offer = TradeOffer(item_id=chair.id, item_owner_id=alice.id,
+                       offerer_id=bob.id, offered_item_id=lamp.id)
+    db.add(offer)
+    db.commit()
+
+    results = accept_concurrently([offer.id] * 6, alice.id)
+
+    assert len([trade_id for trade_id in results if trade_id]) == 1
+    db.expire_all()
+    assert db.query(Trade).count() == 1
+    assert db.get(TradeOffer, offer.id).version == 2
+
+
+def test_counter_offer_blocks_later_accept(db, make_user, make_item):
+    alice, bob = make_user("alice"), make_user("bob")
+    chair, lamp = make_item(alice, "Chair"), make_item(bob, "Lamp")
+    offer = TradeOffer(item_id=chair.id, item_owner_id=alice.id,
+                       offerer_id=bob.id, offered_item_id=lamp.id)
+    db.add(offer)
+    db.commit()
+
+    service = TradeService(db)
+    counter = service.create_counter_offer(
+        offer.id, TradeOfferCreate(item_id=lamp.id, offered_item_id=chair.id), alice.id)
+    assert counter.parent_offer_id == offer.id
+    assert service.accept_trade_offer(offer.id, alice.id) is None
+    db.expire_all()
+    assert db.get(TradeOffer, offer.id).status == TradeOfferStatus.COUNTERED
+    assert db.get(Item, chair.id).status == ItemStatus.ACTIVE
+
+
+def make_trades(db, alice, make_user, make_item, count):
+    """Accept count offers to alice, returning trade ids oldest first"""
+    service = TradeService(db)
+    trade_ids = []
+    for n in range(count):
+        bidder = make_user(f"trader{n}")
+        offer = service.create_trade_offer(TradeOfferCreate(
+            item_id=make_item(alice, f"Chair {n}").id,
+            offered_item_id=make_item(bidder, f"Lamp {n}").id), bidder.id)
+        trade_ids.append(service.accept_trade_offer(offer.id, alice.id).id)
+
+    # Distinct timestamps so keyset pages are deterministic
+    start = datetime(2026, 1, 1)
+    for n, trade_id in enumerate(trade_ids):
+        created_at = start + timedelta(minutes=n)
+        db.query(Trade).filter(Trade.id == trade_id).update({"created_at": created_at})
+        db.query(TradeParticipant).filter(
+            TradeParticipant.trade_id == trade_id).update({"created_at": created_at})
+    db.commit()
+    return trade_ids
+
+
+def fetch_all_pages(path, user, limit):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(path, params=params, headers=auth_headers(user))
+        assert response.status_code == 200
+        seen.extend(trade["id"] for trade in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_active_and_past_trades_are_paginated(db, make_user, make_item):
+    alice = make_user("alice")
+    trade_ids = make_trades(db, alice, make_user, make_item, 5)
+    service = TradeService(db)
+    service.complete_trade(trade_ids[0], alice.id)
+    service.cancel_trade(trade_ids[3], alice.id)
+
+    active = fetch_all_pages("/api/trades/active", alice, limit=2)
+    past = fetch_all_pages("/api/trades/history", alice, limit=1)
+
+    assert active == [trade_ids[4], trade_ids[2], trade_ids[1]]
+    assert past == [trade_ids[3], trade_ids[0]]
+    bidder = db.get(Trade, trade_ids[1]).user2
+    assert fetch_all_pages("/api/trades/active", bidder, limit=20) == [trade_ids[1]]
+
+
+def test_active_trades_use_partial_participant_index(db, make_user, make_item):
+    alice = make_user("alice")
+    make_trades(db, alice, make_user, make_item, 2)
+    executed = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        if "trade_participants" in statement:
+            executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        TradeService(db).get_active_trades(alice.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = executed[0]
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    assert "ix_trade_participants_active" in " ".join(str(row) for row in plan)
@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.x509.oid import NameOID
+from fastapi.testclient import TestClient
+
+from app.models.subscription import (
+    PaymentProvider, Subscription, SubscriptionStatus, WebhookEvent, WebhookEventStatus
+)
+from app.services.webhook_service import WebhookService
+from app.utils import webhook_signatures
+from main import app
+
+client = TestClient(app)
+STRIPE_SECRET = "whsec_test"
+PAYPAL_WEBHOOK_ID = "WH-TEST"
+PAYPAL_CERT_URL = "https://api.sandbox.paypal.com/v1/notifications/certs/CERT-test"
+
+
+@pytest.fixture(autouse=True)
+def webhook_config(monkeypatch):
+    monkeypatch.setattr(webhook_signatures, "STRIPE_WEBHOOK_SECRET", STRIPE_SECRET)
+    monkeypatch.setattr(webhook_signatures, "PAYPAL_WEBHOOK_ID", PAYPAL_WEBHOOK_ID)
+
+
+def stripe_event(event_id, event_type, obj, created):
+    return json.dumps({"id": event_id, "type": event_type, "created": created,
+                       "data": {"object": obj}}).encode()
+
+
+def post_stripe(payload, secret=STRIPE_SECRET):
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload,
+                         hashlib.sha256).hexdigest()
+    return client.post("/api/payments/webhook/stripe", content=payload,
+                       headers={"Stripe-Signature": f"t={timestamp},v1={signature}"})
+
+
+def make_subscription(db, user, provider, provider_subscription_id):
+    subscription = Subscription(user_id=user.id, payment_provider=provider,
+                                provider_subscription_id=provider_subscription_id,
+                                provider_customer_id="cus_1", status=SubscriptionStatus.ACTIVE)
+    db.add(subscription)
+    db.commit()
+    return subscription
+
+
+def test_stripe_webhooks_are_verified_deduplicated_and_applied(db, make_user):
+    subscription = make_subscription(db, make_user("alice"), PaymentProvider.STRIPE, "sub_1")
+    now = int(time.time())
+    failed = stripe_event("evt_1", "invoice.payment_failed", {"subscription": "sub_1"}, now)
+
+    assert post_stripe(failed).json() == {"status": "received"}
+    assert post_stripe(failed).json() == {"status": "duplicate"}
+    assert post_stripe(failed, secret="whsec_wrong").status_code == 400
+    # An older event delivered late must not undo the newer one
+    post_stripe(stripe_event("evt_0", "customer.subscription.updated",
+                             {"id": "sub_1", "status": "active"}, now - 60))
+    post_stripe(stripe_event("evt_2", "customer.created", {"id": "cus_1"}, now))
+
+    assert WebhookService(db).process_batch() == 3
+
+    db.expire_all()
+    assert db.get(Subscription, subscription.id).status == SubscriptionStatus.PAST_DUE
+    statuses = {event.event_id: event.status for event in db.query(WebhookEvent).all()}
+    assert statuses == {"evt_1": WebhookEventStatus.PROCESSED,
+                        "evt_0": WebhookEventStatus.PROCESSED,
+                        "evt_2": WebhookEventStatus.IGNORED}
+    assert WebhookService(db).process_batch() == 0
+
+
+def test_consumer_applies_in_batches(db, make_user):
+    subscriptions = [make_subscription(db, make_user(f"user{n}"), PaymentProvider.STRIPE,
+                                       f"sub_{n}") for n in range(5)]
+    now = int(time.time())
+    for n in range(5):
+        post_stripe(stripe_event(f"evt_{n}", "customer.subscription.deleted",
+                                 {"id": f"sub_{n}", "status": "canceled"}, now))
+
+    service = WebhookService(db)
+    assert [service.process_batch(batch_size=2) for _ in range(4)] == [2, 2, 1, 0]
+
+    db.expire_all()
+    assert {db.get(Subscription, subscription.id).status
+            for subscription in subscriptions} == {SubscriptionStatus.CANCELLED}
+
+
+def test_webhooks_are_refused_without_a_configured_secret(db, monkeypatch):
+    monkeypatch.setattr(webhook_signatures, "STRIPE_WEBHOOK_SECRET", "")
+    monkeypatch.setattr(webhook_signatures, "PAYPAL_WEBHOOK_ID", "")
+    payload = stripe_event("evt_1", "invoice.paid", {"subscription": "sub_1"}, int(time.time()))
+
+    # Signed with the empty key an unset secret would otherwise verify against
+    assert post_stripe(payload, secret="").status_code == 503
+    response = client.post("/api/payments/webhook/paypal", content=b"{}")
+    assert response.status_code == 503
+    assert db.query(WebhookEvent).count() == 0
+
+
+@pytest.fixture
+def paypal_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "messageverificationcerts")])
+    now = datetime.now(timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name)
+                   .public_key(key.public_key()).serial_number(1)
+                   .not_valid_before(now).not_valid_after(now + timedelta(days=1))
+                   .sign(key, hashes.SHA256()))
+    webhook_signatures._certificates[PAYPAL_CERT_URL] = certificate
+    yield key
+    webhook_signatures._certificates.pop(PAYPAL_CERT_URL, None)
+
+
+def test_paypal_webhooks_are_verified_locally(db, make_user, paypal_key):
+    subscription = make_subscription(db, make_user("alice"), PaymentProvider.PAYPAL, "I-1")
+    payload = json.dumps({"id": "WH-1", "event_type": "BILLING.SUBSCRIPTION.SUSPENDED",
+                          "create_time": "2026-10-19T10:00:00Z",
+                          "resource": {"id": "I-1", "status": "SUSPENDED"}}).encode()
+    transmission = ("tx-1", "2026-10-19T10:00:01Z")
+    message = f"{transmission[0]}|{transmission[1]}|{PAYPAL_WEBHOOK_ID}|{zlib.crc32(payload)}"
+    signature = base64.b64encode(paypal_key.sign(message.encode(), padding.PKCS1v15(),
+                                                 hashes.SHA256())).decode()
+    headers = {"PAYPAL-TRANSMISSION-ID": transmission[0],
+               "PAYPAL-TRANSMISSION-TIME": transmission[1],
+               "PAYPAL-CERT-URL": PAYPAL_CERT_URL,
+               "PAYPAL-AUTH-ALGO": "SHA256withRSA",
+               "PAYPAL-TRANSMISSION-SIG": signature}
+
+    response = client.post("/api/payments/webhook/paypal", content=payload, headers=headers)
+    assert response.json() == {"status": "received"}
+    tampered = payload.replace(b"SUSPENDED", b"ACTIVATED")
+    response = client.post("/api/payments/webhook/paypal", content=tampered, headers=headers)
+    assert response.status_code == 400
+
+    WebhookService(db).process_batch()
+    db.expire_all()
+    assert db.get(Subscription, subscription.id).status == SubscriptionStatus.PAST_DUE